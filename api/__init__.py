@@ -0,0 +1 @@
+# HTTP API so other services can use the model
@@ -0,0 +1,136 @@
+"""
+Load Test
+---------
+Hammers the inference API with the same image (or zip) from a bunch of
+keep-alive connections and reports throughput and latency percentiles.
+
+    python -m api.server --port 8000 &
+    python -m api.loadtest face.jpg --concurrency 8 --duration 30
+    python -m api.loadtest photos.zip --endpoint /v1/detect/batch --requests 50
+
+Standard library + numpy, so it runs from any box that can reach the server.
+"""
+
+import time
+import argparse
+import threading
+import http.client
+from collections import Counter
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def _worker(url, endpoint, body, deadline, budget, results, lock):
+    """One connection, sending requests back to back until time or the request budget runs out"""
+    parts = urlsplit(url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    while time.perf_counter() < deadline:
+        with lock:
+            if budget['left'] is not None:
+                if budget['left'] <= 0:
+                    break
+                budget['left'] -= 1
+
+        started = time.perf_counter()
+        try:
+            conn.request('POST', endpoint, body=body, headers={'Content-Type': 'application/octet-stream'})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            status = type(e).__name__
+            # Start over with a fresh connection
+            conn.close()
+            conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+        elapsed = time.perf_counter() - started
+
+        with lock:
+            results.append((status, elapsed))
+
+    conn.close()
+
+
+def run_load(url, endpoint, body, concurrency=8, duration=10.0, requests=None, warmup=3):
+    """
+    Runs the test and returns a summary dict (also printed).
+
+    Args:
+        url: Server base URL, e.g. http://127.0.0.1:8000
+        endpoint: Path to POST to
+        body: Request body bytes
+        concurrency: Parallel connections
+        duration: Max seconds to run
+        requests: Stop after this many requests (None = until duration is up)
+        warmup: Requests sent first and left out of the numbers
+    """
+    lock = threading.Lock()
+
+    # Warm-up (first requests pay for lazy init on the server)
+    if warmup:
+        _worker(url, endpoint, body, time.perf_counter() + 60, {'left': warmup}, [], lock)
+
+    results = []
+    budget = {'left': requests}
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=_worker, args=(url, endpoint, body, deadline, budget, results, lock), daemon=True)
+        for _ in range(concurrency)
+    ]
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    statuses = Counter(status for status, _ in results)
+    ok = [seconds * 1000 for status, seconds in results if status == 200]
+
+    summary = {
+        'requests': len(results),
+        'ok': len(ok),
+        'errors': len(results) - len(ok),
+        'statuses': dict(statuses),
+        'seconds': elapsed,
+        'rps': len(ok) / elapsed if elapsed > 0 else 0.0,
+        'p50_ms': float(np.percentile(ok, 50)) if ok else 0.0,
+        'p95_ms': float(np.percentile(ok, 95)) if ok else 0.0,
+        'p99_ms': float(np.percentile(ok, 99)) if ok else 0.0,
+        'max_ms': max(ok) if ok else 0.0,
+    }
+
+    print(f"{summary['requests']} requests in {elapsed:.1f}s with {concurrency} connection(s)")
+    print(f"  throughput: {summary['rps']:.1f} req/s ({summary['errors']} errors: {summary['statuses']})")
+    print(f"  latency:    p50 {summary['p50_ms']:.1f}ms · p95 {summary['p95_ms']:.1f}ms · "
+          f"p99 {summary['p99_ms']:.1f}ms · max {summary['max_ms']:.1f}ms")
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the inference API")
+    parser.add_argument('file', help="Image (for /v1/detect) or zip (for /v1/detect/batch) to send")
+    parser.add_argument('--url', default='http://127.0.0.1:8000')
+    parser.add_argument('--endpoint', default='/v1/detect')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds to run")
+    parser.add_argument('--requests', type=int, help="Stop after this many requests instead")
+    parser.add_argument('--warmup', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.file, 'rb') as f:
+        body = f.read()
+
+    run_load(
+        args.url, args.endpoint, body,
+        concurrency=args.concurrency,
+        duration=args.duration if args.requests is None else float('inf'),
+        requests=args.requests,
+        warmup=args.warmup
+    )
+
+
+if __name__ == "__main__":
+    main()
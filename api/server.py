@@ -0,0 +1,243 @@
+"""
+Inference API
+-------------
+Small HTTP service so other services can use the model without Streamlit.
+Standard library only (asyncio), one shared predictor per process.
+
+    python -m api.server --port 8000
+
+    curl --data-binary @face.jpg http://localhost:8000/v1/detect
+    curl --data-binary @photos.zip http://localhost:8000/v1/detect/batch
+    curl http://localhost:8000/healthz
+
+/v1/detect takes raw image bytes (JPEG/PNG) and answers with the same
+per-face dicts predict_from_image gives the UI. /v1/detect/batch takes a
+zip of images and answers with one entry per image, in zip order.
+
+The event loop only parses HTTP; decoding, detection and the model run on
+a worker pool. When too many requests are already waiting for it we answer
+503 straight away instead of queueing forever.
+"""
+
+import io
+import os
+import json
+import time
+import asyncio
+import argparse
+import zipfile
+from http import HTTPStatus
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from core import metrics, model_loader
+from core.batch_processor import BatchProcessor, expand_uploads, load_image
+
+
+# Request size limits (env vars so deployments can tune them)
+MAX_BODY_BYTES = int(os.environ.get('EMOTION_API_MAX_BYTES', 10 * 1024 * 1024))
+MAX_BATCH_BYTES = int(os.environ.get('EMOTION_API_MAX_BATCH_BYTES', 100 * 1024 * 1024))
+MAX_HEADER_BYTES = 16 * 1024
+
+# Requests allowed to wait for a worker before we start answering 503
+MAX_PENDING = 64
+
+# Bad input from the client (-> 400); anything else that goes wrong is on us (-> 500).
+# PIL's UnidentifiedImageError and truncated-file errors are OSErrors.
+DECODE_ERRORS = (OSError, Image.DecompressionBombError, zipfile.BadZipFile)
+
+# Seconds to wait for a request body / for the next request on a kept-alive connection
+READ_TIMEOUT = 30.0
+KEEPALIVE_TIMEOUT = 15.0
+
+ROUTES = {
+    '/v1/detect': 'POST',
+    '/v1/detect/batch': 'POST',
+    '/healthz': 'GET',
+}
+
+
+class InferenceServer:
+    """
+    Args:
+        predictor: A loaded EmotionPredictor (shared by every worker)
+        workers: Threads running inference
+        max_pending: Requests allowed to wait for a worker
+    """
+
+    def __init__(self, predictor, workers=None, max_pending=MAX_PENDING):
+        self.predictor = predictor
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+
+        # All decoding, detection and model calls share this one pool, batch requests included
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='api')
+        self._batch = BatchProcessor(predictor, workers=self.workers, executor=self._pool)
+        # Batch requests are coordinated from here; these threads only wait on
+        # the worker pool, they never do the heavy work themselves
+        self._coordinators = ThreadPoolExecutor(max_workers=max_pending, thread_name_prefix='api-batch')
+        self._pending = 0
+
+    def _detect(self, body):
+        """Worker side: bytes -> per-face predictions"""
+        image = np.array(load_image(body))
+        return self.predictor.predict_from_image(image, raise_errors=True)
+
+    def _detect_batch(self, body):
+        """Worker side: zip bytes -> one result per image, in zip order"""
+        items = expand_uploads([('upload.zip', body)])
+        results = sorted(self._batch.run(items), key=lambda r: r['index'])
+        return [{'name': r['name'], 'faces': r['predictions'], 'error': r['error']} for r in results]
+
+    async def _run(self, fn, body, executor=None):
+        """Runs fn(body) on the worker pool (or `executor`), or returns None if we're already too busy"""
+        if self._pending >= self.max_pending:
+            return None
+
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor or self._pool, fn, body)
+        finally:
+            self._pending -= 1
+
+    async def route(self, method, path, body):
+        """(status, payload) for one request"""
+        if path not in ROUTES:
+            return HTTPStatus.NOT_FOUND, {'error': f"No such endpoint: {path}"}
+        if method != ROUTES[path]:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': f"Use {ROUTES[path]} for {path}"}
+
+        if path == '/healthz':
+            return HTTPStatus.OK, {'status': 'ok', 'model': model_loader.status(), 'pending': self._pending}
+
+        if not body:
+            return HTTPStatus.BAD_REQUEST, {'error': "Empty body, send the image bytes"}
+
+        started = time.perf_counter()
+        try:
+            if path == '/v1/detect':
+                faces = await self._run(self._detect, body)
+                payload = None if faces is None else {'faces': faces, 'count': len(faces)}
+            else:
+                if not zipfile.is_zipfile(io.BytesIO(body)):
+                    return HTTPStatus.UNSUPPORTED_MEDIA_TYPE, {'error': "Batch body must be a zip of images"}
+                # Not on the worker pool: it would sit on a worker waiting for the others
+                images = await self._run(self._detect_batch, body, executor=self._coordinators)
+                payload = None if images is None else {'images': images, 'count': len(images)}
+        except DECODE_ERRORS as e:
+            return HTTPStatus.BAD_REQUEST, {'error': f"Couldn't read image: {e}"}
+        except Exception as e:
+            print(f"API request to {path} failed: {e!r}")
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': "Inference failed on the server"}
+
+        if payload is None:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': "Server busy, try again"}
+
+        elapsed = time.perf_counter() - started
+        metrics.record('api' + path.replace('/', '_'), elapsed)
+        payload['ms'] = round(elapsed * 1000, 1)
+        return HTTPStatus.OK, payload
+
+    async def handle(self, reader, writer):
+        """One connection; keeps serving requests on it while the client wants keep-alive"""
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {'error': "Headers too large"}, keep_alive=False)
+                    break
+
+                try:
+                    request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                    method, target, version = request_line.split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, HTTPStatus.BAD_REQUEST, {'error': "Malformed request"}, keep_alive=False)
+                    break
+
+                headers = {}
+                for line in header_lines:
+                    if ':' in line:
+                        name, value = line.split(':', 1)
+                        headers[name.strip().lower()] = value.strip()
+
+                path = target.split('?', 1)[0]
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+
+                if 'chunked' in headers.get('transfer-encoding', '').lower():
+                    await self._respond(writer, HTTPStatus.LENGTH_REQUIRED,
+                                        {'error': "Send a Content-Length, chunked bodies aren't supported"}, keep_alive=False)
+                    break
+
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                limit = MAX_BATCH_BYTES if path == '/v1/detect/batch' else MAX_BODY_BYTES
+                if length < 0 or length > limit:
+                    # Don't read the body at all, just hang up after telling them why
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+                                        {'error': f"Body must be at most {limit} bytes"}, keep_alive=False)
+                    break
+
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), READ_TIMEOUT) if length else b''
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+
+                status, payload = await self.route(method, path, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode()
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    async def serve(self, host='127.0.0.1', port=8000):
+        server = await asyncio.start_server(self.handle, host, port, limit=MAX_HEADER_BYTES)
+        print(f"Serving on http://{host}:{port} with {self.workers} worker(s)")
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP API for emotion detection")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, help="Inference threads (default: min(4, CPUs))")
+    parser.add_argument('--max-pending', type=int, default=MAX_PENDING)
+    parser.add_argument('--model', default=model_loader.DEFAULT_MODEL_PATH)
+    args = parser.parse_args()
+
+    # Load + warm up before taking traffic
+    model_loader.start_warmup(args.model)
+    predictor = model_loader.get_predictor()
+
+    server = InferenceServer(predictor, workers=args.workers, max_pending=args.max_pending)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Bye!")
+
+
+if __name__ == "__main__":
+    main()
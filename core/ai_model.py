@@ -8,67 +8,106 @@ A custom CNN built with Keras to detect emotions.
 import tensorflow as tf
 from tensorflow import keras
 from keras import layers, models
+import numpy as np
 import os
+import time
+
+
+# Filters and conv layers per block at width 1.0. The first four blocks
+# are the original model: 32 (edges) -> 64 (eyes) -> 128 (mouth) -> 256 (whole face).
+BLOCK_FILTERS = [32, 64, 128, 256, 512]
+BLOCK_CONVS = [2, 2, 2, 1, 1]
+
+# Named variants so training/eval scripts can just say --arch slim
+ARCHITECTURES = {
+    # The original model, unchanged
+    'baseline': {'width_multiplier': 1.0, 'num_blocks': 4, 'separable': False,
+                 'global_pool': False, 'dense_units': (256, 128)},
+    # Same convs, but no giant Flatten -> Dense(256)
+    'gap': {'width_multiplier': 1.0, 'num_blocks': 4, 'separable': False,
+            'global_pool': True, 'dense_units': (128,)},
+    # Half width + depthwise-separable convs, good for real-time
+    'slim': {'width_multiplier': 0.5, 'num_blocks': 4, 'separable': True,
+             'global_pool': True, 'dense_units': (128,)},
+    # Smallest thing that still learns something (edge kiosks)
+    'tiny': {'width_multiplier': 0.25, 'num_blocks': 3, 'separable': True,
+             'global_pool': True, 'dense_units': (64,)},
+}
 
 
 class EmotionCNN:
-    def __init__(self, input_shape=(48, 48, 1), num_classes=7):
+    def __init__(self, input_shape=(48, 48, 1), num_classes=7, config=None):
+        """
+        Args:
+            input_shape: Face crop shape
+            num_classes: Number of emotions
+            config: Name from ARCHITECTURES or a dict with any of
+                width_multiplier, num_blocks, separable, global_pool, dense_units
+                (missing keys fall back to 'baseline')
+        """
         self.input_shape = input_shape
         self.num_classes = num_classes
         self.model = None
         
+        if isinstance(config, str):
+            config = ARCHITECTURES[config]
+        self.config = dict(ARCHITECTURES['baseline'], **(config or {}))
+        
     def build_model(self):
         """
-        Constructs the CNN.
-        I used 4 conv blocks to make sure we catch all the details (eyes, mouth, etc).
+        Constructs the CNN from self.config.
+        The default is 4 conv blocks to make sure we catch all the details (eyes, mouth, etc).
         """
-        model = models.Sequential([
-            # Block 1: Basic edges and shapes
-            layers.Conv2D(32, (3, 3), activation='relu', padding='same', input_shape=self.input_shape),
-            layers.BatchNormalization(),
-            layers.Conv2D(32, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.25), # Prevent overfitting!
-            
-            # Block 2: More complex features (eyes/eyebrows)
-            layers.Conv2D(64, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.Conv2D(64, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.25),
-            
-            # Block 3: Mouth and expressions
-            layers.Conv2D(128, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.Conv2D(128, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.25),
-            
-            # Block 4: High-level facial patterns
-            layers.Conv2D(256, (3, 3), activation='relu', padding='same'),
-            layers.BatchNormalization(),
-            layers.MaxPooling2D((2, 2)),
-            layers.Dropout(0.25),
+        cfg = self.config
+        num_blocks = cfg['num_blocks']
+        if not 1 <= num_blocks <= len(BLOCK_FILTERS):
+            raise ValueError(f"num_blocks must be 1-{len(BLOCK_FILTERS)}, got {num_blocks}")
+        
+        model_layers = [layers.Input(shape=self.input_shape)]
+        
+        for block in range(num_blocks):
+            filters = max(8, int(BLOCK_FILTERS[block] * cfg['width_multiplier']))
             
-            # Classifier
-            layers.Flatten(),
-            layers.Dense(256, activation='relu'),
-            layers.BatchNormalization(),
-            layers.Dropout(0.5),
-            layers.Dense(128, activation='relu'),
-            layers.BatchNormalization(),
-            layers.Dropout(0.5),
+            for i in range(BLOCK_CONVS[block]):
+                # Separable convs are pointless on the 1-channel input, so the very first stays normal
+                if cfg['separable'] and not (block == 0 and i == 0):
+                    conv = layers.SeparableConv2D(filters, (3, 3), activation='relu', padding='same')
+                else:
+                    conv = layers.Conv2D(filters, (3, 3), activation='relu', padding='same')
+                model_layers += [conv, layers.BatchNormalization()]
             
-            # Output: 7 emotions
-            layers.Dense(self.num_classes, activation='softmax')
-        ])
+            model_layers += [
+                layers.MaxPooling2D((2, 2)),
+                layers.Dropout(0.25)  # Prevent overfitting!
+            ]
+        
+        # Classifier
+        if cfg['global_pool']:
+            model_layers.append(layers.GlobalAveragePooling2D())
+        else:
+            model_layers.append(layers.Flatten())
+        
+        for units in cfg['dense_units']:
+            model_layers += [
+                layers.Dense(units, activation='relu'),
+                layers.BatchNormalization(),
+                layers.Dropout(0.5)
+            ]
+        
+        # Output: 7 emotions
+        model_layers.append(layers.Dense(self.num_classes, activation='softmax'))
+        
+        model = models.Sequential(model_layers)
         
         self.model = model
         return model
     
+    def profile(self, runs=100):
+        """Params, FLOPs and CPU latency for this architecture (builds it if needed)"""
+        if self.model is None:
+            self.build_model()
+        return profile_model(self.model, runs=runs)
+    
     def compile_model(self, lr=0.001):
         """Sets up the optimizer and loss function"""
         if self.model is None:
@@ -104,3 +143,90 @@ def create_pretrained_model():
     cnn.build_model()
     cnn.compile_model()
     return cnn
+
+
+def count_flops(model):
+    """
+    Rough FLOPs for one forward pass of one image (multiply + add = 2).
+    Only counts convs and dense layers, which is where basically all the work is.
+    """
+    flops = 0
+    
+    for layer in model.layers:
+        if isinstance(layer, (layers.Conv2D, layers.SeparableConv2D, layers.DepthwiseConv2D, layers.Dense)):
+            in_ch = layer.input.shape[-1]
+            out_shape = layer.output.shape
+        else:
+            continue
+        
+        if isinstance(layer, layers.Dense):
+            flops += 2 * in_ch * out_shape[-1]
+            continue
+        
+        kh, kw = layer.kernel_size
+        out_pixels = out_shape[1] * out_shape[2]
+        
+        if isinstance(layer, layers.SeparableConv2D):
+            # Depthwise 3x3 per channel, then a 1x1 to mix channels
+            flops += 2 * out_pixels * kh * kw * in_ch
+            flops += 2 * out_pixels * in_ch * out_shape[-1]
+        elif isinstance(layer, layers.DepthwiseConv2D):
+            flops += 2 * out_pixels * kh * kw * out_shape[-1]
+        else:
+            flops += 2 * out_pixels * kh * kw * in_ch * out_shape[-1]
+    
+    return int(flops)
+
+
+def measure_latency(model, runs=100, batch_size=1, warmup=10):
+    """Median/p95 milliseconds per call on CPU for a (batch_size, 48, 48, 1) input"""
+    x = np.random.rand(batch_size, *model.input_shape[1:]).astype('float32')
+    
+    # Calling the model directly skips predict()'s per-call overhead,
+    # which is what the app sees for single faces
+    for _ in range(warmup):
+        model(x, training=False)
+    
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(x, training=False)
+        times.append((time.perf_counter() - start) * 1000)
+    
+    return {
+        'p50_ms': float(np.percentile(times, 50)),
+        'p95_ms': float(np.percentile(times, 95))
+    }
+
+
+def profile_model(model, runs=100):
+    """One dict with everything we care about when picking a model for real-time use"""
+    with tf.device('/CPU:0'):
+        latency = measure_latency(model, runs=runs)
+    
+    return {
+        'params': int(model.count_params()),
+        'flops': count_flops(model),
+        'latency_p50_ms': latency['p50_ms'],
+        'latency_p95_ms': latency['p95_ms']
+    }
+
+
+def compare_architectures(names=None, runs=100):
+    """Prints a params / FLOPs / latency table for the named variants"""
+    names = names or list(ARCHITECTURES)
+    results = {}
+    
+    print(f"{'Variant':<10} {'Params':>10} {'MFLOPs':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for name in names:
+        stats = EmotionCNN(config=name).profile(runs=runs)
+        results[name] = stats
+        print(f"{name:<10} {stats['params']:>10,} {stats['flops'] / 1e6:>10.1f} "
+              f"{stats['latency_p50_ms']:>8.2f} {stats['latency_p95_ms']:>8.2f}")
+    
+    return results
+
+
+if __name__ == "__main__":
+    # python core/ai_model.py  ->  quick comparison of all the variants
+    compare_architectures()
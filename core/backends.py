@@ -0,0 +1,96 @@
+"""
+Inference Backends
+------------------
+Tiny wrappers so the app and the eval scripts can run either a Keras
+.h5 model or a compressed (int8) TFLite model with the same calls:
+
+    backend = load_backend('models/emotion_model_int8.tflite')
+    probs = backend.predict(batch)   # (B, 48, 48, 1) float -> (B, 7) numpy
+"""
+
+import threading
+
+import numpy as np
+
+
+class KerasBackend:
+    name = 'keras'
+
+    def __init__(self, model):
+        self.model = model
+        self.input_shape = model.input_shape
+
+    @classmethod
+    def load(cls, path):
+        from tensorflow import keras
+        return cls(keras.models.load_model(path))
+
+    def predict(self, batch):
+        # Calling the model directly is much cheaper than model.predict() for small batches
+        return np.asarray(self.model(np.asarray(batch, dtype=np.float32), training=False))
+
+    def __call__(self, batch, training=False):
+        return self.predict(batch)
+
+
+class TFLiteBackend:
+    name = 'tflite'
+
+    def __init__(self, path, num_threads=None):
+        import tensorflow as tf
+
+        self.path = path
+        self.interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = (None,) + tuple(int(d) for d in self._input['shape'][1:])
+        self._batch_size = int(self._input['shape'][0])
+
+        # The interpreter isn't thread-safe and Streamlit sessions share it
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                # Resizing reallocates, so we only do it when the batch size changes
+                self.interpreter.resize_tensor_input(self._input['index'], batch.shape)
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+
+            self.interpreter.set_tensor(self._input['index'], self._quantize(batch, self._input))
+            self.interpreter.invoke()
+            out = self.interpreter.get_tensor(self._output['index'])
+
+        return self._dequantize(out, self._output)
+
+    def __call__(self, batch, training=False):
+        return self.predict(batch)
+
+    @staticmethod
+    def _quantize(x, detail):
+        """Float -> whatever the model's input wants (no-op for float inputs)"""
+        if detail['dtype'] == np.float32:
+            return x
+        scale, zero = detail['quantization']
+        info = np.iinfo(detail['dtype'])
+        return np.clip(np.round(x / scale + zero), info.min, info.max).astype(detail['dtype'])
+
+    @staticmethod
+    def _dequantize(x, detail):
+        if detail['dtype'] == np.float32:
+            return x
+        scale, zero = detail['quantization']
+        return (x.astype(np.float32) - zero) * scale
+
+
+def load_backend(path):
+    """Picks the backend from the file extension"""
+    if path.endswith('.tflite'):
+        return TFLiteBackend(path)
+    return KerasBackend.load(path)
@@ -0,0 +1,194 @@
+"""
+Batch Processing
+----------------
+Many images in, per-image results out as soon as each one is done.
+
+Decoding + face detection run on a thread pool (PIL and OpenCV release
+the GIL for the heavy parts). Faces from whichever images are ready get
+pooled into one model call, so 20 photos with 3 faces each cost a couple
+of batched predictions instead of 60 single-face ones.
+
+    processor = BatchProcessor(predictor)
+    for result in processor.run(expand_uploads([(name, data), ...])):
+        ...   # {'index', 'name', 'image', 'predictions', 'error'}
+"""
+
+import io
+import os
+import queue
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from core import metrics
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Faces per model call
+MAX_BATCH_FACES = 64
+
+# Zip uploads: don't let one archive eat the server
+MAX_ZIP_FILES = 500
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+
+
+def load_image(data):
+    """Bytes -> RGB PIL image, rotated the way the camera held it"""
+    image = Image.open(io.BytesIO(data))
+    image = ImageOps.exif_transpose(image)
+    # RGBA/palette PNGs would trip up the RGB->gray conversion in detect_faces
+    return image.convert('RGB')
+
+
+def expand_uploads(files):
+    """
+    (name, bytes) pairs -> (name, loader) pairs, one per image.
+    Zip files are opened and every image inside becomes its own entry.
+    Loaders decode lazily, on the worker threads.
+    """
+    items = []
+
+    for name, data in files:
+        if not name.lower().endswith('.zip'):
+            items.append((name, lambda data=data: load_image(data)))
+            continue
+
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile:
+            print(f"Skipping {name}: not a valid zip")
+            continue
+
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir()
+            and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            and not os.path.basename(info.filename).startswith('.')
+        ]
+        if len(members) > MAX_ZIP_FILES:
+            print(f"{name}: only using the first {MAX_ZIP_FILES} of {len(members)} images")
+            members = members[:MAX_ZIP_FILES]
+
+        for info in members:
+            if info.file_size > MAX_IMAGE_BYTES:
+                print(f"Skipping {info.filename}: too big ({info.file_size / 1e6:.0f}MB)")
+                continue
+            items.append((
+                f"{name}/{info.filename}",
+                lambda archive=archive, info=info: load_image(archive.read(info))
+            ))
+
+    return items
+
+
+class BatchProcessor:
+    """
+    Args:
+        predictor: A loaded EmotionPredictor
+        workers: Decode/detect threads
+        max_batch: Max faces per model call
+        max_in_flight: Decoded images allowed to wait for the model (bounds memory)
+        executor: Shared thread pool to run on (e.g. a server's worker pool).
+            Default: a private pool of `workers` threads per run(). With a shared
+            pool, don't call run() from one of its own threads, it waits on it.
+    """
+
+    def __init__(self, predictor, workers=None, max_batch=MAX_BATCH_FACES, max_in_flight=None, executor=None):
+        self.predictor = predictor
+        self.workers = workers or min(8, os.cpu_count() or 1)
+        self.max_batch = max_batch
+        self.max_in_flight = max_in_flight or self.workers * 2
+        self.executor = executor
+
+    def _prepare(self, index, name, load):
+        """Worker side: decode, find faces, cut them out"""
+        item = {'index': index, 'name': name, 'image': None, 'faces': [], 'rois': [],
+                'predictions': [], 'error': None}
+        try:
+            with metrics.timer('batch_prepare'):
+                # Per-thread cascade, see EmotionPredictor.preprocessor
+                preprocessor = self.predictor.preprocessor
+                image = np.array(load())
+                faces = preprocessor.detect_faces(image)
+
+                item['image'] = image
+                item['faces'] = [tuple(int(v) for v in f) for f in faces]
+                item['rois'] = [preprocessor.extract_face_roi(image, f) for f in item['faces']]
+            metrics.count('images_analyzed')
+        except Exception as e:
+            item['error'] = str(e)
+        return item
+
+    def _classify(self, group):
+        """One model call for every face in the group, then hand the results back out"""
+        rois = [roi for item in group for roi in item['rois']]
+        if not rois:
+            return
+
+        with metrics.timer('batch_predict'):
+            preds = self.predictor.predict_faces(rois)
+
+        start = 0
+        for item in group:
+            n = len(item['rois'])
+            item['predictions'] = self.predictor.attach_faces(item['faces'], preds[start:start + n])
+            item['rois'] = []
+            start += n
+
+    def run(self, items):
+        """
+        Generator over per-image results, in completion order.
+        `items` is a list of (name, loader) pairs (see expand_uploads).
+        """
+        if self.executor is not None:
+            yield from self._run_on(self.executor, items)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='batch') as pool:
+            yield from self._run_on(pool, items)
+
+    def _run_on(self, pool, items):
+        """run() body: decode/detect and the model calls all go through `pool`"""
+        ready = queue.Queue()
+        pending = iter(enumerate(items))
+        total = len(items)
+        in_flight = 0
+
+        def work(index, name, load):
+            ready.put(self._prepare(index, name, load))
+
+        def submit_more():
+            nonlocal in_flight
+            while in_flight < self.max_in_flight:
+                nxt = next(pending, None)
+                if nxt is None:
+                    return
+                index, (name, load) = nxt
+                pool.submit(work, index, name, load)
+                in_flight += 1
+
+        submit_more()
+        done = 0
+        while done < total:
+            # Wait for one image, then take whatever else is already waiting
+            group = [ready.get()]
+            faces = len(group[0]['rois'])
+            while faces < self.max_batch:
+                try:
+                    item = ready.get_nowait()
+                except queue.Empty:
+                    break
+                group.append(item)
+                faces += len(item['rois'])
+
+            in_flight -= len(group)
+            submit_more()
+
+            # On the pool too, so a shared pool's size also caps concurrent model calls
+            pool.submit(self._classify, group).result()
+            for item in group:
+                done += 1
+                yield {k: item[k] for k in ('index', 'name', 'image', 'predictions', 'error')}
@@ -0,0 +1,197 @@
+"""
+Training Checkpoints
+--------------------
+Full-state checkpoints so a crashed run picks up where it left off
+instead of starting again from epoch 0.
+
+Every N steps we write model weights and optimizer slots (incl. the
+current learning rate) with tf.train.Checkpoint, then
+swap in a small state.json that says which checkpoint is current and
+where we were in the data:
+
+    models/checkpoints/
+        state.json              # {"epoch": 3, "step_in_epoch": 120, "prefix": "ckpt-1020", ...}
+        ckpt-1020.index
+        ckpt-1020.data-00000-of-00001
+
+state.json is only replaced after the checkpoint files are fully written,
+so a crash mid-save leaves the previous checkpoint in charge.
+"""
+
+import os
+import glob
+import json
+
+import tensorflow as tf
+
+
+STATE_FILE = 'state.json'
+
+# Counters the stock callbacks keep between epochs (EarlyStopping,
+# ReduceLROnPlateau, ModelCheckpoint). Anything a callback doesn't have is skipped.
+CALLBACK_STATE = ['wait', 'best', 'cooldown_counter', 'stopped_epoch', 'best_epoch']
+
+
+def load_training_state(checkpoint_dir):
+    """Returns the saved state dict, or None if there's nothing to resume"""
+    path = os.path.join(checkpoint_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠ Ignoring unreadable {path}: {e}")
+        return None
+
+
+def clear_training_state(checkpoint_dir):
+    """Removes state.json and every checkpoint file (called once a run finishes)"""
+    for path in glob.glob(os.path.join(checkpoint_dir, 'ckpt-*')) + [os.path.join(checkpoint_dir, STATE_FILE)]:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _write_json_atomic(path, data):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _current_lr(optimizer):
+    lr = optimizer.learning_rate
+    if callable(lr) and not isinstance(lr, tf.Variable):
+        lr = lr(optimizer.iterations)
+    return float(tf.keras.backend.get_value(lr))
+
+
+class TrainingStateCheckpoint(tf.keras.callbacks.Callback):
+    """
+    Saves (and on resume, restores) the whole training state.
+    Put it LAST in the callback list: it restores the other callbacks'
+    counters in on_train_begin, after they've reset themselves.
+
+    Args:
+        checkpoint_dir: Where checkpoints + state.json go
+        steps_per_epoch: Batches per full epoch (to track the data position)
+        every_n_steps: Save interval in training steps (epoch ends always save)
+        callbacks: The other callbacks whose counters should survive a restart
+        config: Anything that must match to resume (batch size, arch, ...)
+        keep: How many old checkpoints to keep around
+    """
+
+    def __init__(self, checkpoint_dir, steps_per_epoch, every_n_steps=500,
+                 callbacks=None, config=None, keep=1):
+        super().__init__()
+        self.checkpoint_dir = checkpoint_dir
+        self.steps_per_epoch = steps_per_epoch
+        self.every_n_steps = every_n_steps
+        self.callbacks = [cb for cb in (callbacks or []) if cb is not self]
+        self.config = config or {}
+        self.keep = keep
+
+        self.epoch = 0
+        self.step_in_epoch = 0
+        self.global_step = 0
+        self._resume_callbacks = None
+        self._prefixes = []
+        self._checkpoint = None
+
+        os.makedirs(checkpoint_dir, exist_ok=True)
+
+    def _tracked(self):
+        if self._checkpoint is None:
+            self._checkpoint = tf.train.Checkpoint(
+                model=self.model,
+                optimizer=self.model.optimizer
+            )
+        return self._checkpoint
+
+    def restore(self, state):
+        """Loads weights/optimizer from a state dict and remembers the data position"""
+        optimizer = self.model.optimizer
+        if hasattr(optimizer, 'build'):
+            # Slot variables have to exist before they can be restored into
+            optimizer.build(self.model.trainable_variables)
+
+        self._tracked().read(os.path.join(self.checkpoint_dir, state['prefix'])).expect_partial()
+
+        self.epoch = state['epoch']
+        self.step_in_epoch = state['step_in_epoch']
+        self.global_step = state['global_step']
+        self._resume_callbacks = state.get('callbacks', {})
+        self._prefixes = [state['prefix']]
+
+    def carry_callback_state(self):
+        """Keeps the other callbacks' counters across back-to-back fit() calls"""
+        self._resume_callbacks = self._callback_state()
+
+    def matches(self, state):
+        """True if a saved state was made with the same config as this run"""
+        return state.get('config', {}) == json.loads(json.dumps(self.config))
+
+    def save(self, epoch, step_in_epoch):
+        prefix = f'ckpt-{self.global_step}'
+        self._tracked().write(os.path.join(self.checkpoint_dir, prefix))
+
+        _write_json_atomic(os.path.join(self.checkpoint_dir, STATE_FILE), {
+            'epoch': epoch,
+            'step_in_epoch': step_in_epoch,
+            'global_step': self.global_step,
+            'prefix': prefix,
+            'lr': _current_lr(self.model.optimizer),
+            'config': self.config,
+            'callbacks': self._callback_state()
+        })
+
+        # Only now is it safe to drop the old ones
+        if prefix not in self._prefixes:
+            self._prefixes.append(prefix)
+        while len(self._prefixes) > self.keep:
+            old = self._prefixes.pop(0)
+            for path in glob.glob(os.path.join(self.checkpoint_dir, old + '.*')):
+                os.remove(path)
+
+    def _callback_state(self):
+        state = {}
+        for i, cb in enumerate(self.callbacks):
+            values = {}
+            for attr in CALLBACK_STATE:
+                value = getattr(cb, attr, None)
+                if isinstance(value, (int, float)) or hasattr(value, 'dtype'):
+                    values[attr] = float(value)
+            if values:
+                state[f'{i}:{type(cb).__name__}'] = values
+        return state
+
+    def on_train_begin(self, logs=None):
+        if not self._resume_callbacks:
+            return
+
+        for i, cb in enumerate(self.callbacks):
+            for attr, value in self._resume_callbacks.get(f'{i}:{type(cb).__name__}', {}).items():
+                current = getattr(cb, attr, None)
+                setattr(cb, attr, int(value) if isinstance(current, int) else value)
+        # EarlyStopping's best_weights don't survive a restart; it picks them up again on the next improvement
+        self._resume_callbacks = None
+
+    def on_epoch_begin(self, epoch, logs=None):
+        if epoch != self.epoch:
+            self.step_in_epoch = 0
+        self.epoch = epoch
+
+    def on_train_batch_end(self, batch, logs=None):
+        self.step_in_epoch += 1
+        self.global_step += 1
+        if self.every_n_steps and self.global_step % self.every_n_steps == 0 \
+                and self.step_in_epoch < self.steps_per_epoch:
+            self.save(self.epoch, self.step_in_epoch)
+
+    def on_epoch_end(self, epoch, logs=None):
+        # Runs after the other callbacks, so their counters already include this epoch
+        if self.step_in_epoch >= self.steps_per_epoch:
+            self.save(epoch + 1, 0)
@@ -0,0 +1,342 @@
+"""
+Training Data Pipeline
+----------------------
+tf.data input pipeline for training/validation.
+Files are decoded in parallel, cached as uint8, and augmented a whole
+batch at a time (one affine warp per batch instead of per image),
+so the CNN doesn't sit around waiting for Python to load pictures.
+"""
+
+import math
+import time
+import itertools
+
+import numpy as np
+import tensorflow as tf
+
+from core.shards import EMOTION_CLASSES, list_image_files, is_shard_dir, ShardReader
+
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+# Same ranges the old ImageDataGenerator used, scaled by `strength`
+AUGMENT_DEFAULTS = {
+    'rotation': 20,     # degrees
+    'shift': 0.2,       # fraction of width/height
+    'zoom': 0.2,        # +/- fraction
+    'flip': True,
+}
+
+
+def _decode_image(path, label, image_size=(48, 48)):
+    """Reads one file into a (48, 48, 1) uint8 tensor"""
+    raw = tf.io.read_file(path)
+    img = tf.io.decode_image(raw, channels=1, expand_animations=False)
+    img = tf.image.resize(img, image_size)
+    img = tf.cast(tf.round(img), tf.uint8)
+    img.set_shape((image_size[0], image_size[1], 1))
+    return img, label
+
+
+def augment_batch(images, strength=1.0, params=None, seed=None):
+    """
+    Random rotation/shift/zoom/flip for a whole float batch (B, H, W, C).
+    All four are folded into one affine matrix per image and applied with
+    a single batched warp. Pass a [2] int `seed` to make the randomness a
+    pure function of it (used for resumable training, see build_epoch_stream).
+    """
+    params = dict(AUGMENT_DEFAULTS, **(params or {}))
+
+    shape = tf.shape(images)
+    batch = shape[0]
+    h = tf.cast(shape[1], tf.float32)
+    w = tf.cast(shape[2], tf.float32)
+
+    draws = itertools.count()
+
+    def draw(minval, maxval):
+        if seed is not None:
+            # Own sub-seed per draw, all derived from the batch seed
+            sub_seed = tf.random.experimental.stateless_fold_in(seed, next(draws))
+            return tf.random.stateless_uniform([batch], sub_seed, minval, maxval)
+        return tf.random.uniform([batch], minval, maxval)
+
+    def uniform(limit):
+        return draw(-1.0, 1.0) * limit * strength
+
+    angle = uniform(params['rotation'] * math.pi / 180.0)
+    zoom = 1.0 + uniform(params['zoom'])
+    tx = uniform(params['shift']) * w
+    ty = uniform(params['shift']) * h
+
+    if params['flip']:
+        flip = tf.where(draw(0.0, 1.0) < 0.5, -1.0, 1.0)
+    else:
+        flip = tf.ones([batch])
+
+    # Maps each output pixel back to where it comes from in the input
+    cos = tf.cos(angle) / zoom
+    sin = tf.sin(angle) / zoom
+    cx = (w - 1.0) / 2.0
+    cy = (h - 1.0) / 2.0
+
+    a0 = cos * flip
+    a1 = -sin
+    b0 = sin * flip
+    b1 = cos
+    a2 = cx - a0 * cx - a1 * cy + tx
+    b2 = cy - b0 * cx - b1 * cy + ty
+    zeros = tf.zeros([batch])
+
+    transforms = tf.stack([a0, a1, a2, b0, b1, b2, zeros, zeros], axis=1)
+
+    return tf.raw_ops.ImageProjectiveTransformV3(
+        images=images,
+        transforms=transforms,
+        output_shape=shape[1:3],
+        fill_value=0.0,
+        interpolation='BILINEAR',
+        fill_mode='NEAREST'
+    )
+
+
+def prepare_batches(ds, training, num_classes=7, augment_strength=1.0, seeded=False):
+    """
+    Batched uint8 images -> scaled (+ augmented) floats with one-hot labels, prefetched.
+    With seeded=True elements are (images, labels, seed) and each batch is
+    augmented from its own seed, in order, so the output is reproducible.
+    """
+    def prepare(images, labels, seed=None):
+        images = tf.cast(images, tf.float32) / 255.0
+        if training and augment_strength > 0:
+            images = augment_batch(images, strength=augment_strength, seed=seed)
+        return images, tf.one_hot(labels, num_classes)
+
+    ds = ds.map(prepare, num_parallel_calls=AUTOTUNE, deterministic=True if seeded else None)
+
+    if training and not seeded:
+        # Order doesn't matter for training, so don't wait on slow batches
+        options = tf.data.Options()
+        options.deterministic = False
+        ds = ds.with_options(options)
+
+    return ds.prefetch(AUTOTUNE)
+
+
+def finalize_dataset(ds, batch_size, training, num_classes=7, augment_strength=1.0, shuffle_buffer=None):
+    """
+    Shared tail for any (uint8 image, int label) dataset:
+    shuffle -> batch -> batched augmentation + scaling -> prefetch.
+    """
+    if training:
+        ds = ds.shuffle(shuffle_buffer or 10000, reshuffle_each_iteration=True)
+
+    ds = ds.batch(batch_size)
+    return prepare_batches(ds, training, num_classes, augment_strength)
+
+
+def build_shard_dataset(shard_dir, batch_size=32, training=True, augment_strength=1.0):
+    """
+    tf.data pipeline over compiled shards (see core/shards.py).
+    Shuffles indices, not images, then gathers each batch straight out of
+    the memory-mapped arrays -- no decoding, no per-sample Python.
+    """
+    reader = ShardReader(shard_dir)
+    count = len(reader)
+
+    ds = tf.data.Dataset.range(count)
+    if training:
+        # Just int64s, so a full shuffle is cheap even for big datasets
+        ds = ds.shuffle(count, reshuffle_each_iteration=True)
+    ds = ds.batch(batch_size)
+
+    ds = ds.map(_shard_gather(reader), num_parallel_calls=AUTOTUNE)
+    return prepare_batches(ds, training, augment_strength=augment_strength), count
+
+
+def _shard_gather(reader):
+    """Batch of global indices -> (uint8 images (B, H, W, 1), int32 labels)"""
+    h, w = reader.image_size
+
+    def gather(indices):
+        images, labels = tf.numpy_function(reader.take, [indices], [tf.uint8, tf.uint8])
+        images = tf.reshape(images, [-1, h, w, 1])
+        labels = tf.cast(tf.reshape(labels, [-1]), tf.int32)
+        return images, labels
+
+    return gather
+
+
+def _decoded_images(data_path, cache=True):
+    """Unbatched (uint8 image, label) dataset over image folders, decoded in parallel"""
+    paths, labels = list_image_files(data_path)
+    if not paths:
+        raise FileNotFoundError(f"No images found under {data_path}")
+
+    ds = tf.data.Dataset.from_tensor_slices((paths, np.array(labels, dtype=np.int32)))
+
+    # Shuffle file order once up front so cached epochs aren't class-sorted
+    ds = ds.shuffle(len(paths), seed=42)
+    ds = ds.map(_decode_image, num_parallel_calls=AUTOTUNE)
+
+    # Decode once, reuse every epoch
+    if cache:
+        ds = ds.cache(cache if isinstance(cache, str) else '')
+
+    return ds, len(paths)
+
+
+def build_epoch_stream(data_path, batch_size=32, start_epoch=0, skip_batches=0, seed=42,
+                       augment_strength=1.0):
+    """
+    Training stream for resumable runs: every epoch's order depends only on
+    (seed, epoch), and each batch's augmentation only on (seed, epoch, batch
+    index), so a run can pick up at `start_epoch` after `skip_batches` batches
+    and see exactly the batches it would have seen without the crash.
+    Nothing random is stateful, so there's no RNG to checkpoint.
+    The stream is endless; use steps_per_epoch with fit().
+
+    Returns:
+        (dataset, number of images)
+    """
+    if is_shard_dir(data_path):
+        reader = ShardReader(data_path)
+        count = len(reader)
+
+        def epoch_batches(epoch):
+            return tf.data.Dataset.range(count).shuffle(count, seed=seed + epoch).batch(batch_size)
+
+        gather = _shard_gather(reader)
+    else:
+        images, count = _decoded_images(data_path)
+        buffer = min(count, 10000)
+
+        def epoch_batches(epoch):
+            return images.shuffle(buffer, seed=seed + epoch).batch(batch_size)
+
+        gather = None
+
+    def seeded_batches(epoch):
+        # Tag every batch with its own augmentation seed
+        def tag(index, batch):
+            batch = batch if isinstance(batch, tuple) else (batch,)
+            return batch + (tf.stack([tf.constant(seed, tf.int64), epoch * 2 ** 32 + index]),)
+        return epoch_batches(epoch).enumerate().map(tag)
+
+    ds = tf.data.Dataset.range(start_epoch, 2 ** 31).flat_map(seeded_batches).skip(skip_batches)
+    if gather is not None:
+        ds = ds.map(lambda indices, aug_seed: gather(indices) + (aug_seed,),
+                    num_parallel_calls=AUTOTUNE, deterministic=True)
+
+    return prepare_batches(ds, True, augment_strength=augment_strength, seeded=True), count
+
+
+def build_dataset(data_path, batch_size=32, training=True, augment_strength=1.0, cache=True):
+    """
+    Builds a tf.data pipeline over data_path/<emotion>/ folders.
+    If data_path is a compiled shard folder, reads the shards instead.
+
+    Args:
+        data_path: Folder with one subfolder per emotion
+        batch_size: Batch size
+        training: Shuffle + augment if True
+        augment_strength: Scales the augmentation ranges (0 turns it off)
+        cache: Keep decoded images in memory (True), on disk (a path), or not at all (False)
+
+    Returns:
+        (dataset, number of images)
+    """
+    if is_shard_dir(data_path):
+        return build_shard_dataset(data_path, batch_size, training, augment_strength)
+
+    ds, count = _decoded_images(data_path, cache)
+
+    ds = finalize_dataset(
+        ds, batch_size, training,
+        augment_strength=augment_strength,
+        shuffle_buffer=min(count, 10000)
+    )
+    return ds, count
+
+
+def count_images(data_path):
+    """How many training images are under data_path (image folders or shards), without building a pipeline"""
+    if is_shard_dir(data_path):
+        return len(ShardReader(data_path))
+
+    paths, _ = list_image_files(data_path)
+    if not paths:
+        raise FileNotFoundError(f"No images found under {data_path}")
+    return len(paths)
+
+
+def _legacy_generator(data_path, batch_size):
+    """The old ImageDataGenerator setup, kept only for benchmarking"""
+    from tensorflow.keras.preprocessing.image import ImageDataGenerator
+
+    datagen = ImageDataGenerator(
+        rescale=1./255,
+        rotation_range=20,
+        width_shift_range=0.2,
+        height_shift_range=0.2,
+        horizontal_flip=True,
+        zoom_range=0.2,
+        shear_range=0.2,
+        fill_mode='nearest'
+    )
+    return datagen.flow_from_directory(
+        data_path,
+        target_size=(48, 48),
+        color_mode='grayscale',
+        batch_size=batch_size,
+        class_mode='categorical',
+        shuffle=True
+    )
+
+
+def _time_batches(iterator, steps, warmup=5):
+    """Pulls `steps` batches as fast as possible and returns the seconds it took"""
+    for _ in range(warmup):
+        next(iterator)
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        next(iterator)
+    return time.perf_counter() - start
+
+
+def benchmark_input_pipeline(data_path, batch_size=32, steps=200, shard_dir=None):
+    """
+    Compares raw input throughput (images/sec) of the old
+    ImageDataGenerator against the tf.data pipeline, no model involved.
+    Pass shard_dir (compiled from the same images) to time the memmap path too.
+    """
+    print(f"\n⏱️ Benchmarking input pipelines on {data_path} ({steps} batches of {batch_size})")
+
+    legacy = _legacy_generator(data_path, batch_size)
+    legacy_ips = steps * batch_size / _time_batches(iter(legacy), steps)
+    print(f"   ImageDataGenerator: {legacy_ips:,.0f} images/sec")
+
+    ds, count = build_dataset(data_path, batch_size, training=True)
+    it = iter(ds.repeat())
+
+    # First epoch fills the cache, everything after is what training sees from epoch 2 on
+    cold_ips = count / _time_batches(it, math.ceil(count / batch_size), warmup=0)
+    warm_ips = steps * batch_size / _time_batches(it, steps)
+    print(f"   tf.data (cold):     {cold_ips:,.0f} images/sec")
+    print(f"   tf.data (cached):   {warm_ips:,.0f} images/sec")
+    print(f"   Speedup (cached):   {warm_ips / legacy_ips:.1f}x")
+
+    results = {
+        'image_data_generator': legacy_ips,
+        'tf_data_cold': cold_ips,
+        'tf_data_cached': warm_ips
+    }
+
+    if shard_dir:
+        shard_ds, _ = build_shard_dataset(shard_dir, batch_size, training=True)
+        shard_ips = steps * batch_size / _time_batches(iter(shard_ds.repeat()), steps)
+        print(f"   memmap shards:      {shard_ips:,.0f} images/sec")
+        results['memmap_shards'] = shard_ips
+
+    return results
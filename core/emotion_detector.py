@@ -7,14 +7,20 @@ Uses the CNN model to guess emotions from face images.
 
 import numpy as np
 import os
+import threading
+from core import metrics
 from core.ai_model import EmotionCNN, create_pretrained_model
+from core.backends import KerasBackend, TFLiteBackend
 from core.image_processor import ImagePreprocessor
 
 
 class EmotionPredictor:
     def __init__(self, model_path='models/emotion_model.h5'):
         self.model_path = model_path
-        self.preprocessor = ImagePreprocessor()
+        # One cascade per thread: the predictor is shared by every session,
+        # the live stream and the API workers, and OpenCV doesn't promise
+        # detectMultiScale is thread-safe
+        self._local = threading.local()
         
         # Standard 7 emotions for FER
         self.labels = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
@@ -32,14 +38,31 @@ class EmotionPredictor:
         }
         
         self.model = None
+        self.backend = None
         self._init_model()
     
+    @property
+    def preprocessor(self):
+        """This thread's ImagePreprocessor (made on first use)"""
+        if not hasattr(self._local, 'preprocessor'):
+            self._local.preprocessor = ImagePreprocessor()
+        return self._local.preprocessor
+    
     def _init_model(self):
         """Helper to load or create the model if it doesn't exist"""
+        # Compressed int8 models from train.py --compress
+        if self.model_path.endswith('.tflite') and os.path.exists(self.model_path):
+            try:
+                self.backend = TFLiteBackend(self.model_path)
+                print("Loaded TFLite model!")
+                return
+            except Exception as e:
+                print(f"TFLite load failed, falling back to Keras: {e}")
+        
         try:
             cnn = EmotionCNN()
             
-            if os.path.exists(self.model_path):
+            if os.path.exists(self.model_path) and not self.model_path.endswith('.tflite'):
                 cnn.load_model(self.model_path)
                 self.model = cnn.model
                 print("Loaded pre-trained model!")
@@ -55,6 +78,40 @@ class EmotionPredictor:
             # Fallback just in case
             cnn = create_pretrained_model()
             self.model = cnn.model
+        
+        self.backend = KerasBackend(self.model)
+    
+    def predict_probs(self, batch):
+        """Raw class probabilities for a (B, 48, 48, 1) batch, whatever the backend"""
+        return self.backend.predict(batch)
+    
+    def _pack_result(self, probs):
+        """Model output for one face -> the dict the UI and DB code expect"""
+        # Find the strongest emotion
+        idx = np.argmax(probs)
+        top_emotion = self.labels[idx]
+        conf = probs[idx] * 100
+        
+        # Pack everything up
+        all_emotions = {}
+        for i, label in enumerate(self.labels):
+            all_emotions[label] = float(probs[i] * 100)
+        
+        return {
+            'dominant_emotion': top_emotion,  # keeping key names for compatibility
+            'confidence': float(conf),
+            'all_emotions': all_emotions,
+            'emotion_color': self.colors[top_emotion]
+        }
+    
+    def _unknown_result(self):
+        # Dummy data if something breaks
+        return {
+            'dominant_emotion': 'Unknown',
+            'confidence': 0.0,
+            'all_emotions': {l: 0.0 for l in self.labels},
+            'emotion_color': (128, 128, 128)
+        }
     
     def predict_emotion(self, face_img):
         """Predicts emotion for a single face crop"""
@@ -63,67 +120,71 @@ class EmotionPredictor:
             processed = self.preprocessor.preprocess_face(face_img)
             
             # Get raw predictions
-            raw_preds = self.model.predict(processed, verbose=0)
-            probs = raw_preds[0]
-            
-            # Find the strongest emotion
-            idx = np.argmax(probs)
-            top_emotion = self.labels[idx]
-            conf = probs[idx] * 100
-            
-            # Pack everything up
-            all_emotions = {}
-            for i, label in enumerate(self.labels):
-                all_emotions[label] = float(probs[i] * 100)
-            
-            return {
-                'dominant_emotion': top_emotion,  # keeping key names for compatibility
-                'confidence': float(conf),
-                'all_emotions': all_emotions,
-                'emotion_color': self.colors[top_emotion]
-            }
+            raw_preds = self.predict_probs(processed)
+            return self._pack_result(raw_preds[0])
             
         except Exception as e:
             print(f"Prediction error: {e}")
-            # Return dummy data if something breaks
-            return {
-                'dominant_emotion': 'Unknown',
-                'confidence': 0.0,
-                'all_emotions': {l: 0.0 for l in self.labels},
-                'emotion_color': (128, 128, 128)
-            }
+            return self._unknown_result()
     
-    def predict_from_image(self, image):
-        """Main function to handle full images"""
-        results = []
+    def predict_faces(self, face_imgs, raise_errors=False):
+        """
+        Predicts emotions for many face crops with a single model call.
+        With raise_errors=True failures propagate instead of becoming 'Unknown' results.
+        """
+        if len(face_imgs) == 0:
+            return []
         
+        try:
+            with metrics.timer('stage_classify'):
+                batch = np.concatenate([self.preprocessor.preprocess_face(f) for f in face_imgs])
+                raw_preds = self.predict_probs(batch)
+            metrics.count('faces_classified', len(face_imgs))
+            return [self._pack_result(probs) for probs in raw_preds]
+            
+        except Exception as e:
+            if raise_errors:
+                raise
+            print(f"Batch prediction error: {e}")
+            return [self._unknown_result() for _ in face_imgs]
+    
+    def predict_from_image(self, image, raise_errors=False):
+        """
+        Main function to handle full images
+        
+        Args:
+            image: RGB numpy array
+            raise_errors: Let failures propagate instead of returning [] (the API
+                needs to tell a server fault from "no faces")
+        """
+        preprocessor = self.preprocessor
         try:
             # First, find all faces
-            faces = self.preprocessor.detect_faces(image)
+            with metrics.timer('stage_detect'):
+                faces = preprocessor.detect_faces(image)
+            metrics.count('images_analyzed')
             
-            if not faces:
+            if len(faces) == 0:
                 return []
             
-            # Loop through each face found
-            for i, (x, y, w, h) in enumerate(faces):
-                # Cut out the face
-                roi = self.preprocessor.extract_face_roi(image, (x, y, w, h))
-                
-                # Get the emotion
-                res = self.predict_emotion(roi)
-                
-                # Add location data
-                res['face_coords'] = (int(x), int(y), int(w), int(h))
-                res['face_number'] = i + 1
-                
-                results.append(res)
-            
-            return results
+            # Cut out every face, then one model call for all of them
+            rois = [preprocessor.extract_face_roi(image, tuple(f)) for f in faces]
+            return self.attach_faces(faces, self.predict_faces(rois, raise_errors=raise_errors))
             
         except Exception as e:
+            if raise_errors:
+                raise
             print(f"Image processing failed: {e}")
             return []
     
+    @staticmethod
+    def attach_faces(faces, preds):
+        """Adds location data (face_coords, face_number) to per-face predictions"""
+        for i, ((x, y, w, h), res) in enumerate(zip(faces, preds)):
+            res['face_coords'] = (int(x), int(y), int(w), int(h))
+            res['face_number'] = i + 1
+        return list(preds)
+    
     def annotate_image(self, image, preds):
         """Draws boxes and labels on the image"""
         # Work on a copy so we don't mess up the original
@@ -0,0 +1,279 @@
+"""
+Model Evaluation
+----------------
+One pass over a held-out set that reports accuracy and speed together,
+so a model change that costs accuracy or latency shows up straight away:
+
+- per-class precision / recall / F1 and the confusion matrix
+- calibration (expected calibration error + reliability bins)
+- throughput and per-batch latency percentiles at a big batch size,
+  plus single-face latency (what the app sees)
+
+Works on anything load_backend() can open (.h5 or .tflite).
+
+    python -m core.evaluate models/emotion_model.h5 --data data/test
+    python -m core.evaluate models/emotion_model_int8.tflite --data data/shards/test \\
+        --baseline models/eval/emotion_model.json
+"""
+
+import os
+import json
+import time
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from core.shards import EMOTION_CLASSES
+
+
+CALIBRATION_BINS = 10
+
+# How much worse than the baseline counts as a regression.
+# Quality metrics are absolute, speed metrics are relative.
+REGRESSION_TOLERANCE = {
+    'accuracy': 0.005,
+    'macro_f1': 0.005,
+    'ece': 0.01,
+    'images_per_sec': 0.10,
+    'single_p95_ms': 0.15,
+}
+
+EVAL_HISTORY = 'models/eval/history.jsonl'
+
+
+def confusion_matrix(y_true, y_pred, num_classes):
+    """cm[i, j] = how many class-i samples were predicted as class j"""
+    flat = np.asarray(y_true) * num_classes + np.asarray(y_pred)
+    return np.bincount(flat, minlength=num_classes ** 2).reshape(num_classes, num_classes)
+
+
+def per_class_metrics(cm, class_names=EMOTION_CLASSES):
+    """Precision, recall, F1 and support for each class from a confusion matrix"""
+    tp = np.diag(cm).astype(float)
+    predicted = cm.sum(axis=0)
+    actual = cm.sum(axis=1)
+
+    precision = np.divide(tp, predicted, out=np.zeros_like(tp), where=predicted > 0)
+    recall = np.divide(tp, actual, out=np.zeros_like(tp), where=actual > 0)
+    denom = precision + recall
+    f1 = np.divide(2 * precision * recall, denom, out=np.zeros_like(tp), where=denom > 0)
+
+    return {
+        name: {
+            'precision': float(precision[i]),
+            'recall': float(recall[i]),
+            'f1': float(f1[i]),
+            'support': int(actual[i])
+        }
+        for i, name in enumerate(class_names)
+    }
+
+
+def calibration(confidences, correct, bins=CALIBRATION_BINS):
+    """
+    Expected / max calibration error over equal-width confidence bins.
+    A well calibrated model that says 0.8 is right about 80% of the time.
+    """
+    confidences = np.asarray(confidences, dtype=float)
+    correct = np.asarray(correct, dtype=float)
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    which = np.clip(np.digitize(confidences, edges[1:-1]), 0, bins - 1)
+
+    table = []
+    ece, mce = 0.0, 0.0
+    for b in range(bins):
+        mask = which == b
+        count = int(mask.sum())
+        if not count:
+            continue
+
+        conf = float(confidences[mask].mean())
+        acc = float(correct[mask].mean())
+        gap = abs(conf - acc)
+        ece += gap * count / len(confidences)
+        mce = max(mce, gap)
+        table.append({'lo': float(edges[b]), 'hi': float(edges[b + 1]),
+                      'count': count, 'confidence': conf, 'accuracy': acc})
+
+    return {'ece': ece, 'mce': mce, 'bins': table}
+
+
+def evaluate_model(model, data_path, batch_size=256, latency_runs=100):
+    """
+    Runs `model` (a path or a backend) over every image in data_path once.
+
+    Args:
+        model: .h5/.tflite path, or an already loaded backend
+        data_path: Held-out image folders or compiled shards
+        batch_size: Inference batch size for the throughput pass
+        latency_runs: Single-face calls for the per-face latency numbers
+
+    Returns:
+        Report dict (JSON-serialisable)
+    """
+    from core.ai_model import measure_latency
+    from core.backends import load_backend
+    from core.data_pipeline import build_dataset
+
+    model_path = model if isinstance(model, str) else getattr(model, 'path', None)
+    backend = load_backend(model) if isinstance(model, str) else model
+
+    ds, count = build_dataset(data_path, batch_size=batch_size, training=False)
+
+    all_probs, all_labels, batch_ms = [], [], []
+    warmed_up = False
+
+    for images, labels in ds.as_numpy_iterator():
+        if not warmed_up:
+            # First call pays for tracing/allocation, keep it out of the numbers
+            backend.predict(images)
+            warmed_up = True
+
+        start = time.perf_counter()
+        probs = backend.predict(images)
+        batch_ms.append((time.perf_counter() - start) * 1000)
+
+        all_probs.append(np.asarray(probs))
+        all_labels.append(np.argmax(labels, axis=-1))
+
+    if not all_probs:
+        raise ValueError(f"No images found under {data_path}")
+
+    probs = np.concatenate(all_probs)
+    y_true = np.concatenate(all_labels)
+    y_pred = np.argmax(probs, axis=-1)
+    num_classes = probs.shape[1]
+
+    cm = confusion_matrix(y_true, y_pred, num_classes)
+    classes = per_class_metrics(cm, EMOTION_CLASSES[:num_classes])
+    calib = calibration(probs.max(axis=-1), y_pred == y_true)
+    single = measure_latency(backend, runs=latency_runs)
+
+    return {
+        'model': model_path,
+        'backend': getattr(backend, 'name', type(backend).__name__),
+        'data': data_path,
+        'evaluated_at': datetime.now().isoformat(timespec='seconds'),
+        'samples': int(len(y_true)),
+        'accuracy': float(np.mean(y_pred == y_true)),
+        'macro_f1': float(np.mean([c['f1'] for c in classes.values()])),
+        'per_class': classes,
+        'confusion_matrix': cm.tolist(),
+        'ece': calib['ece'],
+        'mce': calib['mce'],
+        'calibration_bins': calib['bins'],
+        'batch_size': batch_size,
+        'images_per_sec': float(len(y_true) / (sum(batch_ms) / 1000)),
+        'batch_p50_ms': float(np.percentile(batch_ms, 50)),
+        'batch_p95_ms': float(np.percentile(batch_ms, 95)),
+        'batch_p99_ms': float(np.percentile(batch_ms, 99)),
+        'single_p50_ms': single['p50_ms'],
+        'single_p95_ms': single['p95_ms'],
+    }
+
+
+def compare_reports(report, baseline, tolerance=None):
+    """
+    Returns a list of human readable regressions vs an earlier report
+    (empty list = nothing got meaningfully worse).
+    """
+    tolerance = dict(REGRESSION_TOLERANCE, **(tolerance or {}))
+    regressions = []
+
+    for key in ('accuracy', 'macro_f1'):
+        drop = baseline[key] - report[key]
+        if drop > tolerance[key]:
+            regressions.append(f"{key} {baseline[key]:.4f} -> {report[key]:.4f}")
+
+    if report['ece'] - baseline['ece'] > tolerance['ece']:
+        regressions.append(f"ece {baseline['ece']:.4f} -> {report['ece']:.4f}")
+
+    if report['images_per_sec'] < baseline['images_per_sec'] * (1 - tolerance['images_per_sec']):
+        regressions.append(f"images/sec {baseline['images_per_sec']:,.0f} -> {report['images_per_sec']:,.0f}")
+
+    if report['single_p95_ms'] > baseline['single_p95_ms'] * (1 + tolerance['single_p95_ms']):
+        regressions.append(f"single-face p95 {baseline['single_p95_ms']:.2f}ms -> {report['single_p95_ms']:.2f}ms")
+
+    return regressions
+
+
+def print_report(report, baseline=None):
+    print(f"\n📊 {report['model'] or report['backend']} on {report['data']} ({report['samples']} images)")
+
+    def delta(key, fmt):
+        if not baseline or key not in baseline:
+            return ''
+        return f"  ({report[key] - baseline[key]:{fmt}})"
+
+    print(f"   Accuracy:        {report['accuracy']:.4f}{delta('accuracy', '+.4f')}")
+    print(f"   Macro F1:        {report['macro_f1']:.4f}{delta('macro_f1', '+.4f')}")
+    print(f"   ECE / MCE:       {report['ece']:.4f} / {report['mce']:.4f}{delta('ece', '+.4f')}")
+    print(f"   Throughput:      {report['images_per_sec']:,.0f} images/sec at batch {report['batch_size']}"
+          f"{delta('images_per_sec', '+,.0f')}")
+    print(f"   Batch latency:   p50 {report['batch_p50_ms']:.1f}ms  p95 {report['batch_p95_ms']:.1f}ms  "
+          f"p99 {report['batch_p99_ms']:.1f}ms")
+    print(f"   Single face:     p50 {report['single_p50_ms']:.2f}ms  p95 {report['single_p95_ms']:.2f}ms"
+          f"{delta('single_p95_ms', '+.2f')}")
+
+    print(f"\n   {'Class':<10} {'Precision':>9} {'Recall':>8} {'F1':>8} {'Support':>8}")
+    for name, c in report['per_class'].items():
+        print(f"   {name:<10} {c['precision']:>9.3f} {c['recall']:>8.3f} {c['f1']:>8.3f} {c['support']:>8}")
+
+    names = list(report['per_class'])
+    print("\n   Confusion matrix (rows = true, cols = predicted)")
+    print("   " + " " * 10 + "".join(f"{n[:7]:>8}" for n in names))
+    for name, row in zip(names, report['confusion_matrix']):
+        print(f"   {name:<10}" + "".join(f"{v:>8}" for v in row))
+
+
+def save_report(report, path, history_path=EVAL_HISTORY):
+    """Writes the full report and appends the headline numbers to the history log"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+
+    if history_path:
+        os.makedirs(os.path.dirname(history_path) or '.', exist_ok=True)
+        headline = {k: report[k] for k in ('evaluated_at', 'model', 'backend', 'data', 'samples', 'accuracy',
+                                           'macro_f1', 'ece', 'images_per_sec', 'single_p50_ms', 'single_p95_ms')}
+        with open(history_path, 'a') as f:
+            f.write(json.dumps(headline) + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate a saved emotion model (accuracy + speed)")
+    parser.add_argument('model', help=".h5 or .tflite model")
+    parser.add_argument('--data', default='data/test' if os.path.exists('data/test') else 'data/validation',
+                        help="Held-out image folders or compiled shards")
+    parser.add_argument('--batch-size', type=int, default=256)
+    parser.add_argument('--latency-runs', type=int, default=100)
+    parser.add_argument('--out', help="Report path (default: models/eval/<model name>.json)")
+    parser.add_argument('--baseline', help="Earlier report to compare against; exits 1 on a regression")
+    parser.add_argument('--no-history', action='store_true', help=f"Don't append to {EVAL_HISTORY}")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = evaluate_model(args.model, args.data, batch_size=args.batch_size, latency_runs=args.latency_runs)
+    print_report(report, baseline)
+
+    out = args.out or os.path.join('models', 'eval', os.path.splitext(os.path.basename(args.model))[0] + '.json')
+    save_report(report, out, history_path=None if args.no_history else EVAL_HISTORY)
+    print(f"\n✓ Report saved to {out}")
+
+    if baseline:
+        regressions = compare_reports(report, baseline)
+        if regressions:
+            print(f"\n❌ Regressions vs {args.baseline}:")
+            for r in regressions:
+                print(f"   - {r}")
+            raise SystemExit(1)
+        print(f"\n✅ No regressions vs {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
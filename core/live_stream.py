@@ -0,0 +1,235 @@
+"""
+Live Stream
+-----------
+Continuous analysis of a camera feed without ever falling behind.
+
+Two background threads:
+- the capture thread reads frames as they come (a camera index like "0",
+  or a video file that loops, standing in for a camera) and keeps ONLY
+  the newest one; anything that wasn't picked up in time is dropped
+  (still BGR, so a dropped frame only ever cost a read())
+- the analysis thread grabs the newest frame, runs detection + the CNN,
+  and publishes the result, at most `target_fps` times a second
+
+So if inference is slower than the camera, we skip frames instead of
+building a queue, and what's on screen is never more than one inference old.
+With a MotionGate (core/motion.py), frames where nothing changed skip
+detection entirely and keep the previous result.
+
+    analyzer = LiveAnalyzer(predictor, FrameSource('0'), target_fps=5, gate=MotionGate())
+    analyzer.start()
+    result = analyzer.latest()   # {'seq', 'frame', 'predictions', 'latency_ms', ...}
+    analyzer.stats()             # fps, latency, dropped frames
+    analyzer.stop()
+"""
+
+import os
+import time
+import threading
+from collections import deque
+
+import numpy as np
+
+from core import metrics
+
+
+DEFAULT_SOURCE = os.environ.get('EMOTION_CAMERA_SOURCE', '0')
+
+# Stop the threads if nobody has looked at the results for this long
+# (e.g. the browser tab was closed)
+IDLE_TIMEOUT = 15.0
+
+
+class FrameSource:
+    """Latest-frame-only reader over cv2.VideoCapture"""
+
+    def __init__(self, source=DEFAULT_SOURCE, loop=True):
+        self.source = source
+        self.is_file = not str(source).isdigit()
+        self.loop = loop and self.is_file
+
+        self._cap = None
+        self._lock = threading.Lock()
+        self._frame = None
+        self._frame_time = 0.0
+        self._seq = 0
+        self._taken_seq = 0
+
+        self.captured = 0
+        self.dropped = 0
+        self.error = None
+
+    def open(self):
+        import cv2
+
+        self._cap = cv2.VideoCapture(int(self.source) if not self.is_file else self.source)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Can't open video source {self.source!r}")
+
+        # Files play at their own frame rate, cameras block on read() anyway
+        fps = self._cap.get(cv2.CAP_PROP_FPS) or 30.0
+        self._frame_interval = 1.0 / fps if self.is_file else 0.0
+
+    def read_loop(self, stop_event):
+        """Capture thread body: keep overwriting the slot with the newest frame"""
+        import cv2
+
+        while not stop_event.is_set():
+            started = time.perf_counter()
+            ok, frame = self._cap.read()
+
+            if not ok:
+                if self.loop:
+                    self._cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                self.error = "Video source ended"
+                break
+
+            with self._lock:
+                if self._seq > self._taken_seq:
+                    # Previous frame never got analyzed
+                    self.dropped += 1
+                self._frame = frame
+                self._frame_time = time.perf_counter()
+                self._seq += 1
+                self.captured += 1
+
+            if self._frame_interval:
+                time.sleep(max(0.0, self._frame_interval - (time.perf_counter() - started)))
+
+        self._cap.release()
+
+    def take_latest(self):
+        """(seq, RGB frame, capture time) of the newest frame not handed out yet, or None"""
+        import cv2
+
+        with self._lock:
+            if self._frame is None or self._seq == self._taken_seq:
+                return None
+            self._taken_seq = self._seq
+            seq, frame, frame_time = self._seq, self._frame, self._frame_time
+
+        # Only frames that actually get looked at pay for the conversion (on the analysis thread)
+        return seq, cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), frame_time
+
+
+class LiveAnalyzer:
+    """
+    Args:
+        predictor: A loaded EmotionPredictor
+        source: FrameSource to read from
+        target_fps: Max analyses per second (lower = less CPU)
+        gate: Optional MotionGate; unchanged frames reuse the last result
+    """
+
+    def __init__(self, predictor, source, target_fps=5.0, gate=None):
+        self.predictor = predictor
+        self.source = source
+        self.target_fps = target_fps
+        self.gate = gate
+
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._latest = None
+        self._last_polled = time.perf_counter()
+
+        # Sliding windows for the on-screen numbers
+        self._done_times = deque(maxlen=30)
+        self._latencies = deque(maxlen=30)
+        self.analyzed = 0
+        # Why the analysis thread quit on its own (None while running or after stop())
+        self.stopped_reason = None
+
+    def start(self):
+        self.source.open()
+        self._threads = [
+            threading.Thread(target=self.source.read_loop, args=(self._stop,), name='live-capture', daemon=True),
+            threading.Thread(target=self._analyze_loop, name='live-analyze', daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    @property
+    def running(self):
+        return not self._stop.is_set() and any(t.is_alive() for t in self._threads)
+
+    def _analyze_loop(self):
+        interval = 1.0 / self.target_fps if self.target_fps else 0.0
+
+        while not self._stop.is_set():
+            started = time.perf_counter()
+
+            if started - self._last_polled > IDLE_TIMEOUT:
+                # No print from here, nobody reads the server log; the page shows it via stats()
+                self.stopped_reason = f"Stopped after {IDLE_TIMEOUT:.0f}s with nobody watching"
+                self.stop()
+                break
+
+            taken = self.source.take_latest()
+            if taken is None:
+                if self.source.error:
+                    break
+                time.sleep(0.005)
+                continue
+
+            seq, frame, captured_at = taken
+
+            if self.gate is not None and self._latest is not None and not self.gate.should_analyze(frame):
+                # Nothing moved: keep showing the last result, skip detection + CNN
+                if interval:
+                    time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+                continue
+
+            with metrics.timer('live_inference'):
+                preds = self.predictor.predict_from_image(frame)
+
+            now = time.perf_counter()
+            latency = now - captured_at
+            metrics.record('live_latency', latency)
+
+            with self._lock:
+                self._latest = {
+                    'seq': seq,
+                    'frame': frame,
+                    'predictions': preds,
+                    'latency_ms': latency * 1000,
+                    'inference_ms': (now - started) * 1000
+                }
+                self._done_times.append(now)
+                self._latencies.append(latency * 1000)
+                self.analyzed += 1
+
+            # Pace ourselves to target_fps; the capture thread keeps dropping meanwhile
+            if interval:
+                time.sleep(max(0.0, interval - (time.perf_counter() - started)))
+
+    def latest(self):
+        """Newest result (or None yet); also tells the idle watchdog someone is watching"""
+        self._last_polled = time.perf_counter()
+        with self._lock:
+            return self._latest
+
+    def stats(self):
+        with self._lock:
+            times = list(self._done_times)
+            latencies = list(self._latencies)
+
+        fps = (len(times) - 1) / (times[-1] - times[0]) if len(times) > 1 and times[-1] > times[0] else 0.0
+        # Analyses stop while the scene is still, so the window can be stale
+        if times and time.perf_counter() - times[-1] > 2.0:
+            fps = 0.0
+        return {
+            'fps': fps,
+            'latency_p50_ms': float(np.percentile(latencies, 50)) if latencies else 0.0,
+            'latency_p95_ms': float(np.percentile(latencies, 95)) if latencies else 0.0,
+            'captured': self.source.captured,
+            'analyzed': self.analyzed,
+            'dropped': self.source.dropped,
+            'error': self.source.error or self.stopped_reason,
+            'motion': self.gate.stats() if self.gate is not None else None
+        }
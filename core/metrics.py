@@ -0,0 +1,212 @@
+"""
+Metrics
+-------
+Tiny in-process timing registry (stdlib only, safe to import anywhere,
+including before TensorFlow is loaded).
+
+    from core import metrics
+
+    with metrics.timer('model_load'):
+        ...
+    metrics.record('time_to_first_paint', 0.42)
+    metrics.count('faces_classified', 3)
+    metrics.summary()   # {'model_load': {'count': 1, 'last_ms': ..., 'p50_ms': ...}, ...}
+    metrics.rate('faces_classified')    # per second, over the last minute
+
+Every timing and counter also lands in a per-second ring buffer (the last
+RATE_WINDOW seconds), which is what rates and the ops page charts read.
+Recording is an O(1) append; all the math happens only when someone asks.
+"""
+
+import os
+import time
+import threading
+from collections import defaultdict, deque
+
+
+# Keep the last N samples per metric, plenty for percentiles
+MAX_SAMPLES = 1000
+
+# Seconds of per-second history kept for rates / time series
+RATE_WINDOW = 300
+
+_lock = threading.Lock()
+_samples = defaultdict(lambda: deque(maxlen=MAX_SAMPLES))
+_counts = defaultdict(int)
+_gauges = defaultdict(int)
+
+
+class _SecondRing:
+    """Fixed-size ring of per-second (count, total) slots, overwritten as time moves on"""
+
+    def __init__(self, size=RATE_WINDOW):
+        self.size = size
+        self.seconds = [-1] * size
+        self.counts = [0] * size
+        self.totals = [0.0] * size
+
+    def add(self, now, value):
+        sec = int(now)
+        i = sec % self.size
+        if self.seconds[i] != sec:
+            self.seconds[i] = sec
+            self.counts[i] = 0
+            self.totals[i] = 0.0
+        self.counts[i] += 1
+        self.totals[i] += value
+
+    def window(self, now, seconds):
+        """[(second, count, total), ...] for the last `seconds` seconds, oldest first, gaps as zeros"""
+        end = int(now)
+        out = []
+        for sec in range(end - min(seconds, self.size) + 1, end + 1):
+            i = sec % self.size
+            if self.seconds[i] == sec:
+                out.append((sec, self.counts[i], self.totals[i]))
+            else:
+                out.append((sec, 0, 0.0))
+        return out
+
+
+_rings = defaultdict(_SecondRing)
+
+
+def record(name, seconds):
+    """Adds one timing sample (in seconds)"""
+    with _lock:
+        _samples[name].append(seconds)
+        _counts[name] += 1
+        _rings[name].add(time.time(), seconds)
+
+
+def count(name, n=1):
+    """Bumps a counter (e.g. faces classified); shows up in rate() and series()"""
+    with _lock:
+        _counts[name] += n
+        _rings[name].add(time.time(), n)
+
+
+def gauge_add(name, delta):
+    """Moves a level up or down (e.g. open DB connections)"""
+    with _lock:
+        _gauges[name] += delta
+
+
+def gauges():
+    with _lock:
+        return dict(_gauges)
+
+
+class timer:
+    """Context manager that records how long its block took"""
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = None
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.seconds = time.perf_counter() - self._start
+        record(self.name, self.seconds)
+        return False
+
+
+def _percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def summary():
+    """Per-metric count, last value and percentiles, all in milliseconds"""
+    with _lock:
+        snapshot = {name: (list(values), _counts[name]) for name, values in _samples.items()}
+
+    result = {}
+    for name, (values, count) in snapshot.items():
+        ordered = sorted(values)
+        result[name] = {
+            'count': count,
+            'last_ms': values[-1] * 1000 if values else 0.0,
+            'p50_ms': _percentile(ordered, 50) * 1000,
+            'p95_ms': _percentile(ordered, 95) * 1000,
+            'p99_ms': _percentile(ordered, 99) * 1000,
+        }
+    return result
+
+
+def rate(name, window=60):
+    """
+    Events per second over the last `window` seconds. For counters that's the
+    summed amounts (faces/s), for timings the number of samples (requests/s).
+    """
+    with _lock:
+        ring = _rings.get(name)
+        if ring is None:
+            return 0.0
+        slots = ring.window(time.time(), window)
+
+    if name in _samples:
+        return sum(c for _, c, _ in slots) / window
+    return sum(t for _, _, t in slots) / window
+
+
+def series(name, window=RATE_WINDOW):
+    """
+    Per-second history for charts: [(unix_second, events, mean_ms), ...].
+    mean_ms is only meaningful for timings (0 for counters).
+    """
+    with _lock:
+        ring = _rings.get(name)
+        if ring is None:
+            return []
+        slots = ring.window(time.time(), window)
+        is_timing = name in _samples
+
+    if is_timing:
+        return [(sec, c, t / c * 1000 if c else 0.0) for sec, c, t in slots]
+    return [(sec, t, 0.0) for sec, _, t in slots]
+
+
+def counters():
+    """Running totals of everything bumped through count()"""
+    with _lock:
+        return {name: total for name, total in _counts.items() if name not in _samples}
+
+
+def names():
+    """Every metric that has been recorded so far (timings and counters)"""
+    with _lock:
+        return sorted(_rings)
+
+
+def process_memory_mb():
+    """Resident memory of this process in MB (psutil if we have it, /proc otherwise)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 1e6
+    except ImportError:
+        pass
+
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 1e6
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # Peak rather than current, but better than nothing (KB on Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+
+
+def reset():
+    """
+    Clears timings, counters and series. Gauges are left alone: they track
+    live things (e.g. open DB connections) that will still go down later.
+    """
+    with _lock:
+        _samples.clear()
+        _counts.clear()
+        _rings.clear()
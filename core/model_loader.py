@@ -0,0 +1,99 @@
+"""
+Model Loader
+------------
+Loads the EmotionPredictor on a background thread so the login page
+doesn't have to wait for TensorFlow/OpenCV. One predictor per process,
+shared by every Streamlit session.
+
+Importing this module is cheap: the heavy imports happen on the loader
+thread. Call start_warmup() as early as possible (e.g. while the login
+page is showing) and get_predictor() when a page actually needs it.
+"""
+
+import threading
+
+from core import metrics
+
+
+DEFAULT_MODEL_PATH = 'models/emotion_model.h5'
+
+_lock = threading.Lock()
+_thread = None
+_ready = threading.Event()
+_predictor = None
+_error = None
+
+
+def _load(model_path):
+    global _predictor, _error
+
+    try:
+        with metrics.timer('model_import'):
+            import numpy as np
+            from core.emotion_detector import EmotionPredictor
+
+        with metrics.timer('model_load'):
+            predictor = EmotionPredictor(model_path=model_path)
+
+        # One dummy pass through the detector and the model so the first
+        # real request doesn't pay for graph tracing / allocation
+        with metrics.timer('model_warmup'):
+            predictor.preprocessor.detect_faces(np.zeros((96, 96, 3), dtype=np.uint8))
+            predictor.predict_probs(np.zeros((1, 48, 48, 1), dtype=np.float32))
+
+        _predictor = predictor
+    except Exception as e:
+        # No print, this runs once per process where nobody reads stdout;
+        # status() hands it to the UI and the ops page instead
+        _error = e
+        metrics.count('model_load_failed')
+    finally:
+        _ready.set()
+
+
+def start_warmup(model_path=DEFAULT_MODEL_PATH):
+    """Kicks off the background load (no-op if it's already running or done)"""
+    global _thread
+
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(target=_load, args=(model_path,), name='model-warmup', daemon=True)
+            _thread.start()
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def get_predictor(timeout=None):
+    """
+    The shared predictor, waiting for the background load if needed.
+    Falls back to loading in this thread if the background load failed
+    (the failure stays in status() so the UI can still say so).
+    """
+    global _predictor
+
+    start_warmup()
+    _ready.wait(timeout)
+
+    if _predictor is None and _ready.is_set():
+        with _lock:
+            if _predictor is None:
+                from core.emotion_detector import EmotionPredictor
+                _predictor = EmotionPredictor()
+
+    return _predictor
+
+
+def status():
+    """What the ops page shows about the model, without ever triggering a load"""
+    if _predictor is not None:
+        backend = getattr(_predictor.backend, 'name', type(_predictor.backend).__name__)
+        info = {'state': 'ready', 'backend': backend, 'model_path': _predictor.model_path}
+        if _error is not None:
+            # Background load failed, this one came from the fallback in get_predictor
+            info['error'] = f"Background load failed: {_error}"
+        return info
+    if _error is not None:
+        return {'state': 'failed', 'backend': None, 'model_path': None, 'error': str(_error)}
+    return {'state': 'loading' if _thread is not None else 'not started', 'backend': None, 'model_path': None}
@@ -0,0 +1,83 @@
+"""
+Motion Gate
+-----------
+Cheap "did anything change?" check for camera feeds, so an empty or
+static scene doesn't go through face detection and the CNN every frame.
+
+Each frame is shrunk to a tiny grayscale thumbnail (plain array striding,
+no OpenCV) and compared with the thumbnail of the last frame we actually
+analyzed. If fewer than `changed_fraction` of its pixels moved by more
+than `pixel_threshold` gray levels, the frame is skipped and the caller
+reuses the last result. Every `max_skip_seconds` we analyze anyway so
+slow changes (lighting, someone standing very still) still get picked up.
+"""
+
+import time
+
+import numpy as np
+
+
+MOTION_DEFAULTS = {
+    'pixel_threshold': 25,      # gray levels (0-255) a pixel must change by to count
+    'changed_fraction': 0.01,   # share of pixels that must change to trigger analysis
+    'max_skip_seconds': 5.0,    # re-analyze at least this often
+    'width': 64,                # thumbnail width in pixels
+}
+
+
+def small_gray(frame, width=64):
+    """RGB/gray frame -> ~`width` pixels wide float32 grayscale thumbnail"""
+    frame = np.asarray(frame)
+    step = max(1, frame.shape[1] // width)
+    small = frame[::step, ::step]
+    if small.ndim == 3:
+        small = small[..., :3].mean(axis=2)
+    return small.astype(np.float32)
+
+
+class MotionGate:
+    def __init__(self, pixel_threshold=None, changed_fraction=None, max_skip_seconds=None, width=None):
+        params = MOTION_DEFAULTS
+        self.pixel_threshold = params['pixel_threshold'] if pixel_threshold is None else pixel_threshold
+        self.changed_fraction = params['changed_fraction'] if changed_fraction is None else changed_fraction
+        self.max_skip_seconds = params['max_skip_seconds'] if max_skip_seconds is None else max_skip_seconds
+        self.width = width or params['width']
+
+        self._reference = None
+        self._last_analyzed = 0.0
+
+        self.checked = 0
+        self.skipped = 0
+        self.last_score = 0.0
+
+    def score(self, small):
+        """Fraction of thumbnail pixels that changed noticeably since the last analysis"""
+        if self._reference is None or self._reference.shape != small.shape:
+            return 1.0
+        return float(np.mean(np.abs(small - self._reference) > self.pixel_threshold))
+
+    def should_analyze(self, frame):
+        """True if this frame is worth running detection on; remembers it as the new reference if so"""
+        small = small_gray(frame, self.width)
+        now = time.perf_counter()
+
+        self.checked += 1
+        self.last_score = self.score(small)
+
+        if self.last_score >= self.changed_fraction or now - self._last_analyzed >= self.max_skip_seconds:
+            self._reference = small
+            self._last_analyzed = now
+            return True
+
+        self.skipped += 1
+        return False
+
+    def stats(self):
+        return {
+            'checked': self.checked,
+            'skipped': self.skipped,
+            'skip_rate': self.skipped / self.checked if self.checked else 0.0,
+            'last_score': self.last_score,
+            'changed_fraction': self.changed_fraction,
+            'pixel_threshold': self.pixel_threshold
+        }
@@ -0,0 +1,212 @@
+"""
+Dataset Shards
+--------------
+One-time compiler that turns the image folders (or the FER2013 CSV)
+into plain uint8 arrays on disk:
+
+    data/shards/train/
+        manifest.json
+        images-00000.npy   # (N, 48, 48) uint8
+        labels-00000.npy   # (N,) uint8
+
+Training/eval then read them through np.memmap, so there's no per-image
+decode at all and several processes share the same page cache.
+Only needs numpy + OpenCV, no TensorFlow.
+
+    python -m core.shards --folder data/train --out data/shards/train
+    python -m core.shards --fer-csv fer2013.csv --out data/shards
+"""
+
+import os
+import csv
+import json
+import argparse
+
+import numpy as np
+
+
+# Folder names, in the same order as EmotionPredictor.labels.
+# (FER2013 uses this order for its numeric labels too.)
+EMOTION_CLASSES = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif')
+
+# FER2013 'Usage' column -> our split names
+FER_SPLITS = {
+    'Training': 'train',
+    'PublicTest': 'validation',
+    'PrivateTest': 'test',
+}
+
+MANIFEST = 'manifest.json'
+
+
+def list_image_files(data_path):
+    """Walks data_path/<emotion>/ and returns (paths, labels)"""
+    paths, labels = [], []
+
+    for idx, emotion in enumerate(EMOTION_CLASSES):
+        folder = os.path.join(data_path, emotion)
+        if not os.path.isdir(folder):
+            continue
+
+        for name in sorted(os.listdir(folder)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(folder, name))
+                labels.append(idx)
+
+    return paths, labels
+
+
+def is_shard_dir(path):
+    return os.path.exists(os.path.join(path, MANIFEST))
+
+
+class ShardWriter:
+    """Buffers samples and flushes a fixed-size shard to disk whenever it fills up"""
+
+    def __init__(self, out_dir, shard_size=16384, image_size=(48, 48)):
+        self.out_dir = out_dir
+        self.shard_size = shard_size
+        self.image_size = image_size
+
+        self._images = np.empty((shard_size,) + tuple(image_size), dtype=np.uint8)
+        self._labels = np.empty((shard_size,), dtype=np.uint8)
+        self._fill = 0
+        self._shards = []
+
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, image, label):
+        self._images[self._fill] = image
+        self._labels[self._fill] = label
+        self._fill += 1
+        if self._fill == self.shard_size:
+            self._flush()
+
+    def close(self):
+        """Writes the last partial shard plus the manifest; returns the sample count"""
+        if self._fill:
+            self._flush()
+
+        manifest = {
+            'classes': EMOTION_CLASSES,
+            'image_size': list(self.image_size),
+            'count': sum(s['count'] for s in self._shards),
+            'shards': self._shards
+        }
+        with open(os.path.join(self.out_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        return manifest['count']
+
+    def _flush(self):
+        n = len(self._shards)
+        images_name = f'images-{n:05d}.npy'
+        labels_name = f'labels-{n:05d}.npy'
+
+        np.save(os.path.join(self.out_dir, images_name), self._images[:self._fill])
+        np.save(os.path.join(self.out_dir, labels_name), self._labels[:self._fill])
+
+        self._shards.append({'images': images_name, 'labels': labels_name, 'count': self._fill})
+        self._fill = 0
+
+
+def compile_folder(data_path, out_dir, shard_size=16384, image_size=(48, 48)):
+    """Decodes every image under data_path/<emotion>/ once and writes shards"""
+    import cv2
+
+    paths, labels = list_image_files(data_path)
+    writer = ShardWriter(out_dir, shard_size, image_size)
+    skipped = 0
+
+    for path, label in zip(paths, labels):
+        img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            skipped += 1
+            continue
+        if img.shape != tuple(image_size):
+            img = cv2.resize(img, (image_size[1], image_size[0]), interpolation=cv2.INTER_AREA)
+        writer.add(img, label)
+
+    count = writer.close()
+    print(f"✓ {out_dir}: {count} images" + (f" ({skipped} unreadable, skipped)" if skipped else ""))
+    return count
+
+
+def compile_fer2013_csv(csv_path, out_dir, shard_size=16384):
+    """
+    Streams the FER2013 CSV (emotion, pixels, Usage) into
+    out_dir/train, out_dir/validation and out_dir/test.
+    """
+    writers = {}
+
+    with open(csv_path, newline='') as f:
+        for row in csv.DictReader(f):
+            split = FER_SPLITS.get(row.get('Usage', 'Training'), 'train')
+            if split not in writers:
+                writers[split] = ShardWriter(os.path.join(out_dir, split), shard_size)
+
+            pixels = np.array(row['pixels'].split(), dtype=np.uint8).reshape(48, 48)
+            writers[split].add(pixels, int(row['emotion']))
+
+    counts = {split: w.close() for split, w in writers.items()}
+    for split, count in counts.items():
+        print(f"✓ {os.path.join(out_dir, split)}: {count} images")
+    return counts
+
+
+class ShardReader:
+    """Read-only, memory-mapped view over a compiled split"""
+
+    def __init__(self, shard_dir):
+        with open(os.path.join(shard_dir, MANIFEST)) as f:
+            self.manifest = json.load(f)
+
+        self.images = []
+        self.labels = []
+        for shard in self.manifest['shards']:
+            self.images.append(np.load(os.path.join(shard_dir, shard['images']), mmap_mode='r'))
+            self.labels.append(np.load(os.path.join(shard_dir, shard['labels']), mmap_mode='r'))
+
+        # offsets[i] = global index of the first sample in shard i
+        self.offsets = np.cumsum([0] + [s['count'] for s in self.manifest['shards']])
+        self.image_size = tuple(self.manifest['image_size'])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def take(self, indices):
+        """Gathers samples by global index -> (uint8 images (B, H, W), uint8 labels (B,))"""
+        indices = np.asarray(indices, dtype=np.int64)
+        shard_ids = np.searchsorted(self.offsets, indices, side='right') - 1
+        local = indices - self.offsets[shard_ids]
+
+        images = np.empty((len(indices),) + self.image_size, dtype=np.uint8)
+        labels = np.empty((len(indices),), dtype=np.uint8)
+
+        for s in np.unique(shard_ids):
+            mask = shard_ids == s
+            images[mask] = self.images[s][local[mask]]
+            labels[mask] = self.labels[s][local[mask]]
+
+        return images, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile training images into memory-mappable shards")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--folder', help="Folder with one subfolder per emotion")
+    source.add_argument('--fer-csv', help="FER2013 CSV (emotion,pixels,Usage)")
+    parser.add_argument('--out', required=True)
+    parser.add_argument('--shard-size', type=int, default=16384)
+    args = parser.parse_args()
+
+    if args.folder:
+        compile_folder(args.folder, args.out, args.shard_size)
+    else:
+        compile_fer2013_csv(args.fer_csv, args.out, args.shard_size)
+
+
+if __name__ == "__main__":
+    main()
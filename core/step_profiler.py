@@ -0,0 +1,182 @@
+"""
+Training Step Profiler
+----------------------
+Keras callback that answers "is training waiting on data or on math?".
+
+For every training step it logs wall time, how much of it was spent
+blocked on the input pipeline vs computing, images/sec and memory, to a
+.jsonl or .csv file. It can also capture a TensorBoard profiler trace for
+a window of steps:
+
+    profiler = StepProfiler('models/steps.jsonl', batch_size=64, trace_steps=(100, 110))
+    model.fit(profiler.wrap_dataset(train_ds), callbacks=[profiler], ...)
+
+    tensorboard --logdir models/profile
+
+Input wait is only visible if the dataset goes through wrap_dataset():
+the wrapper pulls batches through a timed Python iterator. That costs a
+little, so only use it while profiling.
+"""
+
+import os
+import csv
+import json
+import time
+import threading
+
+import numpy as np
+import tensorflow as tf
+
+from core.metrics import process_memory_mb
+
+
+LOG_FIELDS = ['epoch', 'step', 'global_step', 'step_ms', 'input_ms', 'compute_ms',
+              'images_per_sec', 'rss_mb', 'device_mb']
+
+# More than this share of step time waiting on data -> we call it input-bound
+INPUT_BOUND_SHARE = 0.2
+
+
+def _device_memory_mb():
+    """Current accelerator memory, or None on CPU-only machines"""
+    try:
+        if not tf.config.list_logical_devices('GPU'):
+            return None
+        return tf.config.experimental.get_memory_info('GPU:0')['current'] / 1e6
+    except (ValueError, RuntimeError, AttributeError):
+        return None
+
+
+class StepProfiler(tf.keras.callbacks.Callback):
+    """
+    Args:
+        log_path: .jsonl or .csv file for the per-step rows
+        batch_size: Images per step (for images/sec)
+        trace_steps: (first, last) global steps to capture a TensorBoard trace for, or None
+        trace_dir: Where the trace goes
+        memory_every: Sample memory every N steps (reading it isn't free)
+    """
+
+    def __init__(self, log_path, batch_size, trace_steps=None, trace_dir='models/profile', memory_every=10):
+        super().__init__()
+        self.log_path = log_path
+        self.batch_size = batch_size
+        self.trace_steps = trace_steps
+        self.trace_dir = trace_dir
+        self.memory_every = max(1, memory_every)
+
+        self.global_step = 0
+        self._epoch = 0
+        # Batches of the current epoch done before a resume (Keras counts from 0 again)
+        self._skipped = 0
+        self._step_start = None
+        self._input_wait = 0.0
+        self._lock = threading.Lock()
+        self._tracing = False
+        self._file = None
+        self._writer = None
+        self._epoch_rows = []
+        self._rss = None
+        self._device = None
+
+    def resume_from(self, global_step, step_in_epoch=0):
+        """Carry on numbering from a restored checkpoint instead of starting at 0"""
+        self.global_step = global_step
+        self._skipped = step_in_epoch
+
+    def wrap_dataset(self, ds):
+        """Same elements as `ds`, but every fetch is timed so we can tell input wait from compute"""
+        def timed_batches():
+            iterator = iter(ds)
+            while True:
+                start = time.perf_counter()
+                try:
+                    batch = next(iterator)
+                except StopIteration:
+                    return
+                with self._lock:
+                    self._input_wait += time.perf_counter() - start
+                yield batch
+
+        return tf.data.Dataset.from_generator(timed_batches, output_signature=ds.element_spec)
+
+    def on_train_begin(self, logs=None):
+        os.makedirs(os.path.dirname(self.log_path) or '.', exist_ok=True)
+        self._file = open(self.log_path, 'a', newline='')
+        if self.log_path.endswith('.csv'):
+            self._writer = csv.DictWriter(self._file, fieldnames=LOG_FIELDS)
+            if self._file.tell() == 0:
+                self._writer.writeheader()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._epoch_rows = []
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self.trace_steps and self.global_step == self.trace_steps[0] and not self._tracing:
+            tf.profiler.experimental.start(self.trace_dir)
+            self._tracing = True
+        self._step_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step_s = time.perf_counter() - self._step_start
+        with self._lock:
+            input_s, self._input_wait = min(self._input_wait, step_s), 0.0
+
+        if self.global_step % self.memory_every == 0:
+            self._rss = process_memory_mb()
+            self._device = _device_memory_mb()
+
+        row = {
+            'epoch': self._epoch,
+            'step': batch + self._skipped,
+            'global_step': self.global_step,
+            'step_ms': round(step_s * 1000, 3),
+            'input_ms': round(input_s * 1000, 3),
+            'compute_ms': round((step_s - input_s) * 1000, 3),
+            'images_per_sec': round(self.batch_size / step_s, 1) if step_s > 0 else 0.0,
+            'rss_mb': round(self._rss, 1),
+            'device_mb': None if self._device is None else round(self._device, 1)
+        }
+        self._write(row)
+        self._epoch_rows.append(row)
+
+        self.global_step += 1
+        if self._tracing and self.global_step > self.trace_steps[1]:
+            self._stop_trace()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self._skipped = 0
+
+        # The first step of a run is mostly tracing, keep it out of the summary
+        rows = self._epoch_rows[1:] if len(self._epoch_rows) > 1 else self._epoch_rows
+        if not rows:
+            return
+
+        step = np.array([r['step_ms'] for r in rows])
+        wait = np.array([r['input_ms'] for r in rows])
+        share = wait.sum() / step.sum() if step.sum() > 0 else 0.0
+        verdict = "input-bound" if share > INPUT_BOUND_SHARE else "compute-bound"
+
+        print(f"\n⏱️ Epoch {epoch + 1}: step p50 {np.percentile(step, 50):.1f}ms, "
+              f"p95 {np.percentile(step, 95):.1f}ms, "
+              f"{self.batch_size * len(rows) / (step.sum() / 1000):,.0f} images/sec, "
+              f"{share:.0%} waiting on input -> {verdict}")
+
+    def on_train_end(self, logs=None):
+        if self._tracing:
+            self._stop_trace()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _stop_trace(self):
+        tf.profiler.experimental.stop()
+        self._tracing = False
+        print(f"📸 Profiler trace saved to {self.trace_dir} (tensorboard --logdir {self.trace_dir})")
+
+    def _write(self, row):
+        if self._writer:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row) + '\n')
@@ -0,0 +1,265 @@
+"""
+Hyperparameter Sweep
+--------------------
+Runs many training trials side by side on one many-core box.
+Each worker process gets its own slice of CPU cores (pinned with
+sched_setaffinity) and TensorFlow's thread pools are sized to match,
+so trials don't fight over the same cores.
+
+Weak trials get cut early with a median stopping rule: after a few
+epochs, a trial whose val accuracy is below the median of the other
+trials at the same epoch is stopped. Results land in a leaderboard CSV
+as soon as each trial finishes.
+
+    python -m core.sweep --trials 12 --cores-per-trial 4 --epochs 30
+    python -m core.sweep --space my_space.json
+"""
+
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import itertools
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+# Default search space (override with --space some.json)
+SEARCH_SPACE = {
+    'lr': [3e-3, 1e-3, 3e-4],
+    'batch_size': [32, 64, 128],
+    'arch': ['baseline', 'gap', 'slim'],
+    'augment_strength': [0.5, 1.0, 1.5],
+}
+
+LEADERBOARD_FIELDS = ['trial', 'best_val_accuracy', 'epochs_run', 'stopped_early', 'seconds',
+                      'lr', 'batch_size', 'arch', 'augment_strength', 'cores', 'output_dir']
+
+
+def sample_trials(space, n_trials=None, seed=0):
+    """Full grid if it fits in n_trials (or n_trials is None), otherwise a random sample of it"""
+    keys = list(space)
+    grid = [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+    if n_trials is None or n_trials >= len(grid):
+        return grid
+    return random.Random(seed).sample(grid, n_trials)
+
+
+def core_slots(cores_per_trial):
+    """Splits the cores we're allowed to use into equal, non-overlapping slots"""
+    if hasattr(os, 'sched_getaffinity'):
+        cores = sorted(os.sched_getaffinity(0))
+    else:
+        cores = list(range(os.cpu_count() or 1))
+
+    cores_per_trial = max(1, min(cores_per_trial, len(cores)))
+    n_slots = len(cores) // cores_per_trial
+    return [cores[i * cores_per_trial:(i + 1) * cores_per_trial] for i in range(n_slots)]
+
+
+# Set once per worker process by _init_worker
+_worker_cores = None
+
+
+def _init_worker(slot_queue):
+    """Runs once in each fresh worker: grab a core slot, pin to it, size TF's thread pools"""
+    global _worker_cores
+    _worker_cores = slot_queue.get()
+
+    if hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, _worker_cores)
+
+    n = str(len(_worker_cores))
+    os.environ['OMP_NUM_THREADS'] = n
+    os.environ['TF_NUM_INTRAOP_THREADS'] = n
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+    os.environ.setdefault('TF_CPP_MIN_LOG_LEVEL', '2')
+
+    # Has to happen before TF runs its first op in this process
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(len(_worker_cores))
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+
+def _make_median_stopper(trial_id, progress, grace_epochs, min_peers):
+    """Keras callback implementing the median stopping rule over a shared dict"""
+    import tensorflow as tf
+
+    class MedianStopping(tf.keras.callbacks.Callback):
+        def __init__(self):
+            super().__init__()
+            self.best = 0.0
+            self.stopped = False
+
+        def on_epoch_end(self, epoch, logs=None):
+            acc = (logs or {}).get('val_accuracy')
+            if acc is None:
+                return
+            self.best = max(self.best, acc)
+            progress[f'{trial_id}:{epoch}'] = self.best
+
+            if epoch + 1 < grace_epochs:
+                return
+
+            peers = [v for k, v in progress.items()
+                     if k.endswith(f':{epoch}') and not k.startswith(f'{trial_id}:')]
+            if len(peers) < min_peers:
+                return
+
+            peers.sort()
+            median = peers[len(peers) // 2]
+            if self.best < median:
+                print(f"✂️ Trial {trial_id}: best {self.best:.4f} < median {median:.4f} at epoch {epoch + 1}, stopping")
+                self.stopped = True
+                self.model.stop_training = True
+
+    return MedianStopping()
+
+
+def _run_trial(trial_id, params, train_dir, val_dir, epochs, out_root, progress, grace_epochs, min_peers):
+    """One trial inside a pinned worker"""
+    import tensorflow as tf
+    from core.train import train_emotion_model
+
+    tf.keras.backend.clear_session()
+    output_dir = os.path.join(out_root, f'trial-{trial_id:03d}')
+    stopper = _make_median_stopper(trial_id, progress, grace_epochs, min_peers)
+
+    started = time.perf_counter()
+    history = train_emotion_model(
+        train_dir, val_dir,
+        epochs=epochs,
+        batch_size=params['batch_size'],
+        arch=params['arch'],
+        lr=params['lr'],
+        augment_strength=params['augment_strength'],
+        output_dir=output_dir,
+        extra_callbacks=[stopper],
+        verbose=2
+    )
+
+    val_acc = history.history.get('val_accuracy', []) if history else []
+    return dict(
+        params,
+        trial=trial_id,
+        best_val_accuracy=max(val_acc) if val_acc else 0.0,
+        epochs_run=len(val_acc),
+        stopped_early=stopper.stopped,
+        seconds=round(time.perf_counter() - started, 1),
+        cores=' '.join(str(c) for c in _worker_cores),
+        output_dir=output_dir
+    )
+
+
+def write_leaderboard(results, path):
+    """Best first; written to a temp file and swapped in so readers never see half a file"""
+    ranked = sorted(results, key=lambda r: r['best_val_accuracy'], reverse=True)
+    tmp_path = path + '.tmp'
+
+    with open(tmp_path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LEADERBOARD_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(ranked)
+    os.replace(tmp_path, path)
+
+
+def run_sweep(train_dir, val_dir, space=None, n_trials=None, cores_per_trial=4, epochs=30,
+              out_root='models/sweep', grace_epochs=5, min_peers=2, seed=0):
+    """
+    Schedules every trial across a pool of pinned worker processes.
+
+    Args:
+        train_dir: Training images or shards
+        val_dir: Validation images or shards
+        space: Dict of param -> list of values (defaults to SEARCH_SPACE)
+        n_trials: Random sample size from the grid (None = whole grid)
+        cores_per_trial: Cores each worker is pinned to
+        epochs: Max epochs per trial
+        out_root: Where trial models and the leaderboard go
+        grace_epochs: Epochs every trial gets before the median rule kicks in
+        min_peers: How many other trials must have reported an epoch before we compare
+        seed: For the random sample
+    """
+    space = dict(SEARCH_SPACE, **(space or {}))
+    trials = sample_trials(space, n_trials, seed)
+    slots = core_slots(cores_per_trial)
+
+    os.makedirs(out_root, exist_ok=True)
+    leaderboard_path = os.path.join(out_root, 'leaderboard.csv')
+
+    print(f"🧪 {len(trials)} trials on {len(slots)} workers x {len(slots[0])} cores")
+
+    # TF doesn't survive fork(), so workers are spawned fresh
+    ctx = mp.get_context('spawn')
+    manager = ctx.Manager()
+    slot_queue = manager.Queue()
+    for slot in slots:
+        slot_queue.put(slot)
+    progress = manager.dict()
+
+    results = []
+    with ProcessPoolExecutor(max_workers=len(slots), mp_context=ctx,
+                             initializer=_init_worker, initargs=(slot_queue,)) as pool:
+        futures = {
+            pool.submit(_run_trial, i, params, train_dir, val_dir, epochs,
+                        out_root, progress, grace_epochs, min_peers): i
+            for i, params in enumerate(trials)
+        }
+
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"⚠ Trial {futures[future]} crashed: {e}")
+                continue
+
+            results.append(result)
+            write_leaderboard(results, leaderboard_path)
+            print(f"✓ Trial {result['trial']}: {result['best_val_accuracy']:.4f} "
+                  f"({result['epochs_run']} epochs, {result['seconds']}s)")
+
+    manager.shutdown()
+
+    if results:
+        best = max(results, key=lambda r: r['best_val_accuracy'])
+        print(f"\n🏆 Best: trial {best['trial']} -> {best['best_val_accuracy']:.4f} "
+              f"(lr={best['lr']}, batch={best['batch_size']}, arch={best['arch']}, "
+              f"aug={best['augment_strength']})")
+    print(f"📋 Leaderboard: {leaderboard_path}")
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter sweep for the emotion CNN")
+    parser.add_argument('--train-dir', default='data/train')
+    parser.add_argument('--val-dir', default='data/validation')
+    parser.add_argument('--space', help="JSON file with {param: [values]} (merged over the defaults)")
+    parser.add_argument('--trials', type=int, help="Random sample size (default: full grid)")
+    parser.add_argument('--cores-per-trial', type=int, default=4)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--grace-epochs', type=int, default=5)
+    parser.add_argument('--out', default='models/sweep')
+    args = parser.parse_args()
+
+    space = None
+    if args.space:
+        with open(args.space) as f:
+            space = json.load(f)
+
+    run_sweep(
+        args.train_dir, args.val_dir,
+        space=space,
+        n_trials=args.trials,
+        cores_per_trial=args.cores_per_trial,
+        epochs=args.epochs,
+        out_root=args.out,
+        grace_epochs=args.grace_epochs
+    )
+
+
+if __name__ == "__main__":
+    main()
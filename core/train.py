@@ -5,49 +5,63 @@ This script provides a template for training the emotion recognition model
 Note: You'll need a labeled dataset (e.g., FER2013) to train the model
 """
 
+import os
+import sys
+import gzip
+import json
+import argparse
+
+# Fix path so `python core/train.py` can find the core package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 import numpy as np
-from logic.model import EmotionCNN
-from tensorflow.keras.preprocessing.image import ImageDataGenerator
+import tensorflow as tf
+
+from core.ai_model import EmotionCNN, ARCHITECTURES, profile_model, measure_latency
+from core.backends import KerasBackend, TFLiteBackend
+from core.step_profiler import StepProfiler
+from core.checkpointing import TrainingStateCheckpoint, load_training_state, clear_training_state
+from core.data_pipeline import build_dataset, build_epoch_stream, count_images, benchmark_input_pipeline, EMOTION_CLASSES
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping, ReduceLROnPlateau
-import os
 
 
-def train_emotion_model(train_data_path, val_data_path, epochs=50, batch_size=32):
+def train_emotion_model(train_data_path, val_data_path, epochs=50, batch_size=32, arch='baseline',
+                        lr=0.001, augment_strength=1.0, output_dir='models', extra_callbacks=None,
+                        verbose=1, checkpoint_dir=None, checkpoint_every=500, profile_log=None,
+                        profile_trace_steps=None):
     """
     Train the emotion recognition model
     
     Args:
-        train_data_path: Path to training data directory
-        val_data_path: Path to validation data directory
+        train_data_path: Path to training data directory (image folders or compiled shards)
+        val_data_path: Path to validation data directory (image folders or compiled shards)
         epochs: Number of training epochs
         batch_size: Batch size for training
+        arch: Architecture variant (name from ARCHITECTURES or a config dict)
+        lr: Initial learning rate
+        augment_strength: Scales the augmentation ranges (0 turns it off)
+        output_dir: Where the best/final .h5 files go
+        extra_callbacks: More Keras callbacks (e.g. the sweep's early-stopping hook)
+        verbose: Keras fit verbosity
+        checkpoint_dir: Full-state checkpoints go here (default: <output_dir>/checkpoints);
+                        an interrupted run in there is resumed automatically
+        checkpoint_every: Checkpoint interval in steps (0 = old behaviour, no resume)
+        profile_log: Per-step timing/memory log (.jsonl or .csv), None to skip profiling
+        profile_trace_steps: (first, last) step window for a TensorBoard profiler trace
     """
     
     # Initialize model
     print("🔧 Initializing model...")
-    emotion_model = EmotionCNN()
+    emotion_model = EmotionCNN(config=arch)
     emotion_model.build_model()
-    emotion_model.compile_model(learning_rate=0.001)
+    emotion_model.compile_model(lr=lr)
     
     # Print model summary
     print("\n📊 Model Architecture:")
-    emotion_model.get_model_summary()
-    
-    # Data augmentation for training
-    print("\n🔄 Setting up data augmentation...")
-    train_datagen = ImageDataGenerator(
-        rescale=1./255,
-        rotation_range=20,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        horizontal_flip=True,
-        zoom_range=0.2,
-        shear_range=0.2,
-        fill_mode='nearest'
-    )
+    emotion_model.model.summary()
     
-    # Validation data (no augmentation)
-    val_datagen = ImageDataGenerator(rescale=1./255)
+    # tf.data pipeline: parallel decode, cached, batched augmentation, prefetch
+    print("\n🔄 Setting up the input pipeline...")
     
     # Note: This assumes your data is organized in folders by emotion class
     # Example structure:
@@ -61,29 +75,28 @@ def train_emotion_model(train_data_path, val_data_path, epochs=50, batch_size=32
     #   └── neutral/
     
     try:
-        # Load training data
-        train_generator = train_datagen.flow_from_directory(
-            train_data_path,
-            target_size=(48, 48),
-            color_mode='grayscale',
-            batch_size=batch_size,
-            class_mode='categorical',
-            shuffle=True
-        )
+        # Training data (shuffled + augmented). The resumable path builds its
+        # own epoch stream, so it only needs to know how many images there are.
+        if checkpoint_every:
+            train_ds, train_count = None, count_images(train_data_path)
+        else:
+            train_ds, train_count = build_dataset(
+                train_data_path,
+                batch_size=batch_size,
+                training=True,
+                augment_strength=augment_strength
+            )
         
-        # Load validation data
-        val_generator = val_datagen.flow_from_directory(
+        # Validation data (no augmentation)
+        val_ds, val_count = build_dataset(
             val_data_path,
-            target_size=(48, 48),
-            color_mode='grayscale',
             batch_size=batch_size,
-            class_mode='categorical',
-            shuffle=False
+            training=False
         )
         
-        print(f"\n✓ Found {train_generator.samples} training images")
-        print(f"✓ Found {val_generator.samples} validation images")
-        print(f"✓ Classes: {list(train_generator.class_indices.keys())}")
+        print(f"\n✓ Found {train_count} training images")
+        print(f"✓ Found {val_count} validation images")
+        print(f"✓ Classes: {EMOTION_CLASSES}")
         
     except Exception as e:
         print(f"\n⚠ Error loading data: {e}")
@@ -97,12 +110,12 @@ def train_emotion_model(train_data_path, val_data_path, epochs=50, batch_size=32
     print("\n⚙️ Setting up training callbacks...")
     
     # Create models directory if it doesn't exist
-    os.makedirs('models', exist_ok=True)
+    os.makedirs(output_dir, exist_ok=True)
     
     callbacks = [
         # Save best model
         ModelCheckpoint(
-            'models/emotion_model_best.h5',
+            os.path.join(output_dir, 'emotion_model_best.h5'),
             monitor='val_accuracy',
             save_best_only=True,
             mode='max',
@@ -125,33 +138,644 @@ def train_emotion_model(train_data_path, val_data_path, epochs=50, batch_size=32
             min_lr=1e-7,
             verbose=1
         )
-    ]
+    ] + list(extra_callbacks or [])
+    
+    profiler = None
+    if profile_log:
+        profiler = StepProfiler(
+            profile_log, batch_size,
+            trace_steps=profile_trace_steps,
+            trace_dir=os.path.join(output_dir, 'profile')
+        )
+        callbacks.append(profiler)
     
     # Train the model
     print(f"\n🚀 Starting training for {epochs} epochs...")
     
-    history = emotion_model.model.fit(
-        train_generator,
-        steps_per_epoch=train_generator.samples // batch_size,
-        epochs=epochs,
-        validation_data=val_generator,
-        validation_steps=val_generator.samples // batch_size,
-        callbacks=callbacks,
-        verbose=1
-    )
+    if checkpoint_every:
+        history = _fit_resumable(
+            emotion_model.model, train_data_path, val_ds, train_count,
+            epochs=epochs,
+            batch_size=batch_size,
+            callbacks=callbacks,
+            checkpoint_dir=checkpoint_dir or os.path.join(output_dir, 'checkpoints'),
+            checkpoint_every=checkpoint_every,
+            augment_strength=augment_strength,
+            wrap_train=profiler.wrap_dataset if profiler else None,
+            config={'arch': arch, 'batch_size': batch_size, 'train_data_path': train_data_path,
+                    'augment_strength': augment_strength},
+            verbose=verbose
+        )
+    else:
+        history = emotion_model.model.fit(
+            profiler.wrap_dataset(train_ds) if profiler else train_ds,
+            epochs=epochs,
+            validation_data=val_ds,
+            callbacks=callbacks,
+            verbose=verbose
+        )
     
     # Save final model
     print("\n💾 Saving final model...")
-    emotion_model.save_model('models/emotion_model.h5')
+    emotion_model.save_model(os.path.join(output_dir, 'emotion_model.h5'))
     
     # Print training results
     print("\n✅ Training completed!")
-    print(f"Final training accuracy: {history.history['accuracy'][-1]:.4f}")
-    print(f"Final validation accuracy: {history.history['val_accuracy'][-1]:.4f}")
+    # Empty when we resumed a checkpoint that had already finished its last epoch
+    if history.history:
+        print(f"Final training accuracy: {history.history['accuracy'][-1]:.4f}")
+        print(f"Final validation accuracy: {history.history['val_accuracy'][-1]:.4f}")
+    print(f"💡 Full report (per-class, calibration, speed): python -m core.evaluate {os.path.join(output_dir, 'emotion_model.h5')}")
+    
+    return history
+
+
+def _fit_resumable(model, train_data_path, val_ds, train_count, epochs, batch_size, callbacks,
+                   checkpoint_dir, checkpoint_every=500, augment_strength=1.0, config=None,
+                   seed=42, verbose=1, wrap_train=None):
+    """
+    model.fit() over a deterministic epoch stream with full-state checkpoints.
+    If checkpoint_dir holds a run with the same config, we restore it and
+    continue from the exact batch we stopped at: data order and augmentation
+    are pure functions of (seed, epoch, batch), so the resumed run sees the
+    same batches an uninterrupted one would have. Checkpoints are cleared
+    once training finishes. `wrap_train` gets a chance to wrap the training
+    stream (e.g. StepProfiler.wrap_dataset).
+    """
+    steps_per_epoch = -(-train_count // batch_size)
+    
+    saver = TrainingStateCheckpoint(
+        checkpoint_dir, steps_per_epoch,
+        every_n_steps=checkpoint_every,
+        callbacks=callbacks,
+        config=config
+    )
+    saver.set_model(model)
+    
+    start_epoch, skip = 0, 0
+    state = load_training_state(checkpoint_dir)
+    if state and saver.matches(state):
+        saver.restore(state)
+        start_epoch, skip = state['epoch'], state['step_in_epoch']
+        # Profiler log is appended to, keep its step numbers (and trace window) going
+        for cb in callbacks:
+            if isinstance(cb, StepProfiler):
+                cb.resume_from(state['global_step'], skip)
+        print(f"\n♻️ Resuming from epoch {start_epoch + 1}, step {skip} (lr={state['lr']:.2g})")
+    elif state:
+        print(f"\n⚠ Checkpoint in {checkpoint_dir} is from a different setup, starting fresh")
+    
+    # Must be last so it sees the other callbacks' end-of-epoch updates
+    callbacks = list(callbacks) + [saver]
+    merged = {}
+    history = None
+    
+    def run(first_epoch, last_epoch, skip_batches):
+        stream, _ = build_epoch_stream(
+            train_data_path, batch_size,
+            start_epoch=first_epoch,
+            skip_batches=skip_batches,
+            seed=seed,
+            augment_strength=augment_strength
+        )
+        if wrap_train:
+            stream = wrap_train(stream)
+        result = model.fit(
+            stream,
+            initial_epoch=first_epoch,
+            epochs=last_epoch,
+            steps_per_epoch=steps_per_epoch - skip_batches,
+            validation_data=val_ds,
+            callbacks=callbacks,
+            verbose=verbose
+        )
+        for key, values in result.history.items():
+            merged.setdefault(key, []).extend(values)
+        return result
+    
+    if skip and start_epoch < epochs:
+        # Finish the interrupted epoch on its own, then carry on with full ones
+        history = run(start_epoch, start_epoch + 1, skip)
+        start_epoch += 1
+        saver.carry_callback_state()
+    
+    if start_epoch < epochs and not (history and model.stop_training):
+        history = run(start_epoch, epochs, 0)
     
+    if history is None:
+        print("\n✓ Checkpoint was already at the last epoch, nothing left to train")
+        history = tf.keras.callbacks.History()
+    history.history = merged
+    
+    clear_training_state(checkpoint_dir)
     return history
 
 
+def finetune_emotion_model(base_model_path='models/emotion_model.h5', train_data_path='data/train',
+                           val_data_path='data/validation', epochs=5, batch_size=32, lr=1e-4,
+                           freeze_features=False, augment_strength=0.5,
+                           output_path='models/emotion_model_finetuned.h5',
+                           checkpoint_dir=None, checkpoint_every=500, profile_log=None,
+                           profile_trace_steps=None):
+    """
+    A few epochs on new data, starting from the deployed model instead of
+    from scratch.
+    
+    Args:
+        base_model_path: Trained .h5 model to start from
+        train_data_path: New training images or shards
+        val_data_path: Validation images or shards
+        epochs: Fine-tuning epochs
+        batch_size: Batch size
+        lr: Small learning rate so we nudge the weights rather than wreck them
+        freeze_features: Only train the dense head, keep the conv blocks as they are
+        augment_strength: Scales the augmentation ranges
+        output_path: Where the fine-tuned model gets saved
+        checkpoint_dir: Full-state checkpoints (default: next to output_path)
+        checkpoint_every: Checkpoint interval in steps
+        profile_log: Per-step timing/memory log (.jsonl or .csv), None to skip profiling
+        profile_trace_steps: (first, last) step window for a TensorBoard profiler trace
+    """
+    print(f"🔁 Fine-tuning {base_model_path} on {train_data_path} for {epochs} epochs (lr={lr})")
+    
+    try:
+        # _fit_resumable builds its own training stream
+        train_count = count_images(train_data_path)
+        val_ds, val_count = build_dataset(val_data_path, batch_size=batch_size, training=False)
+    except Exception as e:
+        print(f"\n⚠ Error loading data: {e}")
+        return
+    
+    print(f"✓ {train_count} training / {val_count} validation images")
+    
+    model = tf.keras.models.load_model(base_model_path)
+    base_accuracy = evaluate_accuracy(model, val_ds)
+    
+    if freeze_features:
+        # Everything up to the flatten/pooling layer is feature extraction
+        cut = max(
+            (i for i, layer in enumerate(model.layers)
+             if isinstance(layer, (tf.keras.layers.Flatten, tf.keras.layers.GlobalAveragePooling2D))),
+            default=-1
+        )
+        for layer in model.layers[:cut + 1]:
+            layer.trainable = False
+        print(f"   Frozen {cut + 1} feature layers, training the head only")
+    
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=lr),
+        loss='categorical_crossentropy',
+        metrics=['accuracy']
+    )
+    
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=3, restore_best_weights=True, verbose=1)
+    ]
+    
+    profiler = None
+    if profile_log:
+        profiler = StepProfiler(
+            profile_log, batch_size,
+            trace_steps=profile_trace_steps,
+            trace_dir=os.path.join(os.path.dirname(output_path) or '.', 'profile')
+        )
+        callbacks.append(profiler)
+    
+    _fit_resumable(
+        model, train_data_path, val_ds, train_count,
+        epochs=epochs,
+        batch_size=batch_size,
+        callbacks=callbacks,
+        checkpoint_dir=checkpoint_dir or os.path.splitext(output_path)[0] + '_checkpoints',
+        checkpoint_every=checkpoint_every,
+        augment_strength=augment_strength,
+        wrap_train=profiler.wrap_dataset if profiler else None,
+        config={'base_model_path': base_model_path, 'batch_size': batch_size,
+                'train_data_path': train_data_path, 'freeze_features': freeze_features}
+    )
+    
+    for layer in model.layers:
+        layer.trainable = True
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    model.save(output_path)
+    
+    tuned_accuracy = evaluate_accuracy(model, val_ds)
+    print(f"\n✅ Fine-tuned model saved to {output_path}")
+    print(f"   Validation accuracy: {base_accuracy:.4f} -> {tuned_accuracy:.4f} ({tuned_accuracy - base_accuracy:+.4f})")
+    
+    return {'base_accuracy': base_accuracy, 'accuracy': tuned_accuracy, 'output_path': output_path}
+
+
+def soften(probs, temperature):
+    """Re-does the softmax of a softmax output at a higher temperature"""
+    logits = tf.math.log(tf.clip_by_value(probs, 1e-7, 1.0))
+    return tf.nn.softmax(logits / temperature)
+
+
+def make_distillation_loss(num_classes=7, temperature=4.0, alpha=0.1):
+    """
+    y_true is [one-hot label | teacher soft targets] packed side by side.
+    Loss = alpha * CE(label, student) + (1 - alpha) * T^2 * KL(teacher_T || student_T)
+    """
+    kld = tf.keras.losses.KLDivergence()
+    
+    def distillation_loss(y_true, y_pred):
+        hard, teacher_soft = y_true[:, :num_classes], y_true[:, num_classes:]
+        student_ce = tf.keras.losses.categorical_crossentropy(hard, y_pred)
+        distill = kld(teacher_soft, soften(y_pred, temperature)) * temperature ** 2
+        return alpha * tf.reduce_mean(student_ce) + (1 - alpha) * distill
+    
+    return distillation_loss
+
+
+def make_hard_accuracy(num_classes=7):
+    """Plain accuracy that ignores the packed teacher targets"""
+    def accuracy(y_true, y_pred):
+        hard = y_true[:, :num_classes]
+        return tf.cast(tf.equal(tf.argmax(hard, -1), tf.argmax(y_pred, -1)), tf.float32)
+    return accuracy
+
+
+def evaluate_accuracy(model, ds):
+    """Top-1 accuracy over a (images, one-hot) dataset"""
+    correct, total = 0, 0
+    for images, labels in ds:
+        preds = model(images, training=False)
+        correct += int(tf.reduce_sum(tf.cast(tf.argmax(preds, -1) == tf.argmax(labels, -1), tf.int32)))
+        total += int(images.shape[0])
+    return correct / total if total else 0.0
+
+
+def model_report(models_by_name, val_ds, paths=None, runs=100):
+    """
+    Accuracy, size and per-face CPU latency for each model, printed side by side.
+    `paths` maps the same names to saved files for the on-disk size.
+    """
+    paths = paths or {}
+    report = {}
+    
+    for name, model in models_by_name.items():
+        stats = profile_model(model, runs=runs)
+        stats['accuracy'] = evaluate_accuracy(model, val_ds)
+        if name in paths and os.path.exists(paths[name]):
+            stats['size_mb'] = os.path.getsize(paths[name]) / 1e6
+        report[name] = stats
+    
+    print(f"\n{'Model':<10} {'Accuracy':>9} {'Params':>11} {'MFLOPs':>9} {'Size MB':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, r in report.items():
+        print(f"{name:<10} {r['accuracy']:>9.4f} {r['params']:>11,} {r['flops'] / 1e6:>9.1f} "
+              f"{r.get('size_mb', float('nan')):>8.2f} {r['latency_p50_ms']:>8.2f} {r['latency_p95_ms']:>8.2f}")
+    
+    return report
+
+
+def distill_emotion_model(teacher_path, train_data_path, val_data_path, student_arch='tiny',
+                          temperature=4.0, alpha=0.1, epochs=30, batch_size=64, lr=0.001,
+                          output_path='models/emotion_model_student.h5'):
+    """
+    Trains a small student to mimic a trained teacher (knowledge distillation).
+    
+    Args:
+        teacher_path: Trained .h5 model (e.g. models/emotion_model.h5)
+        train_data_path: Training images or shards
+        val_data_path: Validation images or shards
+        student_arch: Architecture variant for the student
+        temperature: Softens both distributions so the student learns the "dark knowledge"
+        alpha: Weight on the true labels (the rest goes to matching the teacher)
+        epochs: Number of training epochs
+        batch_size: Batch size for training
+        lr: Student learning rate
+        output_path: Where the student gets saved
+    """
+    print(f"🎓 Distilling {teacher_path} into a '{student_arch}' student (T={temperature}, alpha={alpha})")
+    
+    teacher = tf.keras.models.load_model(teacher_path)
+    teacher.trainable = False
+    
+    student_cnn = EmotionCNN(config=student_arch)
+    student = student_cnn.build_model()
+    num_classes = student_cnn.num_classes
+    
+    try:
+        train_ds, train_count = build_dataset(train_data_path, batch_size=batch_size, training=True)
+        val_ds, val_count = build_dataset(val_data_path, batch_size=batch_size, training=False)
+    except Exception as e:
+        print(f"\n⚠ Error loading data: {e}")
+        return
+    
+    print(f"✓ {train_count} training / {val_count} validation images")
+    
+    # Teacher runs on the exact same (augmented) batch the student sees
+    def add_teacher_targets(images, labels):
+        teacher_soft = soften(teacher(images, training=False), temperature)
+        return images, tf.concat([labels, teacher_soft], axis=-1)
+    
+    distill_train = train_ds.map(add_teacher_targets).prefetch(tf.data.AUTOTUNE)
+    distill_val = val_ds.map(add_teacher_targets).prefetch(tf.data.AUTOTUNE)
+    
+    student.compile(
+        optimizer=tf.keras.optimizers.Adam(learning_rate=lr),
+        loss=make_distillation_loss(num_classes, temperature, alpha),
+        metrics=[make_hard_accuracy(num_classes)]
+    )
+    
+    student.fit(
+        distill_train,
+        epochs=epochs,
+        validation_data=distill_val,
+        callbacks=[
+            EarlyStopping(monitor='val_loss', patience=8, restore_best_weights=True, verbose=1),
+            ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=4, min_lr=1e-6, verbose=1)
+        ],
+        verbose=1
+    )
+    
+    # Recompile with a plain loss so the saved file loads without our custom functions
+    student.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    student_cnn.save_model(output_path)
+    
+    print("\n📊 Teacher vs student:")
+    report = model_report(
+        {'teacher': teacher, 'student': student},
+        val_ds,
+        paths={'teacher': teacher_path, 'student': output_path}
+    )
+    
+    report_path = os.path.splitext(output_path)[0] + '_report.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to {report_path}")
+    
+    return report
+
+
+def _prunable_kernels(model):
+    """(layer, kernel variable) pairs worth pruning: every conv/dense except the output layer"""
+    kernels = []
+    for layer in model.layers[:-1]:
+        if isinstance(layer, tf.keras.layers.SeparableConv2D):
+            # The 1x1 pointwise part holds nearly all of a separable conv's weights
+            kernels.append((layer, layer.pointwise_kernel))
+        elif isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)):
+            kernels.append((layer, layer.kernel))
+    return kernels
+
+
+def model_sparsity(model):
+    """Fraction of exactly-zero weights across the prunable kernels"""
+    zeros, total = 0, 0
+    for _, kernel in _prunable_kernels(model):
+        values = np.asarray(kernel)
+        zeros += int(np.sum(values == 0))
+        total += values.size
+    return zeros / total if total else 0.0
+
+
+class MagnitudePruning(tf.keras.callbacks.Callback):
+    """
+    Gradual pruning during fine-tuning. Sparsity ramps from 0 to `target_sparsity`
+    between begin_step and end_step (cubic schedule), masks get recomputed every
+    `frequency` steps and re-applied after every batch so pruned weights stay at zero.
+    
+    structured=False zeros the smallest individual weights;
+    structured=True zeros whole output filters/units with the smallest L1 norm.
+    """
+    
+    def __init__(self, target_sparsity=0.5, begin_step=0, end_step=1000, frequency=100, structured=False):
+        super().__init__()
+        self.target_sparsity = target_sparsity
+        self.begin_step = begin_step
+        self.end_step = end_step
+        self.frequency = frequency
+        self.structured = structured
+        self.step = 0
+        self.masks = []
+    
+    def current_sparsity(self):
+        if self.step < self.begin_step:
+            return 0.0
+        progress = min(1.0, (self.step - self.begin_step) / max(1, self.end_step - self.begin_step))
+        return self.target_sparsity * (1 - (1 - progress) ** 3)
+    
+    def _compute_mask(self, values, sparsity):
+        if self.structured:
+            # One score per output channel (last axis)
+            norms = np.abs(values).reshape(-1, values.shape[-1]).sum(axis=0)
+            n_drop = int(len(norms) * sparsity)
+            keep = np.ones_like(norms)
+            if n_drop:
+                keep[np.argsort(norms)[:n_drop]] = 0
+            return np.broadcast_to(keep, values.shape).astype(values.dtype)
+        
+        n_drop = int(values.size * sparsity)
+        if not n_drop:
+            return np.ones_like(values)
+        threshold = np.partition(np.abs(values).ravel(), n_drop - 1)[n_drop - 1]
+        return (np.abs(values) > threshold).astype(values.dtype)
+    
+    def update_masks(self):
+        sparsity = self.current_sparsity()
+        self.masks = [
+            (kernel, tf.constant(self._compute_mask(np.asarray(kernel), sparsity)))
+            for _, kernel in _prunable_kernels(self.model)
+        ]
+    
+    def apply_masks(self):
+        for kernel, mask in self.masks:
+            kernel.assign(kernel * mask)
+    
+    def on_train_begin(self, logs=None):
+        self.update_masks()
+    
+    def on_train_batch_end(self, batch, logs=None):
+        self.step += 1
+        if self.step % self.frequency == 0 or self.step == self.end_step:
+            if self.step <= self.end_step:
+                self.update_masks()
+        self.apply_masks()
+    
+    def on_train_end(self, logs=None):
+        # Make sure we finish at exactly the target
+        self.step = max(self.step, self.end_step)
+        self.update_masks()
+        self.apply_masks()
+
+
+def _quantize_aware(model, preserve_sparsity=False):
+    """QAT wrapper via tensorflow-model-optimization, or None if it's not available"""
+    try:
+        import tensorflow_model_optimization as tfmot
+    except ImportError:
+        print("   (tensorflow-model-optimization not installed, skipping QAT -> post-training int8)")
+        return None
+    
+    try:
+        if preserve_sparsity:
+            # Keeps pruned weights at zero while fake-quant fine-tuning runs
+            annotated = tfmot.quantization.keras.quantize_annotate_model(model)
+            return tfmot.quantization.keras.quantize_apply(
+                annotated, tfmot.experimental.combine.Default8BitPrunePreserveQuantizeScheme()
+            )
+        return tfmot.quantization.keras.quantize_model(model)
+    except Exception as e:
+        print(f"   (QAT not supported for this model: {e}, using post-training int8)")
+        return None
+
+
+def export_tflite_int8(model, output_path, representative_ds=None, num_samples=200):
+    """
+    Converts a Keras model to an int8-weight/activation TFLite file.
+    QAT models already carry their ranges; otherwise we calibrate on
+    `representative_ds` (post-training quantization).
+    """
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    
+    if representative_ds is not None:
+        def representative():
+            seen = 0
+            for images, _ in representative_ds:
+                for img in images:
+                    yield [tf.expand_dims(img, 0)]
+                    seen += 1
+                    if seen >= num_samples:
+                        return
+        converter.representative_dataset = representative
+    
+    tflite_model = converter.convert()
+    
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    with open(output_path, 'wb') as f:
+        f.write(tflite_model)
+    print(f"Saved int8 model to {output_path}")
+    return output_path
+
+
+def _gzipped_size_mb(path):
+    """Size after gzip, which is what sparsity actually buys you on disk/over the wire"""
+    with open(path, 'rb') as f:
+        return len(gzip.compress(f.read())) / 1e6
+
+
+def compress_emotion_model(model_path, train_data_path, val_data_path, prune=True,
+                           target_sparsity=0.5, structured=False, qat=True,
+                           prune_epochs=5, qat_epochs=3, batch_size=64, lr=1e-4,
+                           output_prefix='models/emotion_model'):
+    """
+    Fine-tunes a trained model into a smaller one: magnitude (or structured)
+    pruning first, then quantization-aware training, then an int8 TFLite export
+    that EmotionPredictor can load directly.
+    
+    Args:
+        model_path: Trained .h5 model to start from
+        train_data_path: Training images or shards
+        val_data_path: Validation images or shards
+        prune: Run the pruning stage
+        target_sparsity: Fraction of weights (or filters, if structured) to zero out
+        structured: Prune whole filters instead of single weights
+        qat: Run quantization-aware fine-tuning (needs tensorflow-model-optimization)
+        prune_epochs: Fine-tuning epochs while pruning
+        qat_epochs: Fine-tuning epochs with fake-quant
+        batch_size: Batch size
+        lr: Fine-tuning learning rate (small, we're starting from a trained model)
+        output_prefix: Outputs go to <prefix>_pruned.h5 and <prefix>_int8.tflite
+    """
+    print(f"🗜️ Compressing {model_path}")
+    
+    try:
+        train_ds, train_count = build_dataset(train_data_path, batch_size=batch_size, training=True)
+        val_ds, _ = build_dataset(val_data_path, batch_size=batch_size, training=False)
+    except Exception as e:
+        print(f"\n⚠ Error loading data: {e}")
+        return
+    
+    base = tf.keras.models.load_model(model_path)
+    model = tf.keras.models.clone_model(base)
+    model.set_weights(base.get_weights())
+    
+    pruned_path = f'{output_prefix}_pruned.h5'
+    tflite_path = f'{output_prefix}_int8.tflite'
+    
+    if prune:
+        kind = "structured" if structured else "magnitude"
+        print(f"\n✂️ {kind} pruning to {target_sparsity:.0%} over {prune_epochs} epochs...")
+        
+        steps_per_epoch = -(-train_count // batch_size)
+        pruning = MagnitudePruning(
+            target_sparsity=target_sparsity,
+            end_step=max(1, int(steps_per_epoch * prune_epochs * 0.7)),
+            frequency=max(1, steps_per_epoch // 4),
+            structured=structured
+        )
+        
+        model.compile(
+            optimizer=tf.keras.optimizers.Adam(learning_rate=lr),
+            loss='categorical_crossentropy',
+            metrics=['accuracy']
+        )
+        model.fit(train_ds, epochs=prune_epochs, validation_data=val_ds, callbacks=[pruning], verbose=1)
+    
+    model.compile(optimizer='adam', loss='categorical_crossentropy', metrics=['accuracy'])
+    model.save(pruned_path)
+    sparsity = model_sparsity(model)
+    
+    quant_source = model
+    calibration = train_ds
+    if qat:
+        print(f"\n🎚️ Quantization-aware fine-tuning for {qat_epochs} epochs...")
+        q_model = _quantize_aware(model, preserve_sparsity=prune)
+        if q_model is not None:
+            q_model.compile(
+                optimizer=tf.keras.optimizers.Adam(learning_rate=lr),
+                loss='categorical_crossentropy',
+                metrics=['accuracy']
+            )
+            q_model.fit(train_ds, epochs=qat_epochs, validation_data=val_ds, verbose=1)
+            quant_source = q_model
+            calibration = None
+    
+    export_tflite_int8(quant_source, tflite_path, representative_ds=calibration)
+    
+    # Report: everything measured the same way, on CPU
+    candidates = {
+        'base': (KerasBackend(base), model_path, model_sparsity(base)),
+        'pruned': (KerasBackend(model), pruned_path, sparsity),
+        'int8': (TFLiteBackend(tflite_path), tflite_path, sparsity),
+    }
+    
+    report = {}
+    for name, (backend, path, sp) in candidates.items():
+        latency = measure_latency(backend, runs=100)
+        report[name] = {
+            'backend': backend.name,
+            'accuracy': evaluate_accuracy(backend, val_ds),
+            'sparsity': sp,
+            'size_mb': os.path.getsize(path) / 1e6,
+            'gzip_mb': _gzipped_size_mb(path),
+            'latency_p50_ms': latency['p50_ms'],
+            'latency_p95_ms': latency['p95_ms']
+        }
+    
+    base_acc = report['base']['accuracy']
+    print(f"\n{'Model':<8} {'Backend':<8} {'Accuracy':>9} {'Delta':>8} {'Sparsity':>9} "
+          f"{'Size MB':>8} {'Gzip MB':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    for name, r in report.items():
+        r['accuracy_delta'] = r['accuracy'] - base_acc
+        print(f"{name:<8} {r['backend']:<8} {r['accuracy']:>9.4f} {r['accuracy_delta']:>+8.4f} "
+              f"{r['sparsity']:>9.1%} {r['size_mb']:>8.2f} {r['gzip_mb']:>8.2f} "
+              f"{r['latency_p50_ms']:>8.2f} {r['latency_p95_ms']:>8.2f}")
+    
+    report_path = f'{output_prefix}_compression_report.json'
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report saved to {report_path}")
+    print(f"💡 Use it in the app with EmotionPredictor(model_path='{tflite_path}')")
+    
+    return report
+
+
 def create_sample_training_structure():
     """
     Create sample directory structure for training data
@@ -172,12 +796,57 @@ def create_sample_training_structure():
     print("   3. Run this training script")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the emotion recognition model")
+    # Either image folders or shard folders compiled with `python -m core.shards`
+    parser.add_argument('--train-dir', default='data/train')
+    parser.add_argument('--val-dir', default='data/validation')
+    parser.add_argument('--epochs', type=int, help="Default: 50 (5 with --finetune)")
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--arch', default='baseline', choices=list(ARCHITECTURES))
+    parser.add_argument('--lr', type=float, help="Default: 0.001 (1e-4 with --finetune)")
+    parser.add_argument('--augment-strength', type=float, default=1.0)
+    parser.add_argument('--benchmark-input', action='store_true',
+                        help="Compare ImageDataGenerator vs tf.data throughput and exit")
+    parser.add_argument('--benchmark-shards', help="Also time this compiled shard folder")
+    
+    # Knowledge distillation
+    parser.add_argument('--distill', action='store_true', help="Train a small student from --teacher")
+    parser.add_argument('--teacher', default='models/emotion_model.h5')
+    parser.add_argument('--student-arch', default='tiny', choices=list(ARCHITECTURES))
+    parser.add_argument('--temperature', type=float, default=4.0)
+    parser.add_argument('--alpha', type=float, default=0.1, help="Weight on true labels vs teacher")
+    
+    # Pruning + quantization of an already trained model
+    parser.add_argument('--compress', help="Trained .h5 to prune/quantize into an int8 .tflite")
+    parser.add_argument('--sparsity', type=float, default=0.5)
+    parser.add_argument('--structured', action='store_true', help="Prune whole filters")
+    parser.add_argument('--no-prune', action='store_true')
+    parser.add_argument('--no-qat', action='store_true')
+    
+    # Crash-safe training + fine-tuning the deployed model
+    parser.add_argument('--checkpoint-dir', help="Full-state checkpoints (default: models/checkpoints)")
+    parser.add_argument('--checkpoint-every', type=int, default=500,
+                        help="Checkpoint interval in steps (0 disables checkpoints/resume)")
+    parser.add_argument('--finetune', nargs='?', const='models/emotion_model.h5',
+                        help="Fine-tune this model (default: the deployed one) on --train-dir")
+    parser.add_argument('--freeze-features', action='store_true', help="Fine-tune the dense head only")
+    
+    # Where does a training step's time go?
+    parser.add_argument('--profile-log', help="Per-step timing/memory log (.jsonl or .csv)")
+    parser.add_argument('--profile-trace', help="FIRST,LAST global steps to capture a TensorBoard trace for")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    trace_steps = tuple(int(s) for s in args.profile_trace.split(',')) if args.profile_trace else None
+    
     print("🎭 Emotion Recognition Model Training")
     print("=" * 50)
     
     # Check if training data exists
-    if not os.path.exists('data/train') or not os.path.exists('data/validation'):
+    if not os.path.exists(args.train_dir) or not os.path.exists(args.val_dir):
         print("\n⚠ Training data not found!")
         create_sample_training_structure()
         print("\n" + "=" * 50)
@@ -211,15 +880,61 @@ To train the emotion recognition model:
        └── neutral/
 
 3. Run the training script:
-   python logic/train.py
+   python core/train.py
 
 4. The trained model will be saved to 'models/emotion_model.h5'
         """)
+    elif args.finetune:
+        finetune_emotion_model(
+            base_model_path=args.finetune,
+            train_data_path=args.train_dir,
+            val_data_path=args.val_dir,
+            epochs=args.epochs if args.epochs is not None else 5,
+            batch_size=args.batch_size,
+            lr=args.lr if args.lr is not None else 1e-4,
+            freeze_features=args.freeze_features,
+            checkpoint_dir=args.checkpoint_dir,
+            checkpoint_every=args.checkpoint_every,
+            profile_log=args.profile_log,
+            profile_trace_steps=trace_steps
+        )
+    elif args.compress:
+        compress_emotion_model(
+            model_path=args.compress,
+            train_data_path=args.train_dir,
+            val_data_path=args.val_dir,
+            prune=not args.no_prune,
+            target_sparsity=args.sparsity,
+            structured=args.structured,
+            qat=not args.no_qat,
+            batch_size=args.batch_size
+        )
+    elif args.distill:
+        distill_emotion_model(
+            teacher_path=args.teacher,
+            train_data_path=args.train_dir,
+            val_data_path=args.val_dir,
+            student_arch=args.student_arch,
+            temperature=args.temperature,
+            alpha=args.alpha,
+            epochs=args.epochs if args.epochs is not None else 50,
+            batch_size=args.batch_size,
+            lr=args.lr if args.lr is not None else 0.001
+        )
+    elif args.benchmark_input:
+        benchmark_input_pipeline(args.train_dir, batch_size=args.batch_size, shard_dir=args.benchmark_shards)
     else:
         # Training data exists, start training
         train_emotion_model(
-            train_data_path='data/train',
-            val_data_path='data/validation',
-            epochs=50,
-            batch_size=32
+            train_data_path=args.train_dir,
+            val_data_path=args.val_dir,
+            epochs=args.epochs if args.epochs is not None else 50,
+            batch_size=args.batch_size,
+            arch=args.arch,
+            lr=args.lr if args.lr is not None else 0.001,
+            augment_strength=args.augment_strength,
+            checkpoint_dir=args.checkpoint_dir,
+            checkpoint_every=args.checkpoint_every,
+            profile_log=args.profile_log,
+            profile_trace_steps=trace_steps
         )
@@ -0,0 +1,124 @@
+"""
+History Archive
+---------------
+Old detection_history rows get moved out of SQLite into compressed
+column files, one folder per day:
+
+    data/archive/date=2025-01-31/part-000101-000250.json.gz
+
+Each file is a gzipped JSON object of columns ({"id": [...], "user_id": [...], ...}),
+so it's small on disk and we only decode what we read. The rollup tables
+are never touched, so dashboard totals stay correct after archiving.
+
+Run the retention job from cron or by hand:
+    python -m data.archive --keep-days 90
+"""
+
+import gzip
+import json
+import os
+import argparse
+from collections import defaultdict
+
+
+# Same order as the SELECTs in DatabaseManager, so rows round-trip as tuples
+ARCHIVE_COLUMNS = ['id', 'detection_time', 'num_faces', 'emotions_detected', 'average_confidence', 'user_id']
+
+# Default retention policy (can be overridden per run)
+RETENTION_POLICY = {
+    'keep_days': 90,      # rows older than this leave the live DB
+    'chunk_size': 5000,   # rows per read/write/delete round
+}
+
+
+class HistoryArchive:
+    def __init__(self, root='data/archive'):
+        self.root = root
+
+    def write_chunk(self, rows):
+        """
+        Writes one chunk of history rows (tuples in ARCHIVE_COLUMNS order),
+        split into day partitions. Files are written to a temp name and
+        renamed, so a crash never leaves half a file behind.
+        """
+        by_day = defaultdict(list)
+        for row in rows:
+            by_day[str(row[1])[:10]].append(row)
+
+        written = []
+        for day, day_rows in by_day.items():
+            part_dir = os.path.join(self.root, f'date={day}')
+            os.makedirs(part_dir, exist_ok=True)
+
+            ids = [r[0] for r in day_rows]
+            path = os.path.join(part_dir, f'part-{min(ids):06d}-{max(ids):06d}.json.gz')
+            tmp_path = path + '.tmp'
+
+            columns = {name: [r[i] for r in day_rows] for i, name in enumerate(ARCHIVE_COLUMNS)}
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump(columns, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+
+            written.append(path)
+
+        return written
+
+    def partitions(self):
+        """Day partitions on disk, newest first"""
+        if not os.path.isdir(self.root):
+            return []
+        days = [d[len('date='):] for d in os.listdir(self.root) if d.startswith('date=')]
+        return sorted(days, reverse=True)
+
+    def read_partition(self, day, user_id=None):
+        """All rows for one day (optionally one user), newest first"""
+        part_dir = os.path.join(self.root, f'date={day}')
+        rows = {}
+
+        for name in os.listdir(part_dir):
+            if not name.endswith('.json.gz'):
+                continue
+            with gzip.open(os.path.join(part_dir, name), 'rt', encoding='utf-8') as f:
+                columns = json.load(f)
+
+            for row in zip(*(columns[c] for c in ARCHIVE_COLUMNS)):
+                if user_id is None or row[5] == user_id:
+                    # Keyed by id: a re-run after a crash can archive a row twice
+                    rows[row[0]] = row
+
+        return sorted(rows.values(), key=lambda r: (r[1], r[0]), reverse=True)
+
+    def iter_rows(self, user_id=None, before=None):
+        """
+        Streams archived rows newest first, one day at a time.
+        `before` is an optional (detection_time, id) keyset bound.
+        """
+        for day in self.partitions():
+            if before is not None and day > str(before[0])[:10]:
+                continue
+            for row in self.read_partition(day, user_id):
+                if before is not None and (row[1], row[0]) >= (before[0], before[1]):
+                    continue
+                yield row
+
+
+def main():
+    # Imported here so this file doesn't need the DB layer just to read archives
+    from data.db_handler import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Move old detection history into the archive")
+    parser.add_argument('--db', default='data/users.db')
+    parser.add_argument('--keep-days', type=int, default=RETENTION_POLICY['keep_days'])
+    parser.add_argument('--chunk-size', type=int, default=RETENTION_POLICY['chunk_size'])
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    result = db.archive_old_history(keep_days=args.keep_days, chunk_size=args.chunk_size)
+    print(f"Archived {result['archived']} rows for {result['users']} user(s) "
+          f"into {result['files']} file(s)")
+
+
+if __name__ == "__main__":
+    main()
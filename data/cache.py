@@ -0,0 +1,116 @@
+"""
+Query Cache
+-----------
+Tiny in-process cache for the dashboard read queries.
+Entries are per user, expire after a TTL, and the oldest ones get
+kicked out once we hit the size limit. Writes for a user wipe that
+user's entries so nobody ever sees stale numbers.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    def __init__(self, ttl=300, max_entries=2048):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # (db_path, user_id, key) -> (expires_at, value), oldest first
+        self._entries = OrderedDict()
+        # (db_path, user_id) -> set of keys, so invalidation doesn't scan everything
+        self._by_user = {}
+        # Bumped on every invalidation; stops a slow read from caching stale data
+        self._generations = {}
+
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, db_path, user_id):
+        """Current write generation for a user (grab it before loading)"""
+        with self._lock:
+            return self._generations.get((db_path, user_id), 0)
+
+    def get(self, db_path, user_id, key):
+        """Returns (hit, value). Values are copies so callers can mutate them."""
+        full_key = (db_path, user_id, key)
+
+        with self._lock:
+            entry = self._entries.get(full_key)
+
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(full_key)
+                self.misses += 1
+                return False, None
+
+            self._entries.move_to_end(full_key)
+            self.hits += 1
+            value = entry[1]
+
+        return True, copy.deepcopy(value)
+
+    def put(self, db_path, user_id, key, value, generation):
+        """Stores a value, unless the user got a write since `generation`"""
+        full_key = (db_path, user_id, key)
+        value = copy.deepcopy(value)
+
+        with self._lock:
+            if self._generations.get((db_path, user_id), 0) != generation:
+                return
+
+            self._entries[full_key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(full_key)
+            self._by_user.setdefault((db_path, user_id), set()).add(key)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._drop(oldest)
+
+    def invalidate(self, db_path, user_id):
+        """Forgets everything cached for one user"""
+        user_key = (db_path, user_id)
+
+        with self._lock:
+            self._generations[user_key] = self._generations.get(user_key, 0) + 1
+            for key in self._by_user.pop(user_key, ()):
+                self._entries.pop((db_path, user_id, key), None)
+
+    def clear(self):
+        with self._lock:
+            for user_key in self._by_user:
+                self._generations[user_key] = self._generations.get(user_key, 0) + 1
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        """Hit/miss counters for debugging and the ops page"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0
+            }
+
+    def _drop(self, full_key):
+        """Removes one entry (caller holds the lock)"""
+        self._entries.pop(full_key, None)
+        db_path, user_id, key = full_key
+        keys = self._by_user.get((db_path, user_id))
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[(db_path, user_id)]
+
+
+# One cache for the whole process, shared by every session's DatabaseManager
+_query_cache = QueryCache()
+
+
+def get_query_cache():
+    return _query_cache
@@ -7,20 +7,90 @@ Nothing fancy, just basic CRUD operations.
 
 import sqlite3
 import os
-from datetime import datetime
+import time
+import base64
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 import json
 
+from core import metrics
+from data.cache import get_query_cache
+from data.archive import HistoryArchive, RETENTION_POLICY
+from data.downsample import lttb
+
+
+# Same format SQLite uses for CURRENT_TIMESTAMP (UTC)
+TS_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Rollup tables we keep, and how a timestamp gets floored into a bucket.
+# Buckets are stored in TS_FORMAT too so ranges compare as plain strings.
+ROLLUP_GRAINS = {
+    'hour': '%Y-%m-%d %H:00:00',
+    'day': '%Y-%m-%d 00:00:00',
+}
+
+# Most points a history chart ever gets, however much history there is
+HISTORY_POINT_BUDGET = 300
+
+# Fetch up to this many times the budget in hourly buckets before falling back to daily
+SERIES_OVERSAMPLE = 4
+
+
+def _to_utc_ts(value):
+    """Turns a datetime/ISO string into a naive UTC datetime (naive = already UTC)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def _utc_now():
+    """Current time in the same shape as CURRENT_TIMESTAMP"""
+    return datetime.now(timezone.utc).strftime(TS_FORMAT)
+
+
+class _TrackedConnection(sqlite3.Connection):
+    """
+    Plain sqlite3 connection that also reports to core.metrics: how many are
+    open right now (running or waiting on the write lock) and how long each was held.
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._opened = time.perf_counter()
+        self._tracked = True
+        metrics.gauge_add('db_connections', 1)
+    
+    def _release(self):
+        if getattr(self, '_tracked', False):
+            self._tracked = False
+            metrics.gauge_add('db_connections', -1)
+            metrics.record('db_connection', time.perf_counter() - self._opened)
+    
+    def close(self):
+        self._release()
+        super().close()
+    
+    def __del__(self):
+        # Some error paths never call close(); catch those once they get collected
+        self._release()
+
 
 class DatabaseManager:
-    def __init__(self, db_path='data/users.db'):
+    def __init__(self, db_path='data/users.db', cache=None, archive_dir=None):
         self.db_path = db_path
+        # Dashboard reads go through a process-wide cache shared by all sessions
+        self.cache = cache if cache is not None else get_query_cache()
+        # Old history lives here once the retention job moves it out
+        self.archive = HistoryArchive(archive_dir or os.path.join(os.path.dirname(db_path), 'archive'))
         # Make sure the folder exists!
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         self._init_db()
     
     def _get_conn(self):
         """Quick helper to get a connection"""
-        return sqlite3.connect(self.db_path)
+        return sqlite3.connect(self.db_path, factory=_TrackedConnection)
     
     def _init_db(self):
         """Sets up the tables if they don't exist"""
@@ -28,6 +98,10 @@ class DatabaseManager:
             conn = self._get_conn()
             cursor = conn.cursor()
             
+            # Lets the retention job hand freed pages back to the OS.
+            # Only sticks on a brand new file; older DBs get switched over by the job.
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            
             # Table for users
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -64,6 +138,38 @@ class DatabaseManager:
                 )
             ''')
             
+            self._create_history_indexes(cursor)
+            
+            # Hourly/daily rollups so the dashboard never has to scan history
+            for grain in ROLLUP_GRAINS:
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS rollup_{grain} (
+                        user_id INTEGER NOT NULL,
+                        bucket TEXT NOT NULL,
+                        detections INTEGER DEFAULT 0,
+                        faces INTEGER DEFAULT 0,
+                        confidence_sum REAL DEFAULT 0,
+                        PRIMARY KEY (user_id, bucket)
+                    )
+                ''')
+                cursor.execute(f'''
+                    CREATE TABLE IF NOT EXISTS rollup_{grain}_emotions (
+                        user_id INTEGER NOT NULL,
+                        bucket TEXT NOT NULL,
+                        emotion TEXT NOT NULL,
+                        count INTEGER DEFAULT 0,
+                        PRIMARY KEY (user_id, bucket, emotion)
+                    )
+                ''')
+            
+            # Older databases have history but no rollups yet
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM detection_history)')
+            has_history = cursor.fetchone()[0]
+            cursor.execute('SELECT EXISTS (SELECT 1 FROM rollup_day)')
+            has_rollups = cursor.fetchone()[0]
+            if has_history and not has_rollups:
+                self._rebuild_rollups(cursor)
+            
             conn.commit()
             conn.close()
             print("Database ready!")
@@ -71,6 +177,17 @@ class DatabaseManager:
         except Exception as e:
             print(f"DB Init failed: {e}")
     
+    def _create_history_indexes(self, cursor):
+        """Covers both "latest N" and keyset paging for a user"""
+        cursor.execute('''
+            CREATE INDEX IF NOT EXISTS idx_history_user_time
+            ON detection_history (user_id, detection_time, id)
+        ''')
+    
+    def _drop_history_indexes(self, cursor):
+        """Bulk loads are much faster without the index; rebuild it after"""
+        cursor.execute('DROP INDEX IF EXISTS idx_history_user_time')
+    
     def create_user(self, username, email=None):
         """Adds a new user to the db"""
         try:
@@ -88,7 +205,9 @@ class DatabaseManager:
             return uid
             
         except sqlite3.IntegrityError:
-            # User probably already exists, just get their ID
+            # User probably already exists, just get their ID.
+            # Close first: the failed INSERT still holds the write lock.
+            conn.close()
             return self.get_user_by_username(username)['id']
         except Exception as e:
             print(f"Could not create user: {e}")
@@ -150,27 +269,59 @@ class DatabaseManager:
             # JSON dump the list because SQLite doesn't have arrays
             emo_json = json.dumps(emotions)
             
+            # Pin the timestamp here so the row and its rollup buckets agree
+            now = _utc_now()
+            
             cursor.execute('''
                 INSERT INTO detection_history 
-                (user_id, num_faces, emotions_detected, average_confidence)
-                VALUES (?, ?, ?, ?)
-            ''', (user_id, num_faces, emo_json, avg_conf))
+                (user_id, detection_time, num_faces, emotions_detected, average_confidence)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, now, num_faces, emo_json, avg_conf))
             
             hid = cursor.lastrowid
             
             # Also update the aggregate stats
             for emo in emotions:
                 self._update_stats(cursor, user_id, emo)
+            self._update_rollups(cursor, [(user_id, now, num_faces, emotions, avg_conf)])
             
             conn.commit()
             conn.close()
+            
+            # Whatever we cached for this user is out of date now
+            self.cache.invalidate(self.db_path, user_id)
             return hid
             
         except Exception as e:
             print(f"History save failed: {e}")
             return None
     
-    def _update_stats(self, cursor, user_id, emotion):
+    def save_detection_history_batch(self, user_id, detections):
+        """
+        Logs many detection events in one transaction (batch uploads).
+        Each detection is (num_faces, emotions, avg_conf). Returns how many got saved.
+        """
+        if not detections:
+            return 0
+        
+        try:
+            conn = self._get_conn()
+            try:
+                cursor = conn.cursor()
+                now = _utc_now()
+                self._insert_history_rows(cursor, [(user_id, now, n, emotions, conf) for n, emotions, conf in detections])
+                conn.commit()
+            finally:
+                conn.close()
+            
+            self.cache.invalidate(self.db_path, user_id)
+            return len(detections)
+            
+        except Exception as e:
+            print(f"Batch history save failed: {e}")
+            return 0
+    
+    def _update_stats(self, cursor, user_id, emotion, n=1):
         """Helper to update the counts"""
         cursor.execute('''
             SELECT id, count FROM emotion_stats
@@ -182,52 +333,511 @@ class DatabaseManager:
         if row:
             cursor.execute('''
                 UPDATE emotion_stats
-                SET count = count + 1, last_detected = ?
+                SET count = count + ?, last_detected = ?
                 WHERE id = ?
-            ''', (datetime.now(), row[0]))
+            ''', (n, datetime.now(), row[0]))
         else:
             cursor.execute('''
                 INSERT INTO emotion_stats (user_id, emotion, count)
-                VALUES (?, ?, 1)
-            ''', (user_id, emotion))
+                VALUES (?, ?, ?)
+            ''', (user_id, emotion, n))
+    
+    def _update_rollups(self, cursor, detections):
+        """
+        Bumps the hourly/daily buckets for a batch of detections.
+        Each detection is (user_id, detection_time, num_faces, emotions, avg_conf).
+        Everything is summed up in Python first so each bucket is one upsert.
+        """
+        for grain, fmt in ROLLUP_GRAINS.items():
+            totals = {}
+            emotion_counts = Counter()
+            
+            for user_id, detection_time, num_faces, emotions, avg_conf in detections:
+                bucket = _to_utc_ts(detection_time).strftime(fmt)
+                
+                agg = totals.setdefault((user_id, bucket), [0, 0, 0.0])
+                agg[0] += 1
+                agg[1] += int(num_faces or 0)
+                agg[2] += float(avg_conf or 0.0)
+                
+                for emo in emotions:
+                    emotion_counts[(user_id, bucket, emo)] += 1
+            
+            cursor.executemany(f'''
+                INSERT INTO rollup_{grain} (user_id, bucket, detections, faces, confidence_sum)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (user_id, bucket) DO UPDATE SET
+                    detections = detections + excluded.detections,
+                    faces = faces + excluded.faces,
+                    confidence_sum = confidence_sum + excluded.confidence_sum
+            ''', [(u, b, n, f, c) for (u, b), (n, f, c) in totals.items()])
+            
+            cursor.executemany(f'''
+                INSERT INTO rollup_{grain}_emotions (user_id, bucket, emotion, count)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (user_id, bucket, emotion) DO UPDATE SET
+                    count = count + excluded.count
+            ''', [(u, b, emo, n) for (u, b, emo), n in emotion_counts.items()])
+    
+    def _insert_history_rows(self, cursor, detections):
+        """
+        Bulk version of save_detection_history for an open cursor: one
+        executemany for the rows, then stats and rollups bumped per bucket.
+        Each detection is (user_id, detection_time, num_faces, emotions, avg_conf).
+        """
+        cursor.executemany('''
+            INSERT INTO detection_history
+            (user_id, detection_time, num_faces, emotions_detected, average_confidence)
+            VALUES (?, ?, ?, ?, ?)
+        ''', [(u, t, n, json.dumps(e), c) for u, t, n, e, c in detections])
+        
+        per_emotion = Counter()
+        for user_id, _, _, emotions, _ in detections:
+            for emo in emotions:
+                per_emotion[(user_id, emo)] += 1
+        for (user_id, emo), n in per_emotion.items():
+            self._update_stats(cursor, user_id, emo, n)
+        
+        self._update_rollups(cursor, detections)
+    
+    def _rebuild_rollups(self, cursor, chunk_size=5000):
+        """Recomputes every rollup bucket from detection_history (one-off backfill)"""
+        for grain in ROLLUP_GRAINS:
+            cursor.execute(f'DELETE FROM rollup_{grain}')
+            cursor.execute(f'DELETE FROM rollup_{grain}_emotions')
+        
+        # Separate cursor so we can stream rows while writing buckets
+        reader = cursor.connection.cursor()
+        reader.execute('''
+            SELECT user_id, detection_time, num_faces, emotions_detected, average_confidence
+            FROM detection_history
+        ''')
+        while True:
+            rows = reader.fetchmany(chunk_size)
+            if not rows:
+                break
+            self._update_rollups(cursor, [(u, t, n, json.loads(e), c) for u, t, n, e, c in rows])
+    
+    def _rollup_segments(self, start, end):
+        """
+        Splits [start, end) into (grain, lo, hi) pieces: hourly buckets for the
+        ragged edges and daily buckets for the whole days in between.
+        None means open-ended on that side.
+        """
+        if start is not None:
+            start = _to_utc_ts(start).replace(minute=0, second=0, microsecond=0)
+        if end is not None:
+            end = _to_utc_ts(end)
+            # Round up so a partial last hour is still counted
+            if end != end.replace(minute=0, second=0, microsecond=0):
+                end = end.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        
+        if start is None:
+            day_lo = None
+        else:
+            day_lo = start.replace(hour=0)
+            if day_lo < start:
+                day_lo += timedelta(days=1)
+        day_hi = None if end is None else end.replace(hour=0)
+        
+        fmt = lambda d: None if d is None else d.strftime(TS_FORMAT)
+        
+        if day_lo is not None and day_hi is not None and day_lo >= day_hi:
+            # Range doesn't cover a whole day, hours are enough
+            return [('hour', fmt(start), fmt(end))]
+        
+        segments = []
+        if start is not None and start < day_lo:
+            segments.append(('hour', fmt(start), fmt(day_lo)))
+        segments.append(('day', fmt(day_lo), fmt(day_hi)))
+        if end is not None and day_hi < end:
+            segments.append(('hour', fmt(day_hi), fmt(end)))
+        return segments
+    
+    def _cached(self, user_id, key, loader):
+        """Read-through helper: serve from the shared cache or run `loader` and remember it"""
+        hit, value = self.cache.get(self.db_path, user_id, key)
+        if hit:
+            return value
+        
+        # Grab the generation first so a write that lands mid-query wins
+        generation = self.cache.generation(self.db_path, user_id)
+        value = loader()
+        self.cache.put(self.db_path, user_id, key, value, generation)
+        return value
+    
+    def get_emotion_summary(self, user_id, start=None, end=None):
+        """
+        Emotion mix and average confidence over [start, end) from the rollups.
+        Resolution is one hour; cost grows with the number of buckets, not detections.
+        """
+        try:
+            key = ('summary', str(start), str(end))
+            return self._cached(user_id, key, lambda: self._query_emotion_summary(user_id, start, end))
+            
+        except Exception as e:
+            print(f"Summary lookup failed: {e}")
+            return {
+                'detections': 0,
+                'faces': 0,
+                'average_confidence': 0.0,
+                'emotions': {}
+            }
+    
+    def _query_emotion_summary(self, user_id, start, end):
+        conn = self._get_conn()
+        try:
+            return self._summary_from(conn.cursor(), user_id, start, end)
+        finally:
+            conn.close()
+    
+    def _summary_from(self, cursor, user_id, start, end):
+        """Rollup summary over [start, end) using an already open cursor"""
+        summary = {
+            'detections': 0,
+            'faces': 0,
+            'average_confidence': 0.0,
+            'emotions': {}
+        }
+        conf_sum = 0.0
+        emotions = Counter()
+        
+        for grain, lo, hi in self._rollup_segments(start, end):
+            # '' sorts before and '~' after any timestamp string
+            bounds = (user_id, lo or '', hi or '~')
+            
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(detections), 0), COALESCE(SUM(faces), 0),
+                       COALESCE(SUM(confidence_sum), 0)
+                FROM rollup_{grain}
+                WHERE user_id = ? AND bucket >= ? AND bucket < ?
+            ''', bounds)
+            detections, faces, seg_conf = cursor.fetchone()
+            summary['detections'] += detections
+            summary['faces'] += faces
+            conf_sum += seg_conf
+            
+            cursor.execute(f'''
+                SELECT emotion, SUM(count)
+                FROM rollup_{grain}_emotions
+                WHERE user_id = ? AND bucket >= ? AND bucket < ?
+                GROUP BY emotion
+            ''', bounds)
+            for emo, count in cursor.fetchall():
+                emotions[emo] += count
+        
+        if summary['detections']:
+            summary['average_confidence'] = conf_sum / summary['detections']
+        summary['emotions'] = dict(emotions.most_common())
+        return summary
+    
+    def get_confidence_series(self, user_id, start=None, end=None, max_points=HISTORY_POINT_BUDGET):
+        """
+        Confidence over time in [start, end), oldest first, never more than
+        max_points points. Small ranges come back as raw detections; bigger
+        ones as hourly/daily rollup averages, LTTB-downsampled to fit.
+        So the cost depends on the point budget, not on how much history there is.
+        """
+        try:
+            key = ('series', str(start), str(end), max_points)
+            return self._cached(user_id, key, lambda: self._query_confidence_series(user_id, start, end, max_points))
+        
+        except Exception as e:
+            print(f"Series lookup failed: {e}")
+            return {'points': [], 'resolution': 'raw', 'detections': 0}
+    
+    def _query_confidence_series(self, user_id, start, end, max_points):
+        conn = self._get_conn()
+        try:
+            return self._series_from(conn.cursor(), user_id, start, end, max_points)
+        finally:
+            conn.close()
+    
+    def _series_from(self, cursor, user_id, start, end, max_points):
+        """Downsampled confidence series over [start, end) using an already open cursor"""
+        # Whole hours, same as the rollups, so raw rows and bucket totals line up
+        segments = self._rollup_segments(start, end)
+        lo = segments[0][1] or ''
+        hi = segments[-1][2] or '~'
+        
+        # How many detections are we talking about? (rollups, so this is cheap)
+        total = 0
+        for grain, seg_lo, seg_hi in segments:
+            cursor.execute(f'''
+                SELECT COALESCE(SUM(detections), 0)
+                FROM rollup_{grain}
+                WHERE user_id = ? AND bucket >= ? AND bucket < ?
+            ''', (user_id, seg_lo or '', seg_hi or '~'))
+            total += cursor.fetchone()[0]
+        
+        if total <= max_points:
+            cursor.execute('''
+                SELECT detection_time, average_confidence
+                FROM detection_history
+                WHERE user_id = ? AND detection_time >= ? AND detection_time < ?
+                ORDER BY detection_time, id
+                LIMIT ?
+            ''', (user_id, lo, hi, max_points + 1))
+            rows = cursor.fetchall()
+            
+            # Fewer rows than the rollups say means some got archived, use buckets then
+            if len(rows) >= total:
+                points = [{'time': t, 'confidence': c, 'detections': 1} for t, c in rows[:max_points]]
+                return {'points': points, 'resolution': 'raw', 'detections': total}
+        
+        # Hourly buckets if there aren't too many of them, daily otherwise
+        hour_limit = max_points * SERIES_OVERSAMPLE
+        cursor.execute('''
+            SELECT bucket, detections, confidence_sum
+            FROM rollup_hour
+            WHERE user_id = ? AND bucket >= ? AND bucket < ?
+            ORDER BY bucket
+            LIMIT ?
+        ''', (user_id, lo, hi, hour_limit + 1))
+        rows = cursor.fetchall()
+        resolution = 'hour'
+        
+        if len(rows) > hour_limit:
+            day_lo = lo and lo[:10] + ' 00:00:00'
+            cursor.execute('''
+                SELECT bucket, detections, confidence_sum
+                FROM rollup_day
+                WHERE user_id = ? AND bucket >= ? AND bucket < ?
+                ORDER BY bucket
+            ''', (user_id, day_lo, hi))
+            rows = cursor.fetchall()
+            resolution = 'day'
+        
+        points = [
+            {'time': bucket, 'confidence': conf_sum / n, 'detections': n}
+            for bucket, n, conf_sum in rows if n
+        ]
+        
+        if len(points) > max_points:
+            epoch = datetime(1970, 1, 1)
+            xs = [(datetime.strptime(p['time'], TS_FORMAT) - epoch).total_seconds() for p in points]
+            ys = [p['confidence'] for p in points]
+            points = [points[i] for i in lttb(xs, ys, max_points)]
+        
+        return {'points': points, 'resolution': resolution, 'detections': total}
+    
+    def get_dashboard_snapshot(self, user_id, history_limit=20, start=None, max_points=HISTORY_POINT_BUDGET):
+        """
+        Everything the statistics page needs in one go: totals, emotion mix,
+        lifetime average confidence and the newest page of history, plus the
+        rollup summary ('range') and downsampled confidence series ('series')
+        since `start` (None = all time).
+        All read in a single transaction, so the numbers always agree.
+        """
+        try:
+            key = ('snapshot', history_limit, str(start), max_points)
+            return self._cached(
+                user_id, key,
+                lambda: self._query_dashboard_snapshot(user_id, history_limit, start, max_points)
+            )
+            
+        except Exception as e:
+            print(f"Snapshot lookup failed: {e}")
+            return {
+                'total_detections': 0,
+                'total_faces': 0,
+                'average_confidence': 0.0,
+                'top_emotion': None,
+                'emotion_stats': {},
+                'history': {'items': [], 'next_cursor': None},
+                'range': {'detections': 0, 'faces': 0, 'average_confidence': 0.0, 'emotions': {}},
+                'series': {'points': [], 'resolution': 'raw', 'detections': 0}
+            }
+    
+    def _query_dashboard_snapshot(self, user_id, history_limit, start=None, max_points=HISTORY_POINT_BUDGET):
+        conn = self._get_conn()
+        # Manage the transaction ourselves so every SELECT sees the same data
+        conn.isolation_level = None
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN')
+            
+            # Lifetime totals from the daily rollups (one row per active day)
+            cursor.execute('''
+                SELECT COALESCE(SUM(detections), 0), COALESCE(SUM(faces), 0),
+                       COALESCE(SUM(confidence_sum), 0)
+                FROM rollup_day
+                WHERE user_id = ?
+            ''', (user_id,))
+            total, faces, conf_sum = cursor.fetchone()
+            
+            cursor.execute('''
+                SELECT emotion, count, last_detected
+                FROM emotion_stats
+                WHERE user_id = ?
+                ORDER BY count DESC
+            ''', (user_id,))
+            stat_rows = cursor.fetchall()
+            
+            cursor.execute('''
+                SELECT id, detection_time, num_faces, emotions_detected, average_confidence
+                FROM detection_history
+                WHERE user_id = ?
+                ORDER BY detection_time DESC, id DESC
+                LIMIT ?
+            ''', (user_id, history_limit + 1))
+            history_rows = cursor.fetchall()
+            
+            # Range summary + chart points, still inside the same transaction
+            range_summary = self._summary_from(cursor, user_id, start, None)
+            series = self._series_from(cursor, user_id, start, None, max_points)
+            
+            cursor.execute('COMMIT')
+        finally:
+            conn.close()
+        
+        stats = {row[0]: {'count': row[1], 'last_detected': row[2]} for row in stat_rows}
+        
+        history = {'items': [self._history_row(row) for row in history_rows[:history_limit]], 'next_cursor': None}
+        if len(history_rows) > history_limit:
+            last = history['items'][-1]
+            history['next_cursor'] = self._encode_cursor(last['time'], last['id'])
+        
+        return {
+            'total_detections': total,
+            'total_faces': faces,
+            'average_confidence': conf_sum / total if total else 0.0,
+            'top_emotion': stat_rows[0][0] if stat_rows else None,
+            'emotion_stats': stats,
+            'history': history,
+            'range': range_summary,
+            'series': series
+        }
     
     def get_user_history(self, user_id, limit=10):
         """Fetches recent history"""
         try:
-            conn = self._get_conn()
+            return self._cached(user_id, ('history', limit), lambda: self._query_user_history(user_id, limit))
+            
+        except Exception as e:
+            print(f"History lookup failed: {e}")
+            return []
+    
+    def _query_user_history(self, user_id, limit):
+        conn = self._get_conn()
+        try:
             cursor = conn.cursor()
             
             cursor.execute('''
                 SELECT id, detection_time, num_faces, emotions_detected, average_confidence
                 FROM detection_history
                 WHERE user_id = ?
-                ORDER BY detection_time DESC
+                ORDER BY detection_time DESC, id DESC
                 LIMIT ?
             ''', (user_id, limit))
             
             rows = cursor.fetchall()
+        finally:
             conn.close()
-            
-            history = []
-            for row in rows:
-                history.append({
-                    'id': row[0],
-                    'time': row[1],
-                    'num_faces': row[2],
-                    'emotions': json.loads(row[3]),
-                    'confidence': row[4]
-                })
-            
-            return history
+        
+        return [self._history_row(row) for row in rows]
+    
+    def get_history_page(self, user_id, cursor=None, page_size=20, include_archived=False):
+        """
+        One page of history, newest first, keyset-paginated on (detection_time, id).
+        Pass the returned 'next_cursor' back in to get the next page; it's None
+        once we run out. Every page costs the same no matter how deep you go.
+        With include_archived=True, paging carries on into the archive
+        files once the live rows run out (slower, reads from disk).
+        """
+        try:
+            key = ('page', cursor, page_size, include_archived)
+            return self._cached(
+                user_id, key,
+                lambda: self._query_history_page(user_id, cursor, page_size, include_archived)
+            )
             
         except Exception as e:
-            print(f"History lookup failed: {e}")
-            return []
+            print(f"History page lookup failed: {e}")
+            return {'items': [], 'next_cursor': None}
+    
+    def _query_history_page(self, user_id, cursor, page_size, include_archived=False):
+        conn = self._get_conn()
+        try:
+            db_cursor = conn.cursor()
+            
+            # Grab one extra row so we know if there's another page
+            if cursor:
+                last_time, last_id = self._decode_cursor(cursor)
+                db_cursor.execute('''
+                    SELECT id, detection_time, num_faces, emotions_detected, average_confidence
+                    FROM detection_history
+                    WHERE user_id = ? AND (detection_time, id) < (?, ?)
+                    ORDER BY detection_time DESC, id DESC
+                    LIMIT ?
+                ''', (user_id, last_time, last_id, page_size + 1))
+            else:
+                db_cursor.execute('''
+                    SELECT id, detection_time, num_faces, emotions_detected, average_confidence
+                    FROM detection_history
+                    WHERE user_id = ?
+                    ORDER BY detection_time DESC, id DESC
+                    LIMIT ?
+                ''', (user_id, page_size + 1))
+            
+            rows = db_cursor.fetchall()
+        finally:
+            conn.close()
+        
+        # Live rows ran out, keep going in the archive from where they stopped
+        if include_archived and len(rows) <= page_size:
+            if rows:
+                before = (rows[-1][1], rows[-1][0])
+            elif cursor:
+                before = self._decode_cursor(cursor)
+            else:
+                before = None
+            
+            for row in self.archive.iter_rows(user_id, before=before):
+                rows.append(row[:5])
+                if len(rows) > page_size:
+                    break
+        
+        page = {'items': [self._history_row(row) for row in rows[:page_size]], 'next_cursor': None}
+        if len(rows) > page_size:
+            last = page['items'][-1]
+            page['next_cursor'] = self._encode_cursor(last['time'], last['id'])
+        return page
+    
+    @staticmethod
+    def _history_row(row):
+        """Turns a detection_history row into the dict the UI uses"""
+        return {
+            'id': row[0],
+            'time': row[1],
+            'num_faces': row[2],
+            'emotions': json.loads(row[3]),
+            'confidence': row[4]
+        }
+    
+    @staticmethod
+    def _encode_cursor(detection_time, row_id):
+        """Opaque page token, just the last (time, id) we handed out"""
+        raw = json.dumps([str(detection_time), row_id]).encode()
+        return base64.urlsafe_b64encode(raw).decode()
+    
+    @staticmethod
+    def _decode_cursor(token):
+        last_time, last_id = json.loads(base64.urlsafe_b64decode(token.encode()))
+        return last_time, int(last_id)
     
     def get_emotion_statistics(self, user_id):
         """Gets the aggregate stats"""
         try:
-            conn = self._get_conn()
+            return self._cached(user_id, ('stats',), lambda: self._query_emotion_statistics(user_id))
+            
+        except Exception as e:
+            print(f"Stats lookup failed: {e}")
+            return {}
+    
+    def _query_emotion_statistics(self, user_id):
+        conn = self._get_conn()
+        try:
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -238,36 +848,104 @@ class DatabaseManager:
             ''', (user_id,))
             
             rows = cursor.fetchall()
+        finally:
             conn.close()
-            
-            stats = {}
-            for row in rows:
-                stats[row[0]] = {
-                    'count': row[1],
-                    'last_detected': row[2]
-                }
-            
-            return stats
-            
-        except Exception as e:
-            print(f"Stats lookup failed: {e}")
-            return {}
+        
+        stats = {}
+        for row in rows:
+            stats[row[0]] = {
+                'count': row[1],
+                'last_detected': row[2]
+            }
+        
+        return stats
     
     def get_total_detections(self, user_id):
         """Counts total detections"""
         try:
-            conn = self._get_conn()
+            return self._cached(user_id, ('total',), lambda: self._query_total_detections(user_id))
+            
+        except Exception as e:
+            print(f"Count lookup failed: {e}")
+            return 0
+    
+    def _query_total_detections(self, user_id):
+        conn = self._get_conn()
+        try:
             cursor = conn.cursor()
             
+            # Rollups count archived rows too, and it's one row per day instead of per detection
             cursor.execute('''
-                SELECT COUNT(*) FROM detection_history
+                SELECT COALESCE(SUM(detections), 0) FROM rollup_day
                 WHERE user_id = ?
             ''', (user_id,))
             
-            count = cursor.fetchone()[0]
+            return cursor.fetchone()[0]
+        finally:
             conn.close()
-            return count
-            
-        except Exception as e:
-            print(f"Count lookup failed: {e}")
-            return 0
+
+    def archive_old_history(self, keep_days=None, chunk_size=None):
+        """
+        Retention job: moves history older than `keep_days` into the archive,
+        chunk by chunk so memory stays flat, then gives the space back with
+        an incremental vacuum. Rollups and emotion_stats are left alone.
+        """
+        keep_days = RETENTION_POLICY['keep_days'] if keep_days is None else keep_days
+        chunk_size = chunk_size or RETENTION_POLICY['chunk_size']
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=keep_days)).strftime(TS_FORMAT)
+        
+        result = {'archived': 0, 'users': 0, 'files': 0}
+        users = set()
+        
+        conn = self._get_conn()
+        try:
+            cursor = conn.cursor()
+            last_id = 0
+            
+            while True:
+                # Walk forward by id so every round is a cheap rowid range scan
+                cursor.execute('''
+                    SELECT id, detection_time, num_faces, emotions_detected, average_confidence, user_id
+                    FROM detection_history
+                    WHERE id > ? AND detection_time < ?
+                    ORDER BY id
+                    LIMIT ?
+                ''', (last_id, cutoff, chunk_size))
+                rows = cursor.fetchall()
+                
+                if not rows:
+                    break
+                
+                # File goes to disk first; only then do we drop the rows
+                result['files'] += len(self.archive.write_chunk(rows))
+                cursor.executemany('DELETE FROM detection_history WHERE id = ?', [(r[0],) for r in rows])
+                conn.commit()
+                
+                result['archived'] += len(rows)
+                users.update(r[5] for r in rows)
+                last_id = rows[-1][0]
+            
+            if result['archived']:
+                self._incremental_vacuum(conn)
+        finally:
+            conn.close()
+        
+        for user_id in users:
+            self.cache.invalidate(self.db_path, user_id)
+        
+        result['users'] = len(users)
+        return result
+    
+    def _incremental_vacuum(self, conn):
+        """Returns free pages to the OS, switching old DBs to incremental mode first"""
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA auto_vacuum')
+        
+        if cursor.fetchone()[0] != 2:
+            # One-off: the mode only takes effect after a full VACUUM
+            cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+            conn.commit()
+            cursor.execute('VACUUM')
+        else:
+            cursor.execute('PRAGMA incremental_vacuum')
+            cursor.fetchall()
@@ -0,0 +1,60 @@
+"""
+Downsampling
+------------
+Largest-Triangle-Three-Buckets (LTTB): picks `n_out` points out of a long
+series so the line still looks the same (peaks and dips survive, flat
+stretches get thinned out). Used to keep history charts at a fixed number
+of points no matter how much history there is.
+
+Plain Python on purpose, it only ever sees rollup buckets (thousands of
+points at most), never raw history.
+"""
+
+
+def lttb(xs, ys, n_out):
+    """
+    Indices of the points to keep, always including the first and last.
+
+    Args:
+        xs: Numeric x values, ascending (e.g. epoch seconds)
+        ys: y values, same length as xs
+        n_out: How many points to keep
+    """
+    n = len(xs)
+    if n_out >= n:
+        return list(range(n))
+    if n_out < 3:
+        # Not enough room for anything but the ends
+        return [0, n - 1][:max(n_out, 0)]
+
+    keep = [0]
+    # Everything except the two end points gets split into n_out - 2 buckets
+    size = (n - 2) / (n_out - 2)
+    a = 0
+
+    for i in range(n_out - 2):
+        lo = int(i * size) + 1
+        hi = int((i + 1) * size) + 1
+
+        # Average of the NEXT bucket is the third corner of the triangle
+        nxt_lo = hi
+        nxt_hi = min(int((i + 2) * size) + 1, n)
+        if nxt_lo >= nxt_hi:
+            avg_x, avg_y = xs[n - 1], ys[n - 1]
+        else:
+            span = nxt_hi - nxt_lo
+            avg_x = sum(xs[nxt_lo:nxt_hi]) / span
+            avg_y = sum(ys[nxt_lo:nxt_hi]) / span
+
+        # Keep the point in this bucket that makes the biggest triangle
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+
+        keep.append(best)
+        a = best
+
+    keep.append(n - 1)
+    return keep
@@ -0,0 +1,243 @@
+"""
+Bulk Export / Import
+--------------------
+Streams detection history out of (and back into) the SQLite DB as
+NDJSON or CSV. Handy for moving data between deployments or pulling
+it into pandas/notebooks for offline analysis.
+
+Rows carry the username, not the numeric user id, so an export from one
+deployment can be loaded into another (users get created as needed).
+
+    python -m data.transfer export history.ndjson
+    python -m data.transfer export deepak.csv --user Deepak
+    python -m data.transfer export recent.ndjson --skip-archived
+    python -m data.transfer import history.ndjson --db data/other.db
+"""
+
+import argparse
+import csv
+import json
+import time
+from datetime import datetime
+
+
+FIELDS = ['username', 'detection_time', 'num_faces', 'emotions', 'average_confidence']
+
+
+def _guess_format(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'ndjson'
+
+
+def export_history(db, out_path, fmt=None, username=None, batch_size=5000, include_archived=True):
+    """
+    Writes history (one user or everyone) to `out_path`.
+    Rows are pulled with fetchmany so memory stays flat however big the table is.
+    Archived rows (see data/archive.py) go first, oldest day first, one day at
+    a time; with include_archived=False they're left out and we say how many.
+    """
+    fmt = _guess_format(out_path, fmt)
+    started = time.perf_counter()
+    count = 0
+    skipped = 0
+
+    conn = db._get_conn()
+    try:
+        cursor = conn.cursor()
+
+        # Archive rows only have the user id; the users table is small
+        cursor.execute('SELECT id, username FROM users')
+        usernames = {uid: name for uid, name in cursor.fetchall() if username is None or name == username}
+
+        with open(out_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f) if fmt == 'csv' else None
+            if writer:
+                writer.writerow(FIELDS)
+
+            def write_rows(rows):
+                if writer:
+                    # emotions stay as a JSON string in their CSV cell
+                    writer.writerows(rows)
+                    return
+                for name, det_time, faces, emo_json, conf in rows:
+                    f.write(json.dumps({
+                        'username': name,
+                        'detection_time': det_time,
+                        'num_faces': faces,
+                        'emotions': json.loads(emo_json),
+                        'average_confidence': conf
+                    }) + '\n')
+
+            if usernames:
+                for rows in _archived_rows(db, cursor, usernames, batch_size):
+                    if include_archived:
+                        write_rows(rows)
+                        count += len(rows)
+                    else:
+                        skipped += len(rows)
+
+            query = '''
+                SELECT u.username, h.detection_time, h.num_faces, h.emotions_detected, h.average_confidence
+                FROM detection_history h
+                JOIN users u ON u.id = h.user_id
+            '''
+            params = ()
+            if username is not None:
+                query += ' WHERE u.username = ?'
+                params = (username,)
+            query += ' ORDER BY h.id'
+            cursor.execute(query, params)
+
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                write_rows(rows)
+                count += len(rows)
+    finally:
+        conn.close()
+
+    if skipped:
+        print(f"Left out {skipped} archived rows (drop --skip-archived to export them too)")
+    return _report('Exported', count, started)
+
+
+def _archived_rows(db, cursor, usernames, batch_size):
+    """
+    Yields lists of export rows from the archive, oldest first, for the
+    users in `usernames` ({user_id: username}). Rows that are still in the
+    live table (the retention job died between writing the file and the
+    delete) are skipped, the live copy gets exported instead.
+    """
+    user_id = next(iter(usernames)) if len(usernames) == 1 else None
+
+    for day in reversed(db.archive.partitions()):
+        rows = [r for r in reversed(db.archive.read_partition(day, user_id)) if r[5] in usernames]
+
+        for i in range(0, len(rows), batch_size):
+            chunk = rows[i:i + batch_size]
+
+            # Stay well under SQLite's bound-parameter limit
+            live = set()
+            ids = [r[0] for r in chunk]
+            for j in range(0, len(ids), 500):
+                part = ids[j:j + 500]
+                cursor.execute(
+                    f"SELECT id FROM detection_history WHERE id IN ({','.join('?' * len(part))})", part
+                )
+                live.update(row[0] for row in cursor.fetchall())
+
+            yield [(usernames[r[5]], r[1], r[2], r[3], r[4]) for r in chunk if r[0] not in live]
+
+
+def _read_records(in_path, fmt):
+    """Yields (username, detection_time, num_faces, emotions, avg_conf) one at a time"""
+    with open(in_path, newline='', encoding='utf-8') as f:
+        if fmt == 'csv':
+            for rec in csv.DictReader(f):
+                yield (rec['username'], rec['detection_time'], int(rec['num_faces']),
+                       json.loads(rec['emotions']), float(rec['average_confidence']))
+        else:
+            for line in f:
+                if not line.strip():
+                    continue
+                rec = json.loads(line)
+                yield (rec['username'], rec['detection_time'], int(rec['num_faces']),
+                       rec['emotions'], float(rec['average_confidence']))
+
+
+def import_history(db, in_path, fmt=None, batch_size=50000):
+    """
+    Loads an export back in. Each batch is one executemany in its own
+    transaction; the history index is dropped for the load and rebuilt once
+    at the end. Stats and rollups are updated per batch.
+    """
+    fmt = _guess_format(in_path, fmt)
+    started = time.perf_counter()
+    count = 0
+    user_ids = {}
+
+    conn = db._get_conn()
+    try:
+        cursor = conn.cursor()
+        cursor.execute('PRAGMA synchronous = NORMAL')
+        db._drop_history_indexes(cursor)
+        conn.commit()
+
+        batch = []
+        for name, det_time, faces, emotions, conf in _read_records(in_path, fmt):
+            if name not in user_ids:
+                user_ids[name] = _get_or_create_user(cursor, name)
+            batch.append((user_ids[name], det_time, faces, emotions, conf))
+
+            if len(batch) >= batch_size:
+                db._insert_history_rows(cursor, batch)
+                conn.commit()
+                count += len(batch)
+                batch = []
+
+        if batch:
+            db._insert_history_rows(cursor, batch)
+            conn.commit()
+            count += len(batch)
+    except Exception:
+        # Drop the half-done batch (rows without their stats/rollups, new users);
+        # batches that already committed stay
+        conn.rollback()
+        raise
+    finally:
+        # Always put the index back, even if the file was bad halfway through
+        db._create_history_indexes(conn.cursor())
+        conn.commit()
+        conn.close()
+
+        for user_id in user_ids.values():
+            db.cache.invalidate(db.db_path, user_id)
+
+    return _report('Imported', count, started)
+
+
+def _get_or_create_user(cursor, username):
+    """Same as DatabaseManager.create_user but on our open transaction"""
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (username, created_at)
+        VALUES (?, ?)
+    ''', (username, datetime.now()))
+    cursor.execute('SELECT id FROM users WHERE username = ?', (username,))
+    return cursor.fetchone()[0]
+
+
+def _report(verb, count, started):
+    elapsed = time.perf_counter() - started
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{verb} {count} rows in {elapsed:.2f}s ({rate:,.0f} rows/sec)")
+    return {'rows': count, 'seconds': elapsed, 'rows_per_sec': rate}
+
+
+def main():
+    from data.db_handler import DatabaseManager
+
+    parser = argparse.ArgumentParser(description="Bulk export/import of detection history")
+    parser.add_argument('action', choices=['export', 'import'])
+    parser.add_argument('path', help="NDJSON or CSV file (picked by extension unless --format is given)")
+    parser.add_argument('--db', default='data/users.db')
+    parser.add_argument('--format', choices=['ndjson', 'csv'])
+    parser.add_argument('--user', help="Only export this username")
+    parser.add_argument('--batch-size', type=int)
+    parser.add_argument('--include-archived', dest='include_archived', action='store_true', default=True,
+                        help="Export rows the retention job moved into the archive too (default)")
+    parser.add_argument('--skip-archived', dest='include_archived', action='store_false',
+                        help="Only export what's still in the live table")
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    if args.action == 'export':
+        export_history(db, args.path, args.format, args.user, batch_size=args.batch_size or 5000,
+                       include_archived=args.include_archived)
+    else:
+        import_history(db, args.path, args.format, batch_size=args.batch_size or 50000)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,26 +7,27 @@ Run this file to start the app: `streamlit run main.py`
 By: Deepak Mishra
 """
 
-import streamlit as st
 import time
+
+# Streamlit re-runs this whole file on every interaction, so this is "start of this run"
+RUN_STARTED = time.perf_counter()
+
+import streamlit as st
 import sys
 import os
 
 # Fix path so imports work
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-# My custom stuff
+# Only the light stuff up here, so the login page shows up fast.
+# TensorFlow/OpenCV load on a background thread (core.model_loader),
+# Plotly and the other pages get imported when they're first needed.
 from ui.styles import get_custom_css
-from ui.components import show_welcome_animation
-from core.emotion_detector import EmotionPredictor
-from core.image_processor import ImagePreprocessor
+from core import metrics
+from core.model_loader import start_warmup, get_predictor, is_ready, status as model_status
 from data.db_handler import DatabaseManager
-
-# The pages
 from ui.views.auth_view import show_login_page
-from ui.views.detection_view import show_image_detection, show_webcam_detection
-from ui.views.stats_view import show_statistics
-from ui.views.about_view import show_about
+from ui.views.performance_view import is_admin, show_admin_unlock
 
 
 # Config
@@ -46,20 +47,43 @@ def init_session():
         st.session_state.username = ""
     if 'user_id' not in st.session_state:
         st.session_state.user_id = None
+    if 'session_started' not in st.session_state:
+        st.session_state.session_started = RUN_STARTED
         
-    # Lazy load the heavy stuff
     if 'db_manager' not in st.session_state:
         st.session_state.db_manager = DatabaseManager()
-    if 'predictor' not in st.session_state:
-        with st.spinner("🔄 Waking up the AI..."):
-            st.session_state.predictor = EmotionPredictor()
-    if 'preprocessor' not in st.session_state:
-        st.session_state.preprocessor = ImagePreprocessor()
+    
+    # Model loads + warms up in the background while the user types their name
+    start_warmup()
         
     if 'show_welcome' not in st.session_state:
         st.session_state.show_welcome = True
 
 
+def record_first_paint():
+    """Time from the session's first run to the first full page, once per session"""
+    if 'first_paint_ms' not in st.session_state:
+        seconds = time.perf_counter() - RUN_STARTED
+        metrics.record('time_to_first_paint', seconds)
+        st.session_state.first_paint_ms = seconds * 1000
+
+
+def ensure_predictor():
+    """Shared predictor for the detection pages (only waits if warm-up isn't done yet)"""
+    if 'predictor' in st.session_state:
+        return
+    if is_ready():
+        st.session_state.predictor = get_predictor()
+    else:
+        with st.spinner("🔄 Waking up the AI..."):
+            st.session_state.predictor = get_predictor()
+    
+    # Warm-up failures only show up here (and on the Performance page)
+    error = model_status().get('error')
+    if error:
+        st.warning(f"⚠ {error}")
+
+
 def main():
     """The main loop"""
     init_session()
@@ -70,13 +94,14 @@ def main():
     # Login check
     if not st.session_state.logged_in:
         show_login_page()
+        record_first_paint()
         return
     
     # Animation on first load
     if st.session_state.show_welcome:
+        from ui.components import show_welcome_animation
         show_welcome_animation(st.session_state.username)
         st.session_state.show_welcome = False
-        time.sleep(2)
     
     # Sidebar navigation
     with st.sidebar:
@@ -90,31 +115,55 @@ def main():
         
         st.markdown("---")
         
+        pages = ["📸 Image Detection", "📹 Webcam Detection", "📊 Statistics", "ℹ️ About"]
+        if is_admin():
+            pages.append("⚙️ Performance")
+        
         page = st.radio(
             "Go to:",
-            ["📸 Image Detection", "📹 Webcam Detection", "📊 Statistics", "ℹ️ About"],
+            pages,
             label_visibility="collapsed"
         )
         
         st.markdown("---")
         
+        show_admin_unlock()
+        
         if st.button("🚪 Logout", use_container_width=True):
-            # Reset everything
+            # Reset everything (and let go of the camera, the router won't run again to do it)
+            if st.session_state.get('live_analyzer') is not None:
+                from ui.views.detection_view import _stop_live
+                _stop_live()
             st.session_state.logged_in = False
             st.session_state.username = ""
             st.session_state.user_id = None
+            st.session_state.is_admin = False
             st.session_state.show_welcome = True
             st.rerun()
     
-    # Router
+    # Leaving the webcam page: release the camera now instead of waiting for the idle watchdog
+    if page != "📹 Webcam Detection" and st.session_state.get('live_analyzer') is not None:
+        from ui.views.detection_view import _stop_live
+        _stop_live()
+    
+    # Router (pages are imported on first visit)
     if page == "📸 Image Detection":
+        from ui.views.detection_view import show_image_detection
+        ensure_predictor()
         show_image_detection()
     elif page == "📹 Webcam Detection":
+        from ui.views.detection_view import show_webcam_detection
+        ensure_predictor()
         show_webcam_detection()
     elif page == "📊 Statistics":
+        from ui.views.stats_view import show_statistics
         show_statistics()
     elif page == "ℹ️ About":
+        from ui.views.about_view import show_about
         show_about()
+    elif page == "⚙️ Performance":
+        from ui.views.performance_view import show_performance
+        show_performance()
     
     # Footer
     st.markdown("---")
@@ -124,6 +173,8 @@ def main():
             <p style="font-size: 0.9rem; opacity: 0.8;">B.Tech AI & ML | 2025</p>
         </div>
     """, unsafe_allow_html=True)
+    
+    record_first_paint()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+"""
+Shared fixtures. Everything here is stdlib + numpy, no TF/OpenCV needed:
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+# Fix path so `core` / `data` import when pytest is run from anywhere
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from data.cache import QueryCache
+from data.db_handler import DatabaseManager, TS_FORMAT
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Fresh DB (and archive folder) per test, with its own cache so tests don't leak into each other"""
+    return DatabaseManager(str(tmp_path / 'users.db'), cache=QueryCache())
+
+
+def ts(days_ago=0, hours=0, minutes=0):
+    """UTC timestamp string `days_ago` days back from now, shifted by hours/minutes"""
+    when = datetime.utcnow() - timedelta(days=days_ago) + timedelta(hours=hours, minutes=minutes)
+    return when.strftime(TS_FORMAT)
+
+
+def add_rows(db, rows):
+    """Bulk-inserts (user_id, detection_time, num_faces, emotions, avg_conf) rows like an import does"""
+    conn = db._get_conn()
+    try:
+        db._insert_history_rows(conn.cursor(), rows)
+        conn.commit()
+    finally:
+        conn.close()
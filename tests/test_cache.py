@@ -0,0 +1,68 @@
+from data.cache import QueryCache
+from conftest import ts, add_rows
+
+
+def test_write_invalidates_the_users_reads(db):
+    user = db.create_user('a')
+    db.save_detection_history(user, 1, ['Happy'], 80.0)
+
+    assert db.get_total_detections(user) == 1
+    assert db.get_total_detections(user) == 1
+    assert db.cache.hits == 1
+
+    db.save_detection_history(user, 2, ['Sad', 'Sad'], 60.0)
+    assert db.get_total_detections(user) == 2
+    assert db.get_emotion_statistics(user)['Sad']['count'] == 2
+    assert len(db.get_user_history(user)) == 2
+
+
+def test_batch_save_invalidates_too(db):
+    user = db.create_user('a')
+    assert db.get_user_history(user) == []
+
+    db.save_detection_history_batch(user, [(1, ['Happy'], 90.0), (1, ['Neutral'], 70.0)])
+    assert len(db.get_user_history(user)) == 2
+
+
+def test_other_users_stay_cached(db):
+    a, b = db.create_user('a'), db.create_user('b')
+    add_rows(db, [(b, ts(1), 1, ['Happy'], 80.0)])
+
+    assert db.get_total_detections(b) == 1
+    db.save_detection_history(a, 1, ['Sad'], 50.0)
+
+    hits = db.cache.hits
+    assert db.get_total_detections(b) == 1
+    assert db.cache.hits == hits + 1
+
+
+def test_cached_values_are_copies(db):
+    user = db.create_user('a')
+    db.save_detection_history(user, 1, ['Happy'], 80.0)
+
+    db.get_user_history(user).clear()
+    assert len(db.get_user_history(user)) == 1
+
+
+def test_read_that_started_before_a_write_isnt_cached():
+    cache = QueryCache()
+    generation = cache.generation('db', 1)
+
+    # The write lands while the slow query is still running
+    cache.invalidate('db', 1)
+    cache.put('db', 1, ('total',), 5, generation)
+
+    assert cache.get('db', 1, ('total',)) == (False, None)
+
+
+def test_ttl_and_size_limit():
+    cache = QueryCache(ttl=-1)
+    cache.put('db', 1, 'k', 1, cache.generation('db', 1))
+    assert cache.get('db', 1, 'k')[0] is False
+
+    cache = QueryCache(max_entries=2)
+    for key in 'abc':
+        cache.put('db', 1, key, key, cache.generation('db', 1))
+    assert cache.get('db', 1, 'a')[0] is False
+    assert cache.get('db', 1, 'c') == (True, 'c')
+    assert cache.stats()['entries'] == 2
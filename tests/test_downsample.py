@@ -0,0 +1,62 @@
+import math
+import random
+
+import pytest
+
+from data.downsample import lttb
+from conftest import ts, add_rows
+
+
+def _series(n, seed=0):
+    rng = random.Random(seed)
+    xs = list(range(n))
+    ys = [math.sin(i / 20) * 30 + rng.uniform(-5, 5) for i in xs]
+    return xs, ys
+
+
+@pytest.mark.parametrize('n, n_out', [(1000, 300), (1000, 3), (301, 300), (50, 7)])
+def test_keeps_ends_and_honours_the_budget(n, n_out):
+    xs, ys = _series(n)
+    keep = lttb(xs, ys, n_out)
+
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert keep == sorted(set(keep))
+
+
+def test_short_series_come_back_whole():
+    xs, ys = _series(10)
+    assert lttb(xs, ys, 10) == list(range(10))
+    assert lttb(xs, ys, 50) == list(range(10))
+
+
+def test_tiny_budgets():
+    xs, ys = _series(10)
+    assert lttb(xs, ys, 2) == [0, 9]
+    assert lttb(xs, ys, 1) == [0]
+    assert lttb(xs, ys, 0) == []
+
+
+def test_spikes_survive():
+    xs = list(range(500))
+    ys = [0.0] * 500
+    ys[123] = 100.0
+    ys[377] = -100.0
+
+    keep = lttb(xs, ys, 20)
+    assert 123 in keep and 377 in keep
+
+
+def test_confidence_series_stays_within_budget(db):
+    user = db.create_user('a')
+    # ~60 days of hourly activity, way more buckets than points
+    add_rows(db, [(user, ts(h // 24, hours=-(h % 24)), 1, ['Happy'], 50.0 + h % 40) for h in range(1440)])
+
+    series = db.get_confidence_series(user, max_points=100)
+    points = series['points']
+
+    assert len(points) <= 100
+    assert series['resolution'] in ('hour', 'day')
+    assert series['detections'] == 1440
+    times = [p['time'] for p in points]
+    assert times == sorted(times)
@@ -0,0 +1,70 @@
+import numpy as np
+
+from core.motion import MotionGate, small_gray
+
+
+def _frame(value=100):
+    return np.full((128, 128, 3), value, dtype=np.uint8)
+
+
+def _gate(**kwargs):
+    # Never force a re-analysis on the clock, these tests are about the thresholds
+    return MotionGate(max_skip_seconds=1e9, width=64, **kwargs)
+
+
+def test_first_frame_is_always_analyzed():
+    assert _gate().should_analyze(_frame())
+
+
+def test_unchanged_frame_is_skipped():
+    gate = _gate()
+    gate.should_analyze(_frame())
+
+    assert not gate.should_analyze(_frame())
+    assert gate.stats()['skipped'] == 1
+
+
+def test_changed_fraction_threshold():
+    # Thumbnail is 64x64; 1% of it is ~41 pixels
+    gate = _gate(pixel_threshold=25, changed_fraction=0.01)
+    gate.should_analyze(_frame())
+
+    small = _frame()
+    small[:8, :8] = 255        # 4x4 thumbnail pixels = 0.4%
+    assert not gate.should_analyze(small)
+
+    big = _frame()
+    big[:32, :32] = 255        # 16x16 thumbnail pixels = 6.25%
+    assert gate.should_analyze(big)
+    assert abs(gate.last_score - 0.0625) < 1e-6
+
+
+def test_small_pixel_changes_dont_count():
+    gate = _gate(pixel_threshold=25, changed_fraction=0.01)
+    gate.should_analyze(_frame(100))
+
+    # Whole frame brightens a little (sensor noise, auto exposure)
+    assert not gate.should_analyze(_frame(120))
+    assert gate.last_score == 0.0
+    assert gate.should_analyze(_frame(130))
+
+
+def test_reference_only_moves_on_analysis():
+    gate = _gate(pixel_threshold=25, changed_fraction=0.01)
+    gate.should_analyze(_frame(100))
+
+    # Slow drift: each step is under the threshold, but it adds up against the reference
+    assert not gate.should_analyze(_frame(115))
+    assert gate.should_analyze(_frame(130))
+
+
+def test_max_skip_seconds_forces_analysis():
+    gate = MotionGate(max_skip_seconds=0.0)
+    gate.should_analyze(_frame())
+    assert gate.should_analyze(_frame())
+
+
+def test_small_gray_shape():
+    thumb = small_gray(np.zeros((480, 640, 3), dtype=np.uint8), width=64)
+    assert thumb.shape == (48, 64)
+    assert thumb.dtype == np.float32
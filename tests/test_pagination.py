@@ -0,0 +1,71 @@
+from conftest import ts, add_rows
+
+
+def _all_pages(db, user, page_size, **kwargs):
+    ids, cursor = [], None
+    while True:
+        page = db.get_history_page(user, cursor=cursor, page_size=page_size, **kwargs)
+        ids.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def _expected_order(db, user):
+    conn = db._get_conn()
+    try:
+        return [row[0] for row in conn.execute('''
+            SELECT id FROM detection_history WHERE user_id = ?
+            ORDER BY detection_time DESC, id DESC
+        ''', (user,))]
+    finally:
+        conn.close()
+
+
+def test_ties_on_detection_time_are_not_lost_or_repeated(db):
+    user = db.create_user('a')
+    # Big runs of identical timestamps, so page boundaries fall inside the ties
+    same = [ts(1), ts(2), ts(3)]
+    add_rows(db, [(user, same[i % 3], 1, ['Happy'], 80.0) for i in range(53)])
+
+    for page_size in (1, 5, 7, 20, 100):
+        ids = _all_pages(db, user, page_size)
+        assert len(ids) == len(set(ids)) == 53
+        assert ids == _expected_order(db, user)
+
+
+def test_only_the_users_own_rows(db):
+    a, b = db.create_user('a'), db.create_user('b')
+    add_rows(db, [(a, ts(1), 1, ['Happy'], 80.0)] * 10 + [(b, ts(1), 1, ['Sad'], 60.0)] * 4)
+
+    assert len(_all_pages(db, a, 3)) == 10
+    assert len(_all_pages(db, b, 3)) == 4
+
+
+def test_last_page_has_no_cursor(db):
+    user = db.create_user('a')
+    add_rows(db, [(user, ts(1), 1, ['Happy'], 80.0)] * 6)
+
+    first = db.get_history_page(user, page_size=3)
+    second = db.get_history_page(user, cursor=first['next_cursor'], page_size=3)
+    assert first['next_cursor'] is not None
+    assert len(second['items']) == 3
+    assert second['next_cursor'] is None
+
+
+def test_new_rows_dont_shift_later_pages(db):
+    user = db.create_user('a')
+    add_rows(db, [(user, ts(2), 1, ['Happy'], 80.0)] * 10)
+
+    first = db.get_history_page(user, page_size=4)
+    # A detection lands while someone is paging; it's newer, so it doesn't shift what's left
+    db.save_detection_history(user, 1, ['Sad'], 50.0)
+
+    rest, cursor = [], first['next_cursor']
+    while cursor:
+        page = db.get_history_page(user, cursor=cursor, page_size=4)
+        rest.extend(item['id'] for item in page['items'])
+        cursor = page['next_cursor']
+
+    seen = [item['id'] for item in first['items']] + rest
+    assert len(seen) == len(set(seen)) == 10
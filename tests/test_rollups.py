@@ -0,0 +1,122 @@
+import json
+import random
+from collections import Counter
+from datetime import datetime
+
+from data.db_handler import ROLLUP_GRAINS, TS_FORMAT
+from conftest import ts, add_rows
+
+
+def _raw_rollup(db, grain):
+    """Same numbers as rollup_<grain>, straight from detection_history"""
+    fmt = ROLLUP_GRAINS[grain]
+    conn = db._get_conn()
+    try:
+        rows = conn.execute('''
+            SELECT user_id, detection_time, num_faces, emotions_detected, average_confidence
+            FROM detection_history
+        ''').fetchall()
+    finally:
+        conn.close()
+
+    totals, emotions = {}, Counter()
+    for user_id, det_time, faces, emo_json, conf in rows:
+        bucket = datetime.strptime(det_time[:19], TS_FORMAT).strftime(fmt)
+        agg = totals.setdefault((user_id, bucket), [0, 0, 0.0])
+        agg[0] += 1
+        agg[1] += faces
+        agg[2] += conf
+        for emo in json.loads(emo_json):
+            emotions[(user_id, bucket, emo)] += 1
+    return totals, dict(emotions)
+
+
+def _stored_rollup(db, grain):
+    conn = db._get_conn()
+    try:
+        totals = {
+            (u, b): [n, f, c]
+            for u, b, n, f, c in conn.execute(
+                f'SELECT user_id, bucket, detections, faces, confidence_sum FROM rollup_{grain}'
+            )
+        }
+        emotions = {
+            (u, b, e): n
+            for u, b, e, n in conn.execute(f'SELECT user_id, bucket, emotion, count FROM rollup_{grain}_emotions')
+        }
+    finally:
+        conn.close()
+    return totals, emotions
+
+
+def _assert_rollups_match(db):
+    for grain in ROLLUP_GRAINS:
+        raw_totals, raw_emotions = _raw_rollup(db, grain)
+        totals, emotions = _stored_rollup(db, grain)
+
+        assert totals.keys() == raw_totals.keys()
+        for key, (n, faces, conf) in raw_totals.items():
+            assert totals[key][:2] == [n, faces]
+            assert abs(totals[key][2] - conf) < 1e-6
+        assert emotions == raw_emotions
+
+
+def _random_rows(user_ids, n, seed=0):
+    rng = random.Random(seed)
+    labels = ['Happy', 'Sad', 'Angry', 'Neutral']
+    return [
+        (rng.choice(user_ids), ts(rng.randint(0, 10), minutes=-rng.randint(0, 1440)), rng.randint(1, 3),
+         rng.sample(labels, rng.randint(1, 2)), rng.uniform(40, 99))
+        for _ in range(n)
+    ]
+
+
+def test_bulk_insert_matches_raw_aggregate(db):
+    users = [db.create_user('a'), db.create_user('b')]
+    add_rows(db, _random_rows(users, 300))
+    _assert_rollups_match(db)
+
+
+def test_repeated_upserts_into_the_same_buckets(db):
+    users = [db.create_user('a'), db.create_user('b')]
+    # Several small batches that hit the same hours/days, plus single saves
+    for seed in range(5):
+        add_rows(db, _random_rows(users, 40, seed=seed))
+    for _ in range(3):
+        db.save_detection_history(users[0], 2, ['Happy', 'Sad'], 75.0)
+    _assert_rollups_match(db)
+
+
+def test_rebuild_gives_the_same_buckets(db):
+    users = [db.create_user('a')]
+    add_rows(db, _random_rows(users, 200))
+    before = {grain: _stored_rollup(db, grain) for grain in ROLLUP_GRAINS}
+
+    conn = db._get_conn()
+    try:
+        db._rebuild_rollups(conn.cursor(), chunk_size=17)
+        conn.commit()
+    finally:
+        conn.close()
+
+    for grain in ROLLUP_GRAINS:
+        totals, emotions = _stored_rollup(db, grain)
+        assert emotions == before[grain][1]
+        assert {k: v[:2] for k, v in totals.items()} == {k: v[:2] for k, v in before[grain][0].items()}
+
+
+def test_summary_over_a_range_matches_raw_rows(db):
+    user = db.create_user('a')
+    rows = _random_rows([user], 250)
+    add_rows(db, rows)
+
+    # Start on an hour boundary: summaries have one-hour resolution
+    start = ts(4)[:13] + ':00:00'
+    summary = db.get_emotion_summary(user, start=start)
+
+    picked = [r for r in rows if r[1] >= start]
+    assert summary['detections'] == len(picked)
+    assert summary['faces'] == sum(r[2] for r in picked)
+    assert abs(summary['average_confidence'] - sum(r[4] for r in picked) / len(picked)) < 1e-6
+    assert summary['emotions'] == dict(Counter(e for r in picked for e in r[3]))
+    assert db.get_total_detections(user) == len(rows)
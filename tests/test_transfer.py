@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from data.cache import QueryCache
+from data.db_handler import DatabaseManager
+from data.transfer import export_history, import_history
+from conftest import ts, add_rows
+
+
+def _history(db):
+    """Every row as (username, time, faces, emotions, confidence), order-independent"""
+    conn = db._get_conn()
+    try:
+        rows = conn.execute('''
+            SELECT u.username, h.detection_time, h.num_faces, h.emotions_detected, h.average_confidence
+            FROM detection_history h JOIN users u ON u.id = h.user_id
+        ''').fetchall()
+    finally:
+        conn.close()
+    return sorted((n, t, f, tuple(json.loads(e)), c) for n, t, f, e, c in rows)
+
+
+@pytest.fixture
+def other_db(tmp_path):
+    return DatabaseManager(str(tmp_path / 'other' / 'users.db'), cache=QueryCache())
+
+
+@pytest.fixture
+def source(db):
+    a, b = db.create_user('deepak'), db.create_user('asha')
+    add_rows(db, [(a, ts(i % 4, minutes=-i), 1 + i % 3, ['Happy', 'Sad'][: 1 + i % 2], 50.0 + i) for i in range(25)])
+    add_rows(db, [(b, ts(i % 2), 1, ['Neutral'], 70.0) for i in range(8)])
+    return db
+
+
+@pytest.mark.parametrize('name', ['history.ndjson', 'history.csv'])
+def test_round_trip(source, other_db, tmp_path, name):
+    path = str(tmp_path / name)
+
+    assert export_history(source, path)['rows'] == 33
+    assert import_history(other_db, path, batch_size=10)['rows'] == 33
+
+    assert _history(other_db) == _history(source)
+    for user in ('deepak', 'asha'):
+        src = source.get_user_by_username(user)['id']
+        dst = other_db.get_user_by_username(user)['id']
+        assert other_db.get_total_detections(dst) == source.get_total_detections(src)
+        assert other_db.get_emotion_summary(dst) == source.get_emotion_summary(src)
+
+
+def test_single_user_export(source, tmp_path):
+    path = str(tmp_path / 'asha.ndjson')
+    export_history(source, path, username='asha')
+
+    with open(path) as f:
+        records = [json.loads(line) for line in f]
+    assert len(records) == 8
+    assert {r['username'] for r in records} == {'asha'}
+
+
+def test_archived_rows_are_exported(db, other_db, tmp_path, capsys):
+    user = db.create_user('deepak')
+    add_rows(db, [(user, ts(100 + i % 3), 1, ['Sad'], 40.0) for i in range(12)])
+    add_rows(db, [(user, ts(1), 1, ['Happy'], 90.0) for _ in range(5)])
+    db.archive_old_history(keep_days=60)
+    path = str(tmp_path / 'all.ndjson')
+
+    assert export_history(db, path)['rows'] == 17
+    import_history(other_db, path)
+    assert len(_history(other_db)) == 17
+
+    assert export_history(db, path, include_archived=False)['rows'] == 5
+    assert 'Left out 12 archived rows' in capsys.readouterr().out
+
+
+def test_failed_batch_is_rolled_back(source, other_db, tmp_path):
+    path = str(tmp_path / 'broken.ndjson')
+    export_history(source, path)
+    with open(path) as f:
+        lines = f.readlines()
+
+    # Batch 1 is fine; batch 2 brings in a new user and then a broken record
+    bad = dict(json.loads(lines[0]), username='newcomer')
+    lines = lines[:10] + [json.dumps(bad) + '\n', '{"username": "x", "num_faces": "oops"}\n'] + lines[10:]
+    with open(path, 'w') as f:
+        f.writelines(lines)
+
+    with pytest.raises(Exception):
+        import_history(other_db, path, batch_size=10)
+
+    # First batch stays, with rollups that agree with it; nothing from the broken one
+    assert len(_history(other_db)) == 10
+    assert other_db.get_user_by_username('newcomer') is None
+    totals = sum(
+        other_db.get_total_detections(u['id'])
+        for u in map(other_db.get_user_by_username, ('deepak', 'asha')) if u
+    )
+    assert totals == 10
+
+    # And the history index came back
+    conn = other_db._get_conn()
+    try:
+        indexes = [r[1] for r in conn.execute("PRAGMA index_list('detection_history')")]
+    finally:
+        conn.close()
+    assert 'idx_history_user_time' in indexes
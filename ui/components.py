@@ -2,12 +2,45 @@
 Reusable UI Components for Streamlit
 """
 
+import functools
+
 import streamlit as st
 import plotly.graph_objects as go
 import plotly.express as px
+from plotly.subplots import make_subplots
 from datetime import datetime
 
 
+EMOTION_ORDER = ['Angry', 'Disgust', 'Fear', 'Happy', 'Sad', 'Surprise', 'Neutral']
+
+EMOTION_COLORS = {
+    'Happy': '#fda085',
+    'Sad': '#3f2b96',
+    'Angry': '#ee5a6f',
+    'Surprise': '#fddb92',
+    'Fear': '#d299c2',
+    'Disgust': '#c471f5',
+    'Neutral': '#9fa4a8'
+}
+
+# st.fragment landed in Streamlit 1.37 (experimental_fragment before that).
+# On older versions the decorated function just runs as part of the full page.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda fn: fn)
+
+# Figures are cached by their (rounded) probabilities. The same prediction
+# rerendered on every Streamlit rerun then costs a dict lookup, not a new figure.
+# Cached figures are shared, so callers must not modify them.
+CHART_CACHE_SIZE = 512
+
+# History charts switch to a plain line above this many points
+HISTORY_MARKER_LIMIT = 50
+
+
+def _freeze(emotions_dict):
+    """Hashable, rounded copy of {emotion: prob} (0.1% is all the charts show anyway)"""
+    return tuple((k, round(float(v), 1)) for k, v in emotions_dict.items())
+
+
 def show_welcome_animation(username):
     """
     Display animated welcome message
@@ -116,25 +149,19 @@ def create_emotion_bar_chart(emotions_dict):
         emotions_dict: Dictionary with emotion: probability pairs
         
     Returns:
-        Plotly figure
+        Plotly figure (cached, don't modify it)
     """
+    return _emotion_bar_chart(_freeze(emotions_dict))
+
+
+@functools.lru_cache(maxsize=CHART_CACHE_SIZE)
+def _emotion_bar_chart(frozen):
     # Sort emotions by probability
-    sorted_emotions = dict(sorted(emotions_dict.items(), key=lambda x: x[1], reverse=True))
-    
-    # Define colors for each emotion
-    color_map = {
-        'Happy': '#fda085',
-        'Sad': '#3f2b96',
-        'Angry': '#ee5a6f',
-        'Surprise': '#fddb92',
-        'Fear': '#d299c2',
-        'Disgust': '#c471f5',
-        'Neutral': '#9fa4a8'
-    }
+    sorted_emotions = dict(sorted(frozen, key=lambda x: x[1], reverse=True))
     
     emotions = list(sorted_emotions.keys())
     probabilities = list(sorted_emotions.values())
-    colors = [color_map.get(e, '#667eea') for e in emotions]
+    colors = [EMOTION_COLORS.get(e, '#667eea') for e in emotions]
     
     fig = go.Figure(data=[
         go.Bar(
@@ -179,25 +206,22 @@ def create_emotion_pie_chart(emotions_dict):
         emotions_dict: Dictionary with emotion: probability pairs
         
     Returns:
-        Plotly figure
+        Plotly figure (cached, don't modify it)
     """
+    return _emotion_pie_chart(_freeze(emotions_dict))
+
+
+@functools.lru_cache(maxsize=CHART_CACHE_SIZE)
+def _emotion_pie_chart(frozen):
+    emotions_dict = dict(frozen)
+    
     # Filter out very low probabilities
     filtered_emotions = {k: v for k, v in emotions_dict.items() if v > 1.0}
     
     if not filtered_emotions:
         filtered_emotions = emotions_dict
     
-    color_map = {
-        'Happy': '#fda085',
-        'Sad': '#3f2b96',
-        'Angry': '#ee5a6f',
-        'Surprise': '#fddb92',
-        'Fear': '#d299c2',
-        'Disgust': '#c471f5',
-        'Neutral': '#9fa4a8'
-    }
-    
-    colors = [color_map.get(e, '#667eea') for e in filtered_emotions.keys()]
+    colors = [EMOTION_COLORS.get(e, '#667eea') for e in filtered_emotions.keys()]
     
     fig = go.Figure(data=[
         go.Pie(
@@ -228,12 +252,121 @@ def create_emotion_pie_chart(emotions_dict):
     return fig
 
 
+def create_emotion_heatmap(emotions_dicts):
+    """
+    One faces x emotions heatmap for a whole image, instead of one chart per face.
+    Stays a single small figure however many faces there are.
+    
+    Args:
+        emotions_dicts: List of {emotion: probability} dicts, one per face
+        
+    Returns:
+        Plotly figure (cached, don't modify it)
+    """
+    return _emotion_heatmap(tuple(_freeze(d) for d in emotions_dicts))
+
+
+@functools.lru_cache(maxsize=64)
+def _emotion_heatmap(frozen_faces):
+    faces = [dict(f) for f in frozen_faces]
+    z = [[face.get(e, 0.0) for e in EMOTION_ORDER] for face in faces]
+    rows = [f"Face {i + 1}" for i in range(len(faces))]
+    
+    fig = go.Figure(data=[
+        go.Heatmap(
+            z=z,
+            x=EMOTION_ORDER,
+            y=rows,
+            zmin=0,
+            zmax=100,
+            colorscale=[[0, '#f5f3ff'], [0.5, '#667eea'], [1, '#764ba2']],
+            text=[[f'{v:.0f}' for v in row] for row in z],
+            texttemplate='%{text}',
+            hovertemplate='<b>%{y}</b><br>%{x}: %{z:.1f}%<extra></extra>',
+            colorbar=dict(title='%')
+        )
+    ])
+    
+    fig.update_layout(
+        title={
+            'text': f'🎭 Emotions across {len(faces)} faces',
+            'x': 0.5,
+            'xanchor': 'center',
+            'font': {'size': 20, 'family': 'Outfit'}
+        },
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=12),
+        height=min(1200, 140 + 24 * len(faces)),
+        margin=dict(l=20, r=20, t=60, b=20),
+        yaxis=dict(autorange='reversed')
+    )
+    
+    return fig
+
+
+def create_emotion_small_multiples(emotions_dicts, cols=4):
+    """
+    Mini bar chart per face, all in one figure (one payload instead of N).
+    
+    Args:
+        emotions_dicts: List of {emotion: probability} dicts, one per face
+        cols: Charts per row
+        
+    Returns:
+        Plotly figure (cached, don't modify it)
+    """
+    return _emotion_small_multiples(tuple(_freeze(d) for d in emotions_dicts), cols)
+
+
+@functools.lru_cache(maxsize=64)
+def _emotion_small_multiples(frozen_faces, cols):
+    faces = [dict(f) for f in frozen_faces]
+    cols = max(1, min(cols, len(faces)))
+    rows = -(-len(faces) // cols)
+    
+    fig = make_subplots(
+        rows=rows, cols=cols,
+        shared_yaxes=True,
+        subplot_titles=[f"Face {i + 1}" for i in range(len(faces))],
+        vertical_spacing=min(0.08, 0.5 / rows)
+    )
+    colors = [EMOTION_COLORS.get(e, '#667eea') for e in EMOTION_ORDER]
+    
+    for i, face in enumerate(faces):
+        fig.add_trace(
+            go.Bar(
+                x=[e[:3] for e in EMOTION_ORDER],
+                y=[face.get(e, 0.0) for e in EMOTION_ORDER],
+                marker=dict(color=colors),
+                customdata=EMOTION_ORDER,
+                hovertemplate='<b>%{customdata}</b>: %{y:.1f}%<extra></extra>',
+                showlegend=False
+            ),
+            row=i // cols + 1, col=i % cols + 1
+        )
+    
+    fig.update_yaxes(range=[0, 100], showgrid=True, gridcolor='rgba(0,0,0,0.1)')
+    fig.update_xaxes(showgrid=False, tickfont=dict(size=9))
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        font=dict(family='Inter', size=11),
+        height=60 + 180 * rows,
+        margin=dict(l=20, r=20, t=40, b=20)
+    )
+    
+    return fig
+
+
 def create_history_chart(history_data):
     """
     Create line chart for detection history
     
     Args:
-        history_data: List of history records
+        history_data: List of history records or points from
+            DatabaseManager.get_confidence_series (already downsampled,
+            so this never sees more than a few hundred points)
         
     Returns:
         Plotly figure
@@ -244,17 +377,23 @@ def create_history_chart(history_data):
     times = [datetime.fromisoformat(h['time']) if isinstance(h['time'], str) else h['time'] 
              for h in history_data]
     confidences = [h['confidence'] for h in history_data]
+    detections = [h.get('detections', 1) for h in history_data]
     
     fig = go.Figure()
     
+    # Markers only help when there are few enough points to tell apart
+    few = len(history_data) <= HISTORY_MARKER_LIMIT
+    
     fig.add_trace(go.Scatter(
         x=times,
         y=confidences,
-        mode='lines+markers',
+        customdata=detections,
+        mode='lines+markers' if few else 'lines',
         name='Confidence',
-        line=dict(color='#667eea', width=3),
+        line=dict(color='#667eea', width=3 if few else 2),
         marker=dict(size=8, color='#764ba2'),
-        hovertemplate='<b>Time:</b> %{x}<br><b>Confidence:</b> %{y:.1f}%<extra></extra>'
+        hovertemplate='<b>Time:</b> %{x}<br><b>Confidence:</b> %{y:.1f}%'
+                      '<br><b>Detections:</b> %{customdata}<extra></extra>'
     ))
     
     fig.update_layout(
@@ -278,22 +417,27 @@ def create_history_chart(history_data):
     return fig
 
 
-def show_developer_card():
-    """
-    Display developer information card
-    """
+@functools.lru_cache(maxsize=4)
+def _profile_image_html(profile_image_path):
+    """<img> tag with the photo inlined as base64, built once per process"""
     import base64
     import os
     
     # Load and encode profile image
-    profile_image_path = "assets/deepak_profile.jpg"
     if os.path.exists(profile_image_path):
         with open(profile_image_path, "rb") as img_file:
             img_data = base64.b64encode(img_file.read()).decode()
-            profile_img_html = f'<img src="data:image/jpeg;base64,{img_data}" style="width: 200px; height: 200px; border-radius: 50%; object-fit: cover; border: 5px solid rgba(255,255,255,0.3); box-shadow: 0 10px 30px rgba(0,0,0,0.3); margin-bottom: 1rem;" />'
-    else:
-        # Fallback to emoji if image not found
-        profile_img_html = '<div style="font-size: 4rem; margin-bottom: 1rem;">👨‍💻</div>'
+            return f'<img src="data:image/jpeg;base64,{img_data}" style="width: 200px; height: 200px; border-radius: 50%; object-fit: cover; border: 5px solid rgba(255,255,255,0.3); box-shadow: 0 10px 30px rgba(0,0,0,0.3); margin-bottom: 1rem;" />'
+    
+    # Fallback to emoji if image not found
+    return '<div style="font-size: 4rem; margin-bottom: 1rem;">👨‍💻</div>'
+
+
+def show_developer_card():
+    """
+    Display developer information card
+    """
+    profile_img_html = _profile_image_html("assets/deepak_profile.jpg")
     
     st.markdown(f"""
         <div class="developer-card">
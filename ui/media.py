@@ -0,0 +1,80 @@
+"""
+Display Images
+--------------
+Helpers so results are kept and sent as small JPEG/WebP bytes instead of
+full-resolution numpy arrays. A 12MP phone photo is ~36MB as RGB in
+session state and gets re-encoded on every rerun; at display size as a
+JPEG it's ~100-200KB, encoded once.
+
+Detection still runs on the full-resolution image, only what we show
+(and keep around for showing) gets shrunk.
+"""
+
+import io
+import os
+
+import numpy as np
+import streamlit as st
+from PIL import Image, ImageOps
+
+
+# Longest side, in pixels, of anything we show (env vars so deployments can tune it)
+DISPLAY_MAX_SIDE = int(os.environ.get('EMOTION_DISPLAY_MAX_SIDE', 1024))
+DISPLAY_FORMAT = os.environ.get('EMOTION_DISPLAY_FORMAT', 'JPEG').upper()   # JPEG or WEBP
+DISPLAY_QUALITY = int(os.environ.get('EMOTION_DISPLAY_QUALITY', 85))
+
+# Also shrink the uploaded preview (the original bytes are still used for detection)
+DOWNSAMPLE_UPLOADS = os.environ.get('EMOTION_DOWNSAMPLE_UPLOADS', '1') != '0'
+
+
+def encode_for_display(image, max_side=DISPLAY_MAX_SIDE, fmt=DISPLAY_FORMAT, quality=DISPLAY_QUALITY):
+    """
+    PIL image or numpy array (RGB/RGBA/gray) -> compressed bytes, at most
+    max_side pixels on the long edge. st.image() takes the bytes as-is.
+    """
+    if isinstance(image, np.ndarray):
+        image = Image.fromarray(image)
+
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+
+    if max_side and max(image.size) > max_side:
+        image = image.copy()
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    buf = io.BytesIO()
+    image.save(buf, format=fmt, quality=quality)
+    return buf.getvalue()
+
+
+def open_upload(uploaded_file):
+    """Full-resolution PIL image from an upload, rotated the way the camera held it"""
+    uploaded_file.seek(0)
+    image = Image.open(uploaded_file)
+    return ImageOps.exif_transpose(image)
+
+
+def _upload_key(uploaded_file):
+    return getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+
+
+def upload_preview(uploaded_file, slot):
+    """
+    Display bytes for an uploaded file, decoded and encoded once per upload
+    (not on every rerun). `slot` keeps the image and webcam pages apart.
+    """
+    cache_key = f'{slot}_preview'
+    key = _upload_key(uploaded_file)
+    cached = st.session_state.get(cache_key)
+
+    if cached is None or cached[0] != key:
+        image = open_upload(uploaded_file)
+        if DOWNSAMPLE_UPLOADS:
+            preview = encode_for_display(image)
+        else:
+            uploaded_file.seek(0)
+            preview = uploaded_file.read()
+        st.session_state[cache_key] = (key, preview)
+        return preview
+
+    return cached[1]
@@ -3,7 +3,10 @@ Custom CSS Styles for Streamlit UI
 Creates an attractive and modern interface
 """
 
+import functools
 
+
+@functools.lru_cache(maxsize=1)
 def get_custom_css():
     """
     Returns custom CSS for the application
@@ -1,5 +1,4 @@
 import streamlit as st
-import time
 from data.db_handler import DatabaseManager
 
 def show_login_page():
@@ -58,8 +57,7 @@ def show_login_page():
                     # Update timestamp
                     st.session_state.db_manager.update_last_login(uid)
                     
-                    st.success(f"✓ Welcome, {username}!")
-                    time.sleep(1)
+                    # The welcome banner on the next page says hi, no need to sleep here
                     st.rerun()
                 else:
                     st.error("Oops, something went wrong. Try again?")
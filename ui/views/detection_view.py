@@ -1,76 +1,291 @@
+import time
+from collections import Counter
+
 import streamlit as st
-from PIL import Image
-from ui.components import show_page_header, show_emotion_card, create_emotion_bar_chart, create_emotion_pie_chart
+from core import metrics
+from ui.media import encode_for_display, open_upload, upload_preview
+from ui.components import (
+    show_page_header, show_emotion_card, create_emotion_bar_chart, create_emotion_pie_chart,
+    create_emotion_heatmap, create_emotion_small_multiples, fragment
+)
+
+# With more faces than this we draw one combined chart instead of one per face
+COMPACT_CHART_FACES = 4
+
+
+def _detect(image):
+    """predict_from_image, timed. The first one per session is the one users notice."""
+    with metrics.timer('predict_image') as t:
+        preds = st.session_state.predictor.predict_from_image(image)
+    
+    if 'first_prediction_ms' not in st.session_state:
+        st.session_state.first_prediction_ms = t.seconds * 1000
+        metrics.record('first_prediction', t.seconds)
+        metrics.record('time_to_first_prediction', time.perf_counter() - st.session_state.session_started)
+    
+    return preds
+
+def show_face_results(preds, chart_fn, key, expanders=True):
+    """
+    Card + chart per face, or (for lots of faces) a single heatmap /
+    small-multiples figure so reruns don't ship N separate charts.
+    """
+    style = "Per face"
+    if len(preds) > COMPACT_CHART_FACES:
+        style = st.radio(
+            "Chart style:",
+            ["Heatmap", "Small multiples", "Per face"],
+            horizontal=True,
+            key=f"{key}_chart_style"
+        )
+    
+    if style == "Heatmap":
+        st.plotly_chart(create_emotion_heatmap([p['all_emotions'] for p in preds]), use_container_width=True)
+        return
+    if style == "Small multiples":
+        st.plotly_chart(create_emotion_small_multiples([p['all_emotions'] for p in preds]), use_container_width=True)
+        return
+    
+    for i, p in enumerate(preds):
+        if expanders:
+            # Using expander to keep it clean
+            with st.expander(f"👤 Face {i+1}: {p['dominant_emotion']} ({p['confidence']:.1f}%)", expanded=True):
+                show_emotion_card(p['dominant_emotion'], p['confidence'])
+                st.plotly_chart(chart_fn(p['all_emotions']), use_container_width=True)
+        else:
+            show_emotion_card(p['dominant_emotion'], p['confidence'])
+            st.plotly_chart(chart_fn(p['all_emotions']), use_container_width=True)
+
+
+def _analyze(image, preds_key, annotated_key):
+    """Detect + save to history + keep the results around for the results panel"""
+    preds = _detect(image)
+    
+    if preds:
+        # Save to DB so we can see stats later
+        emotions = [p['dominant_emotion'] for p in preds]
+        stats = st.session_state.predictor.get_emotion_statistics(preds)
+        
+        st.session_state.db_manager.save_detection_history(
+            st.session_state.user_id,
+            stats['total_faces'],
+            emotions,
+            stats['average_confidence']
+        )
+        
+        # Save to session state so it doesn't disappear on reload.
+        # Kept as compressed, display-sized bytes rather than a full-res array
+        st.session_state[preds_key] = preds
+        st.session_state[annotated_key] = encode_for_display(
+            st.session_state.predictor.annotate_image(image, preds)
+        )
+    
+    return preds
+
 
 def show_image_detection():
     """Page for uploading images"""
     show_page_header("📸 Image Emotion Detection", "Upload an image to detect facial emotions")
     
+    mode = st.radio(
+        "Mode:",
+        ["🖼️ Single image", "🗂️ Batch"],
+        horizontal=True,
+        label_visibility="collapsed",
+        key="image_mode"
+    )
+    if mode == "🗂️ Batch":
+        _batch_panel()
+        return
+    
     col1, col2 = st.columns([1, 1])
     
+    # Each side is a fragment: uploading only reruns the left side,
+    # clicking Detect only reruns the right side (not the whole app)
     with col1:
-        st.markdown("### Upload Image")
-        uploaded_file = st.file_uploader(
-            "Choose an image file",
-            type=['jpg', 'jpeg', 'png'],
-            help="Upload an image containing faces"
-        )
-        
-        if uploaded_file is not None:
-            # Show the image
-            image = Image.open(uploaded_file)
-            st.image(image, caption="Uploaded Image", use_container_width=True)
-            
-            # The magic button
-            if st.button("🔍 Detect Emotions", use_container_width=True):
-                with st.spinner("🎭 Analyzing emotions..."):
-                    # Get predictions
-                    preds = st.session_state.predictor.predict_from_image(image)
-                    
-                    if preds:
-                        # Save to DB so we can see stats later
-                        emotions = [p['dominant_emotion'] for p in preds]
-                        stats = st.session_state.predictor.get_emotion_statistics(preds)
-                        
-                        st.session_state.db_manager.save_detection_history(
-                            st.session_state.user_id,
-                            stats['total_faces'],
-                            emotions,
-                            stats['average_confidence']
-                        )
-                        
-                        # Save to session state so it doesn't disappear on reload
-                        st.session_state.predictions = preds
-                        st.session_state.annotated_image = st.session_state.predictor.annotate_image(
-                            image, preds
-                        )
-                        
-                        st.success(f"✓ Found {len(preds)} face(s)!")
-                    else:
-                        st.warning("⚠ Couldn't find any faces. Maybe try a clearer photo?")
+        _image_upload_panel()
     
     with col2:
-        if 'predictions' in st.session_state and st.session_state.predictions:
-            st.markdown("### Detection Results")
+        _image_results_panel()
+
+
+@fragment
+def _image_upload_panel():
+    st.markdown("### Upload Image")
+    uploaded_file = st.file_uploader(
+        "Choose an image file",
+        type=['jpg', 'jpeg', 'png'],
+        help="Upload an image containing faces",
+        key="image_upload"
+    )
+    
+    if uploaded_file is not None:
+        # Show the image (display-sized copy, decoded once per upload)
+        st.image(upload_preview(uploaded_file, 'image'), caption="Uploaded Image", use_container_width=True)
+
+
+@fragment
+def _image_results_panel():
+    # The magic button
+    if st.button("🔍 Detect Emotions", use_container_width=True):
+        uploaded_file = st.session_state.get('image_upload')
+        
+        if uploaded_file is None:
+            st.info("👈 Upload an image first!")
+        else:
+            with st.spinner("🎭 Analyzing emotions..."):
+                # Full resolution only for the actual detection
+                preds = _analyze(open_upload(uploaded_file), 'predictions', 'annotated_image')
             
-            # Show the cool annotated image
-            st.image(
-                st.session_state.annotated_image,
-                caption="Emotion Detection Results",
-                use_container_width=True
-            )
+            if preds:
+                st.success(f"✓ Found {len(preds)} face(s)!")
+            else:
+                st.warning("⚠ Couldn't find any faces. Maybe try a clearer photo?")
+    
+    if 'predictions' in st.session_state and st.session_state.predictions:
+        st.markdown("### Detection Results")
+        
+        # Show the cool annotated image
+        st.image(
+            st.session_state.annotated_image,
+            caption="Emotion Detection Results",
+            use_container_width=True
+        )
+        
+        # Details for each face (bar chart looks better here)
+        show_face_results(st.session_state.predictions, create_emotion_bar_chart, key="image")
+
+
+# Thumbnails in the batch grid
+BATCH_THUMB_SIDE = 360
+BATCH_GRID_COLS = 4
+
+
+@fragment
+def _batch_panel():
+    st.markdown("### 🗂️ Batch Upload")
+    files = st.file_uploader(
+        "Choose images (or a .zip of them)",
+        type=['jpg', 'jpeg', 'png', 'zip'],
+        accept_multiple_files=True,
+        help="Every image is analyzed; results show up as each one finishes",
+        key="batch_upload"
+    )
+    
+    if st.button("🚀 Process Batch", use_container_width=True, key="batch_run"):
+        if not files:
+            st.info("👆 Pick some images first!")
+        else:
+            _run_batch(files)
+            return
+    
+    results = st.session_state.get('batch_results')
+    if results:
+        grid = _BatchGrid()
+        for entry in results['items']:
+            grid.add(entry)
+        _show_batch_summary(results)
+
+
+class _BatchGrid:
+    """Thumbnails laid out BATCH_GRID_COLS per row, added one at a time"""
+    
+    def __init__(self):
+        self.cols = None
+        self.count = 0
+    
+    def add(self, entry):
+        if self.count % BATCH_GRID_COLS == 0:
+            self.cols = st.columns(BATCH_GRID_COLS)
+        
+        with self.cols[self.count % BATCH_GRID_COLS]:
+            if entry['thumbnail'] is not None:
+                st.image(entry['thumbnail'], use_container_width=True)
             
-            # Details for each face
-            for i, p in enumerate(st.session_state.predictions):
-                # Using expander to keep it clean
-                with st.expander(f"👤 Face {i+1}: {p['dominant_emotion']} ({p['confidence']:.1f}%)", expanded=True):
-                    show_emotion_card(p['dominant_emotion'], p['confidence'])
-                    
-                    # Bar chart looks better here
-                    st.plotly_chart(
-                        create_emotion_bar_chart(p['all_emotions']),
-                        use_container_width=True
-                    )
+            if entry['error']:
+                st.caption(f"⚠ {entry['name']}: couldn't read it")
+            elif entry['predictions']:
+                faces = ", ".join(p['dominant_emotion'] for p in entry['predictions'])
+                st.caption(f"**{entry['name']}** · {faces}")
+            else:
+                st.caption(f"{entry['name']} · no faces")
+        
+        self.count += 1
+
+
+def _run_batch(files):
+    """Streams results into the grid as images finish, then saves everything in one go"""
+    from core.batch_processor import BatchProcessor, expand_uploads
+    
+    predictor = st.session_state.predictor
+    items = expand_uploads([(f.name, f.getvalue()) for f in files])
+    if not items:
+        st.warning("⚠ No images found in that upload.")
+        return
+    
+    progress = st.progress(0.0, text=f"0 / {len(items)} images")
+    grid = _BatchGrid()
+    entries = []
+    started = time.perf_counter()
+    
+    for done, res in enumerate(BatchProcessor(predictor).run(items), 1):
+        thumbnail = None
+        if res['image'] is not None:
+            shown = predictor.annotate_image(res['image'], res['predictions']) if res['predictions'] else res['image']
+            thumbnail = encode_for_display(shown, max_side=BATCH_THUMB_SIDE)
+        
+        # Only small stuff goes into session state, the full-res image is dropped here
+        entry = {
+            'name': res['name'],
+            'predictions': res['predictions'],
+            'thumbnail': thumbnail,
+            'error': res['error']
+        }
+        entries.append(entry)
+        grid.add(entry)
+        progress.progress(done / len(items), text=f"{done} / {len(items)} images")
+    
+    seconds = time.perf_counter() - started
+    metrics.record('batch_images', seconds / len(items))
+    
+    # One transaction for the whole batch instead of one per image
+    detections = []
+    for entry in entries:
+        if entry['predictions']:
+            stats = predictor.get_emotion_statistics(entry['predictions'])
+            detections.append((
+                stats['total_faces'],
+                [p['dominant_emotion'] for p in entry['predictions']],
+                stats['average_confidence']
+            ))
+    saved = st.session_state.db_manager.save_detection_history_batch(st.session_state.user_id, detections)
+    
+    results = {'items': entries, 'seconds': seconds, 'saved': saved}
+    st.session_state.batch_results = results
+    progress.empty()
+    _show_batch_summary(results)
+
+
+def _show_batch_summary(results):
+    entries = results['items']
+    preds = [p for e in entries for p in e['predictions']]
+    counts = Counter(p['dominant_emotion'] for p in preds)
+    errors = sum(1 for e in entries if e['error'])
+    
+    st.markdown("### 📊 Batch Summary")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Images", len(entries))
+    c2.metric("Faces", len(preds))
+    c3.metric("Avg Confidence", f"{sum(p['confidence'] for p in preds) / len(preds):.1f}%" if preds else "–")
+    c4.metric("Speed", f"{len(entries) / results['seconds']:.1f} img/s" if results['seconds'] > 0 else "–")
+    
+    if counts:
+        st.plotly_chart(create_emotion_pie_chart(dict(counts)), use_container_width=True)
+    
+    note = f"✓ Saved {results['saved']} detection(s) to your history"
+    if errors:
+        note += f" · {errors} file(s) couldn't be read"
+    st.caption(note)
 
 
 def show_webcam_detection():
@@ -102,115 +317,204 @@ def show_webcam_detection():
                 <li>Allow permissions</li>
                 <li>Smile! (or frown)</li>
                 <li>Click "Take Photo"</li>
-                <li>Click "Analyze"</li>
+                <li>Click "Analyze Emotion"</li>
             </ol>
         </div>
     """, unsafe_allow_html=True)
     
+    # Toggle between webcam snapshots, upload (fallback) and continuous analysis
+    mode = st.radio(
+        "Mode:",
+        ["📹 Webcam", "📁 Upload", "🎥 Continuous"],
+        help="Switch if webcam is broken",
+        horizontal=True,
+        key="webcam_mode"
+    )
+    
+    if mode == "🎥 Continuous":
+        _live_panel()
+        return
+    _stop_live()
+    
     col1, col2 = st.columns([1, 1])
     
     with col1:
-        st.markdown("### 📸 Camera Feed")
-        
-        # Toggle between webcam and upload (fallback)
-        mode = st.radio(
-            "Mode:",
-            ["📹 Webcam", "📁 Upload"],
-            help="Switch if webcam is broken"
-        )
-        
-        if mode == "📹 Webcam":
-            try:
-                cam_img = st.camera_input("Take a photo")
-                
-                if cam_img is not None:
-                    image = Image.open(cam_img)
-                    
-                    if st.button("🎭 Analyze Emotion", use_container_width=True, key="webcam_analyze"):
-                        with st.spinner("🔍 Crunching numbers..."):
-                            preds = st.session_state.predictor.predict_from_image(image)
-                            
-                            if preds:
-                                # Save history
-                                emotions = [p['dominant_emotion'] for p in preds]
-                                stats = st.session_state.predictor.get_emotion_statistics(preds)
-                                
-                                st.session_state.db_manager.save_detection_history(
-                                    st.session_state.user_id,
-                                    stats['total_faces'],
-                                    emotions,
-                                    stats['average_confidence']
-                                )
-                                
-                                st.session_state.webcam_predictions = preds
-                                st.session_state.webcam_annotated = st.session_state.predictor.annotate_image(
-                                    image, preds
-                                )
-                                
-                                st.success(f"✓ Found {len(preds)} face(s)!")
-                            else:
-                                st.warning("⚠ No faces found. Try better lighting?")
-                else:
-                    st.info("👆 Waiting for photo...")
-                    
-            except Exception as e:
-                st.error(f"Camera Error: {e}")
-        
-        else:  # Upload fallback
-            st.markdown("#### 📁 Upload Selfie")
-            uploaded = st.file_uploader("Choose photo", type=['jpg', 'png'], key="webcam_upload")
-            
-            if uploaded is not None:
-                image = Image.open(uploaded)
-                st.image(image, caption="Your Selfie", use_container_width=True)
-                
-                if st.button("🎭 Analyze", use_container_width=True, key="upload_analyze"):
-                    with st.spinner("🔍 Analyzing..."):
-                        preds = st.session_state.predictor.predict_from_image(image)
-                        
-                        if preds:
-                            # Save history
-                            emotions = [p['dominant_emotion'] for p in preds]
-                            stats = st.session_state.predictor.get_emotion_statistics(preds)
-                            
-                            st.session_state.db_manager.save_detection_history(
-                                st.session_state.user_id,
-                                stats['total_faces'],
-                                emotions,
-                                stats['average_confidence']
-                            )
-                            
-                            st.session_state.webcam_predictions = preds
-                            st.session_state.webcam_annotated = st.session_state.predictor.annotate_image(
-                                image, preds
-                            )
-                            
-                            st.success(f"✓ Found {len(preds)} face(s)!")
-                        else:
-                            st.warning("⚠ No faces found.")
+        _webcam_input_panel(mode)
     
     with col2:
-        if 'webcam_predictions' in st.session_state and st.session_state.webcam_predictions:
-            st.markdown("### 🎯 Results")
-            
-            st.image(
-                st.session_state.webcam_annotated,
-                caption="Detected Emotions",
-                use_container_width=True
-            )
+        _webcam_results_panel()
+
+
+@fragment
+def _webcam_input_panel(mode):
+    st.markdown("### 📸 Camera Feed")
+    
+    if mode == "📹 Webcam":
+        try:
+            cam_img = st.camera_input("Take a photo", key="webcam_camera")
             
-            for p in st.session_state.webcam_predictions:
-                show_emotion_card(p['dominant_emotion'], p['confidence'])
+            if cam_img is None:
+                st.info("👆 Waiting for photo...")
                 
-                st.plotly_chart(
-                    create_emotion_pie_chart(p['all_emotions']),
-                    use_container_width=True
-                )
+        except Exception as e:
+            st.error(f"Camera Error: {e}")
+    
+    else:  # Upload fallback
+        st.markdown("#### 📁 Upload Selfie")
+        uploaded = st.file_uploader("Choose photo", type=['jpg', 'png'], key="webcam_upload")
+        
+        if uploaded is not None:
+            st.image(upload_preview(uploaded, 'webcam'), caption="Your Selfie", use_container_width=True)
+
+
+@fragment
+def _webcam_results_panel():
+    if st.button("🎭 Analyze Emotion", use_container_width=True, key="webcam_analyze"):
+        if st.session_state.get('webcam_mode', "📹 Webcam") == "📹 Webcam":
+            source = st.session_state.get('webcam_camera')
+        else:
+            source = st.session_state.get('webcam_upload')
+        
+        if source is None:
+            st.info("👈 Take (or upload) a photo first!")
         else:
-            st.markdown("""
-                <div class="info-card" style="text-align: center; padding: 3rem;">
-                    <div style="font-size: 4rem; margin-bottom: 1rem;">📸</div>
-                    <h3>Waiting for input...</h3>
-                    <p>Take a photo to see the magic happen!</p>
-                </div>
-            """, unsafe_allow_html=True)
+            with st.spinner("🔍 Crunching numbers..."):
+                preds = _analyze(open_upload(source), 'webcam_predictions', 'webcam_annotated')
+            
+            if preds:
+                st.success(f"✓ Found {len(preds)} face(s)!")
+            else:
+                st.warning("⚠ No faces found. Try better lighting?")
+    
+    if 'webcam_predictions' in st.session_state and st.session_state.webcam_predictions:
+        st.markdown("### 🎯 Results")
+        
+        st.image(
+            st.session_state.webcam_annotated,
+            caption="Detected Emotions",
+            use_container_width=True
+        )
+        
+        show_face_results(
+            st.session_state.webcam_predictions, create_emotion_pie_chart,
+            key="webcam", expanders=False
+        )
+    else:
+        st.markdown("""
+            <div class="info-card" style="text-align: center; padding: 3rem;">
+                <div style="font-size: 4rem; margin-bottom: 1rem;">📸</div>
+                <h3>Waiting for input...</h3>
+                <p>Take a photo to see the magic happen!</p>
+            </div>
+        """, unsafe_allow_html=True)
+
+
+# How often the page checks for a new result, and how big the live frame is shown
+LIVE_POLL_INTERVAL = 0.05
+LIVE_DISPLAY_SIDE = 720
+
+
+def _stop_live():
+    analyzer = st.session_state.pop('live_analyzer', None)
+    if analyzer is not None:
+        analyzer.stop()
+
+
+def _live_panel():
+    """
+    Continuous mode: frames come straight from a camera (or a looping video
+    file) on the server, get analyzed in the background, and the newest
+    result replaces the old one in place.
+    """
+    from core.live_stream import LiveAnalyzer, FrameSource, DEFAULT_SOURCE
+    from core.motion import MotionGate, MOTION_DEFAULTS
+    
+    c1, c2, c3, c4 = st.columns([3, 2, 1, 1])
+    source = c1.text_input(
+        "Video source",
+        value=DEFAULT_SOURCE,
+        help="Camera index on the server (0, 1, ...) or a video file path (loops)",
+        key="live_source"
+    )
+    target_fps = c2.slider("Target FPS", 1, 30, 5, key="live_fps")
+    start = c3.button("▶️ Start", use_container_width=True, key="live_start")
+    stop = c4.button("⏹ Stop", use_container_width=True, key="live_stop")
+    
+    with st.expander("🏃 Motion gating", expanded=False):
+        gated = st.checkbox(
+            "Skip analysis when nothing in the scene changes",
+            value=True,
+            help="Great for kiosk cameras pointed at an empty room",
+            key="live_gate"
+        )
+        g1, g2 = st.columns(2)
+        changed_pct = g1.slider(
+            "Changed pixels needed (%)", 0.1, 10.0, MOTION_DEFAULTS['changed_fraction'] * 100, 0.1,
+            key="live_gate_fraction"
+        )
+        pixel_threshold = g2.slider(
+            "Pixel change threshold (gray levels)", 5, 100, MOTION_DEFAULTS['pixel_threshold'],
+            key="live_gate_pixels"
+        )
+    
+    if stop:
+        _stop_live()
+    elif start:
+        _stop_live()
+        try:
+            gate = MotionGate(pixel_threshold=pixel_threshold, changed_fraction=changed_pct / 100) if gated else None
+            st.session_state.live_analyzer = LiveAnalyzer(
+                st.session_state.predictor, FrameSource(source), target_fps=target_fps, gate=gate
+            ).start()
+        except Exception as e:
+            st.error(f"Camera Error: {e}")
+    
+    analyzer = st.session_state.get('live_analyzer')
+    if analyzer is not None and not analyzer.running and analyzer.stats()['error']:
+        st.warning(f"⚠ {analyzer.stats()['error']}")
+    if analyzer is None or not analyzer.running:
+        st.info("▶️ Press Start to analyze the feed continuously (results aren't saved to your history).")
+        return
+    
+    frame_slot = st.empty()
+    stats_slot = st.empty()
+    last_seq = None
+    last_stats = 0.0
+    
+    # Clicking anything (e.g. Stop) interrupts this loop with a rerun
+    while analyzer.running:
+        result = analyzer.latest()
+        fresh = result is not None and result['seq'] != last_seq
+        
+        if fresh:
+            last_seq = result['seq']
+            annotated = st.session_state.predictor.annotate_image(result['frame'], result['predictions'])
+            frame_slot.image(encode_for_display(annotated, max_side=LIVE_DISPLAY_SIDE), use_container_width=True)
+        
+        # Stats keep ticking while the motion gate holds the frame
+        if result is not None and (fresh or time.perf_counter() - last_stats > 0.5):
+            last_stats = time.perf_counter()
+            stats_slot.markdown(_live_stats_line(analyzer.stats(), result))
+        
+        time.sleep(LIVE_POLL_INTERVAL)
+    
+    error = analyzer.stats()['error']
+    if error:
+        st.warning(f"⚠ {error}")
+
+
+def _live_stats_line(live, result):
+    faces = ", ".join(p['dominant_emotion'] for p in result['predictions']) or "no faces"
+    line = (
+        f"**{live['fps']:.1f} FPS** · latency p50 {live['latency_p50_ms']:.0f}ms / "
+        f"p95 {live['latency_p95_ms']:.0f}ms · inference {result['inference_ms']:.0f}ms · "
+        f"dropped {live['dropped']} of {live['captured']} frames · {faces}"
+    )
+    
+    motion = live['motion']
+    if motion:
+        line += (
+            f"  \n🏃 Motion gate: skipped {motion['skip_rate']:.0%} of {motion['checked']} frames · "
+            f"change {motion['last_score']:.2%} (triggers at {motion['changed_fraction']:.2%})"
+        )
+    return line
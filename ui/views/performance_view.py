@@ -0,0 +1,157 @@
+"""
+Performance Page
+----------------
+Admin-only ops view of this server process: per-stage latency percentiles,
+throughput, cache hit rates, DB connections and memory. Everything comes
+from the in-process registry (core.metrics), which keeps counting whether
+or not anyone has this page open; the numbers are only crunched here.
+
+Login is name-only, so admin access is NOT tied to the username: a
+session unlocks the page by entering the server-side EMOTION_ADMIN_TOKEN
+in the sidebar. With no token configured the page is off for everyone.
+"""
+
+import os
+import hmac
+import time
+
+import streamlit as st
+
+from core import metrics, model_loader
+from data.cache import get_query_cache
+
+
+ADMIN_TOKEN = os.environ.get('EMOTION_ADMIN_TOKEN', '')
+
+# How often the live panel redraws itself while it's open
+REFRESH_SECONDS = 2
+
+# Rates are averaged over this many seconds
+RATE_SECONDS = 60
+
+# Pipeline stages in the order a request goes through them; any other timing shows up after
+STAGES = [
+    'stage_detect', 'stage_classify', 'predict_image',
+    'batch_prepare', 'batch_predict',
+    'live_inference', 'live_latency',
+    'db_connection',
+]
+
+
+def is_admin():
+    """True once this session has entered the admin token"""
+    return bool(ADMIN_TOKEN) and st.session_state.get('is_admin', False)
+
+
+def show_admin_unlock():
+    """Sidebar box to unlock the Performance page (only when a token is configured)"""
+    if not ADMIN_TOKEN or is_admin():
+        return
+
+    with st.expander("🔐 Admin"):
+        token = st.text_input("Admin token", type="password", key="admin_token_input")
+        if st.button("Unlock", use_container_width=True, key="admin_unlock"):
+            if hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+                st.session_state.is_admin = True
+                st.rerun()
+            else:
+                st.error("Wrong token")
+
+
+def _auto_refresh(fn):
+    """Re-runs just this panel every few seconds (needs st.fragment with run_every)"""
+    try:
+        return st.fragment(run_every=REFRESH_SECONDS)(fn)
+    except (AttributeError, TypeError):
+        return fn
+
+
+def _latency_rows():
+    summary = metrics.summary()
+    order = [s for s in STAGES if s in summary] + sorted(s for s in summary if s not in STAGES)
+    return [
+        {
+            'stage': name,
+            'count': summary[name]['count'],
+            'per sec': round(metrics.rate(name, RATE_SECONDS), 2),
+            'p50 ms': round(summary[name]['p50_ms'], 1),
+            'p95 ms': round(summary[name]['p95_ms'], 1),
+            'p99 ms': round(summary[name]['p99_ms'], 1),
+            'last ms': round(summary[name]['last_ms'], 1),
+        }
+        for name in order
+    ]
+
+
+def _cache_rows():
+    rows = []
+
+    query = get_query_cache().stats()
+    rows.append({'cache': 'DB queries', 'hits': query['hits'], 'misses': query['misses'],
+                 'hit rate': f"{query['hit_rate']:.0%}", 'entries': query['entries']})
+
+    # Chart/CSS lru_caches; ui.components pulls in Plotly, only import it here
+    from ui import components, styles
+    for label, fn in [
+        ('Bar charts', components._emotion_bar_chart),
+        ('Pie charts', components._emotion_pie_chart),
+        ('Heatmaps', components._emotion_heatmap),
+        ('Small multiples', components._emotion_small_multiples),
+        ('CSS', styles.get_custom_css),
+    ]:
+        info = fn.cache_info()
+        total = info.hits + info.misses
+        rows.append({'cache': label, 'hits': info.hits, 'misses': info.misses,
+                     'hit rate': f"{info.hits / total:.0%}" if total else "-", 'entries': info.currsize})
+    return rows
+
+
+@_auto_refresh
+def _live_panel():
+    model = model_loader.status()
+    db_open = metrics.gauges().get('db_connections', 0)
+
+    c1, c2, c3, c4, c5 = st.columns(5)
+    c1.metric("Images / s", f"{metrics.rate('images_analyzed', RATE_SECONDS):.2f}")
+    c2.metric("Faces / s", f"{metrics.rate('faces_classified', RATE_SECONDS):.2f}")
+    c3.metric("DB connections", db_open, help="Open right now, running or waiting on the write lock")
+    c4.metric("Memory", f"{metrics.process_memory_mb():.0f} MB")
+    c5.metric("Model", model['backend'] or model['state'], help=model.get('model_path') or model.get('error'))
+
+    st.markdown("### ⏱️ Latency by stage")
+    rows = _latency_rows()
+    if rows:
+        st.dataframe(rows, use_container_width=True, hide_index=True)
+    else:
+        st.info("Nothing recorded yet. Run a detection and come back!")
+
+    st.markdown(f"### 📈 Throughput (last {metrics.RATE_WINDOW // 60} min)")
+    images = metrics.series('images_analyzed')
+    faces = metrics.series('faces_classified')
+    if images or faces:
+        length = max(len(images), len(faces))
+        st.line_chart({
+            'images/s': [v for _, v, _ in images] or [0] * length,
+            'faces/s': [v for _, v, _ in faces] or [0] * length,
+        })
+
+    st.markdown("### 🗃️ Caches")
+    st.dataframe(_cache_rows(), use_container_width=True, hide_index=True)
+
+    st.caption(f"Process-wide numbers, updated {time.strftime('%H:%M:%S')} · refreshes every {REFRESH_SECONDS}s")
+
+
+def show_performance():
+    """Ops dashboard (admins only)"""
+    from ui.components import show_page_header
+
+    if not is_admin():
+        st.error("🔒 Admins only")
+        return
+
+    show_page_header("⚙️ Performance", "How this server is doing right now")
+    _live_panel()
+
+    if st.button("🧹 Reset metrics", key="perf_reset"):
+        metrics.reset()
+        st.rerun()
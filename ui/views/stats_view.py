@@ -1,25 +1,56 @@
 import streamlit as st
+from datetime import datetime, timedelta, timezone
 from ui.components import show_page_header, show_stats_overview, create_emotion_pie_chart, create_history_chart
 
+# Options for the time range picker (None = everything)
+TIME_RANGES = {
+    "Day": timedelta(days=1),
+    "Week": timedelta(days=7),
+    "Month": timedelta(days=30),
+    "All time": None,
+}
+
+# Recent activity rows per "load more"
+ACTIVITY_PAGE_SIZE = 5
+
+RESOLUTION_LABELS = {
+    'raw': "every detection",
+    'hour': "hourly averages",
+    'day': "daily averages",
+}
+
+
+def _range_start(span):
+    """Start of the range in UTC, floored to the hour so cached results stay valid for a while"""
+    if span is None:
+        return None
+    start = datetime.now(timezone.utc).replace(tzinfo=None) - span
+    return start.replace(minute=0, second=0, microsecond=0)
+
+
 def show_statistics():
     """Shows all the cool charts and data"""
     show_page_header("📊 Your Statistics", "See how you've been feeling lately")
     
-    # Grab data from DB
-    total = st.session_state.db_manager.get_total_detections(st.session_state.user_id)
-    stats = st.session_state.db_manager.get_emotion_statistics(st.session_state.user_id)
-    history = st.session_state.db_manager.get_user_history(st.session_state.user_id, limit=20)
+    db = st.session_state.db_manager
+    user_id = st.session_state.user_id
+    
+    choice = st.radio("Time range", list(TIME_RANGES), index=1, horizontal=True, key="stats_range")
+    start = _range_start(TIME_RANGES[choice])
+    
+    # Grab everything from the DB in one shot (one transaction, so it all agrees).
+    # The range parts come from the rollups / a bounded query, so cost doesn't grow with history.
+    snapshot = db.get_dashboard_snapshot(user_id, history_limit=ACTIVITY_PAGE_SIZE, start=start)
+    summary = snapshot['range']
+    series = snapshot['series']
+    
+    total = summary['detections']
+    counts = summary['emotions']
     
     # Calculate some quick numbers
-    if stats:
-        # Find the most frequent emotion
-        top_emo = max(stats.items(), key=lambda x: x[1]['count'])[0]
-        
-        # Calculate average confidence
-        if history:
-            avg_conf = sum(h['confidence'] for h in history) / len(history)
-        else:
-            avg_conf = 0
+    if counts:
+        top_emo = next(iter(counts))
+        avg_conf = summary['average_confidence']
     else:
         top_emo = "N/A"
         avg_conf = 0
@@ -30,29 +61,62 @@ def show_statistics():
     col1, col2 = st.columns(2)
     
     with col1:
-        if stats:
+        if counts:
             st.markdown("### 🎭 Emotion Mix")
-            counts = {emo: data['count'] for emo, data in stats.items()}
             
             # Pie chart is best for this
             fig = create_emotion_pie_chart(counts)
             st.plotly_chart(fig, use_container_width=True)
         else:
-            st.info("No data yet. Go detect some emotions!")
+            st.info("No data in this range. Go detect some emotions!")
     
     with col2:
-        if history:
+        if series['points']:
             st.markdown("### 📈 Confidence Over Time")
-            fig = create_history_chart(history)
+            fig = create_history_chart(series['points'])
             st.plotly_chart(fig, use_container_width=True)
+            st.caption(f"{len(series['points'])} points, {RESOLUTION_LABELS[series['resolution']]}")
         else:
             st.info("Waiting for data...")
     
-    # List of recent scans
-    if history:
+    # List of recent scans (always the newest, whatever the range)
+    if snapshot['history']['items']:
         st.markdown("### 🕐 Recent Activity")
-        
-        for h in history[:5]:
-            with st.expander(f"🎯 {h['time']} - {h['num_faces']} face(s)"):
-                st.write(f"**Emotions:** {', '.join(h['emotions'])}")
-                st.write(f"**Confidence:** {h['confidence']:.1f}%")
+        show_recent_activity(snapshot['history'])
+
+
+def show_recent_activity(first_page, page_size=ACTIVITY_PAGE_SIZE):
+    """
+    Recent scans with a "load more" button that pages back through history.
+    `first_page` is the snapshot's history, so the newest page costs no extra query.
+    """
+    db = st.session_state.db_manager
+    user_id = st.session_state.user_id
+    newest_id = first_page['items'][0]['id']
+    
+    # Start over if the user changed or something new got detected
+    feed = st.session_state.get('activity_feed')
+    if not feed or feed['user_id'] != user_id or feed['newest_id'] != newest_id:
+        page = first_page
+        feed = {
+            'user_id': user_id,
+            'newest_id': newest_id,
+            'items': page['items'],
+            'cursor': page['next_cursor']
+        }
+        st.session_state.activity_feed = feed
+    
+    for h in feed['items']:
+        with st.expander(f"🎯 {h['time']} - {h['num_faces']} face(s)"):
+            st.write(f"**Emotions:** {', '.join(h['emotions'])}")
+            st.write(f"**Confidence:** {h['confidence']:.1f}%")
+    
+    if feed['cursor']:
+        if st.button("⬇️ Load more", use_container_width=True, key="activity_load_more"):
+            # Only fetches the next page, never the ones we already have
+            page = db.get_history_page(user_id, cursor=feed['cursor'], page_size=page_size)
+            feed['items'].extend(page['items'])
+            feed['cursor'] = page['next_cursor']
+            st.rerun()
+    else:
+        st.caption("That's everything!")